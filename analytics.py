@@ -1,17 +1,528 @@
-import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression
-from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
+from collections import OrderedDict
+from datetime import date as date_type, timedelta
+import threading
+import matplotlib
+import matplotlib.style
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from charts import BarChart, PieChart, ForecastChart, HeatmapChart
+import profiling
+from forecasting import MIN_MONTHS, MODELS, forecast_series
+
+
+# Горизонт прогноза по умолчанию и наибольший (месяцев), размер кэша прогнозов
+FORECAST_HORIZON = 2
+MAX_FORECAST_HORIZON = 12
+FORECAST_CACHE_SIZE = 64
+
+# Рейтинг сотрудников: размер страницы, число операций тепловой карты и
+# показатели (параметр -> (столбец строки рейтинга, подпись))
+EMPLOYEE_PAGE_SIZE = 15
+HEATMAP_OPERATIONS = 12
+RANKING_METRICS = {
+    'parts': (2, 'Количество деталей'),
+    'orders': (1, 'Количество нарядов'),
+    'productivity': (3, 'Производительность'),
+    'fulfillment': (4, 'Выполнение нормы, %'),
+}
+
+# Уровень детализации графиков: наименьшая ширина столбца (пикс.), ширина
+# графика без canvas (фигура 8x5 дюймов при 100 dpi) и наибольшее число
+# операций гистограммы трудоемкости вместе с группой прочих
+MIN_BAR_WIDTH = 8
+DEFAULT_CHART_WIDTH = 800
+TOP_OPERATIONS = 25
+OTHER_OPERATIONS = 'Прочие'
+
+# Единицы периодов по возрастанию (дни укрупняются до недель, месяцев,
+# лет) и подписи оси Y графика нарядов по укрупненным периодам
+PERIOD_UNITS = ('D', 'W', 'M', 'Y')
+PERIOD_TYPES = {'day': 'D', 'month': 'M', 'year': 'Y'}
+ORDERS_LABELS = {'W': 'Нарядов за неделю', 'M': 'Нарядов за месяц', 'Y': 'Нарядов за год'}
+
+
+class ForecastCache:
+    """Кэш прогнозов цехов с вытеснением давно не использованных записей (LRU)"""
+
+    def __init__(self, size=FORECAST_CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Прогноз по ключу (цех, версия данных цеха, горизонт) или None"""
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """Сохранение прогноза с вытеснением самого старого"""
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+
+def add_months(month, count):
+    """Сдвиг месяца в формате ГГГГ-ММ на count месяцев вперед"""
+    year, number = map(int, month.split('-'))
+    year, number = divmod(year * 12 + number - 1 + count, 12)
+    return f'{year:04d}-{number + 1:02d}'
+
+
+def to_iso_date(value):
+    """Приведение даты (date, datetime или строки) к виду ГГГГ-ММ-ДД"""
+    if hasattr(value, 'strftime'):
+        return value.strftime('%Y-%m-%d')
+    return str(value)[:10]
+
+
+# Порядковый номер 1 января 1970 года: перевод номеров дней NumPy в номера date.toordinal()
+EPOCH_ORDINAL = date_type(1970, 1, 1).toordinal()
+
+
+def day_number(day):
+    """Номер дня (порядковый номер даты) для даты в формате ГГГГ-ММ-ДД"""
+    return date_type.fromisoformat(day).toordinal()
+
+
+def bar_limit(width=None):
+    """Наибольшее число столбцов, помещающихся в ширину графика (пикс.)"""
+    return max(int(width or DEFAULT_CHART_WIDTH) // MIN_BAR_WIDTH, 1)
+
+
+def coarsen_days(days, unit):
+    """Номера периодов от 1970 года для номеров дней (unit: 'D', 'W', 'M' или 'Y').
+
+    Недели начинаются с понедельника: 1 января 1970 года - четверг.
+    """
+    if unit == 'W':
+        return (days + 3) // 7
+    return days.astype('datetime64[D]').astype(f'datetime64[{unit}]').astype(np.int64)
+
+
+def period_labels(keys, unit):
+    """Подписи периодов по их номерам от 1970 года (unit: 'D', 'W', 'M' или 'Y');
+    неделя подписывается датой ее понедельника"""
+    if unit == 'W':
+        keys, unit = np.asarray(keys) * 7 - 3, 'D'
+    return [str(label) for label in
+            np.datetime_as_string(np.asarray(keys).astype(f'datetime64[{unit}]'))]
+
+
+def group_sums(keys, counts, *weights):
+    """Суммы по группам целочисленных ключей (np.bincount).
+
+    counts - вклад строки в количество (1 или -1), weights - суммируемые
+    величины. Возвращает ключи непустых групп, количества и суммы весов
+    по этим группам.
+    """
+    if not len(keys):
+        return keys, np.zeros(0, dtype=int), [np.zeros(0) for _ in weights]
+    first = keys.min()
+    positions = keys - first
+    totals = np.rint(np.bincount(positions, weights=counts)).astype(int)
+    present = np.flatnonzero(totals > 0)
+    sums = [np.bincount(positions, weights=weight)[present] for weight in weights]
+    return present + first, totals[present], sums
+
+
+class WorkshopDailyTotals:
+    """Суммы по цехам нарастающим итогом по дням.
+
+    Для каждого цеха хранятся суммы деталей, производительности и
+    количество нарядов за все дни до каждого дня календаря (массив
+    цех x величина x день), поэтому суммы за любой период получаются
+    разностью двух столбцов - за O(1) на цех, без просмотра дней периода.
+    Изменение записи прибавляется ко всем столбцам после ее дня; календарь
+    и список цехов расширяются при появлении записей вне их.
+    """
+
+    def __init__(self, workshops, days, values):
+        """workshops, days - номера цехов и дней строк, values - три массива величин строк"""
+        if len(days):
+            self.first_day = int(days.min())
+            width = int(days.max()) - self.first_day + 2
+        else:
+            self.first_day = date_type.today().toordinal()
+            width = 2
+        numbers, rows = np.unique(workshops, return_inverse=True)
+        self.index = {int(workshop): row for row, workshop in enumerate(numbers)}
+        # Столбец k - суммы за дни до first_day + k (столбец 0 - нулевой)
+        cells = rows * width + (days - self.first_day + 1)
+        daily = np.stack([np.bincount(cells, weights=value, minlength=len(numbers) * width)
+                          .reshape(len(numbers), width) for value in values], axis=1)
+        self.sums = np.cumsum(daily, axis=2)
+
+    def workshop_row(self, workshop):
+        """Строка цеха в массиве сумм (новый цех добавляется с нулевыми суммами)"""
+        row = self.index.get(workshop)
+        if row is None:
+            row = self.index[workshop] = len(self.index)
+            self.sums = np.concatenate([self.sums, np.zeros((1,) + self.sums.shape[1:])])
+        return row
+
+    def column(self, day):
+        """Столбец сумм за дни до day включительно (календарь расширяется)"""
+        if day < self.first_day:
+            padding = np.zeros(self.sums.shape[:2] + (self.first_day - day,))
+            self.sums = np.concatenate([padding, self.sums], axis=2)
+            self.first_day = day
+        position = day - self.first_day + 1
+        if position >= self.sums.shape[2]:
+            padding = np.repeat(self.sums[:, :, -1:], position - self.sums.shape[2] + 1, axis=2)
+            self.sums = np.concatenate([self.sums, padding], axis=2)
+        return position
+
+    def add(self, workshop, day, values, sign):
+        """Учет вклада записи (sign=1) или его вычитание (sign=-1)"""
+        row = self.workshop_row(workshop)
+        position = self.column(day_number(day))
+        self.sums[row, :, position:] += sign * np.asarray(values, dtype=float)[:, None]
+
+    def totals(self, start_date, end_date):
+        """Суммы цехов за период: {цех: [детали, сумма производительности, количество]}"""
+        last = self.sums.shape[2] - 1
+        start = min(max(day_number(start_date) - self.first_day, 0), last)
+        end = min(max(day_number(end_date) - self.first_day + 1, 0), last)
+        if end <= start:
+            return {}
+        difference = self.sums[:, :, end] - self.sums[:, :, start]
+        return {workshop: [round(difference[row, 0]), difference[row, 1],
+                           round(difference[row, 2])]
+                for workshop, row in self.index.items()
+                if round(difference[row, 2]) > 0}
+
+
+class NaryadColumns:
+    """Таблица нарядов в памяти по столбцам (массивы NumPy).
+
+    Хранятся только поля, нужные графикам: номер дня от 1970 года,
+    цех, номер кода операции в словаре кодов, норма времени и
+    количество деталей - 21 байт на наряд вместо сотен байт на кортеж
+    Python. Изменения записей дописываются в конец строками со знаком:
+    удаление - строкой со знаком -1, изменение - вычитанием старой
+    записи и добавлением новой, поэтому суммы по группам с весом знака
+    всегда соответствуют базе.
+    """
+
+    COLUMNS = (('day', np.int32), ('workshop', np.int32), ('operation', np.int32),
+               ('time_norm', np.float32), ('parts', np.int32), ('sign', np.int8))
+
+    def __init__(self):
+        self.size = 0
+        self.codes = {}        # код операции -> номер
+        self.operations = []   # номер -> код операции
+        for name, dtype in self.COLUMNS:
+            setattr(self, name, np.empty(0, dtype=dtype))
+
+    @classmethod
+    def load(cls, batches):
+        """Загрузка из пачек строк [(дата, цех, код операции, норма времени, детали)]"""
+        columns = cls()
+        for rows in batches:
+            columns.extend(rows, 1)
+        return columns
+
+    def reserve(self, size):
+        """Увеличение емкости массивов (с запасом, чтобы приращения не копировали их)"""
+        capacity = len(self.day)
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity)
+        for name, dtype in self.COLUMNS:
+            array = np.empty(capacity, dtype=dtype)
+            array[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, array)
+
+    def encode(self, operation):
+        """Номер кода операции в словаре (новый код добавляется)"""
+        code = self.codes.get(operation)
+        if code is None:
+            code = self.codes[operation] = len(self.operations)
+            self.operations.append(operation)
+        return code
+
+    def extend(self, rows, sign):
+        """Добавление строк (sign=1) или вычитание их вклада (sign=-1)"""
+        if rows:
+            self.extend_columns(list(zip(*rows)), sign)
+
+    def extend_columns(self, columns, sign):
+        """Добавление строк, заданных столбцами (даты, цехи, коды операций,
+        нормы времени, детали)"""
+        dates, workshops, operations, time_norms, parts = columns
+        start, end = self.size, self.size + len(dates)
+        self.reserve(end)
+        self.day[start:end] = np.array(dates, dtype='datetime64[D]').astype(np.int64)
+        self.workshop[start:end] = workshops
+        for operation in sorted(set(operations).difference(self.codes)):
+            self.encode(operation)
+        self.operation[start:end] = list(map(self.codes.__getitem__, operations))
+        self.time_norm[start:end] = time_norms
+        self.parts[start:end] = parts
+        self.sign[start:end] = sign
+        self.size = end
+
+    def snapshot(self):
+        """Неизменяемый снимок текущих строк.
+
+        Массивы снимка - срезы текущих массивов: дописанные позже строки в
+        них не попадают, а при расширении массивов снимок сохраняет старые.
+        """
+        copy = NaryadColumns()
+        copy.size = self.size
+        copy.codes = dict(self.codes)
+        copy.operations = list(self.operations)
+        for name, dtype in self.COLUMNS:
+            setattr(copy, name, getattr(self, name)[:self.size])
+        return copy
+
+    def nbytes(self):
+        """Объем памяти массивов в байтах"""
+        return sum(getattr(self, name).nbytes for name, dtype in self.COLUMNS)
+
+    def productivity(self):
+        """Производительность строк: детали / норма времени (0 при нулевой норме)"""
+        return np.divide(self.parts, self.time_norm, out=np.zeros(self.size),
+                         where=self.time_norm != 0)
+
+    def periods(self, unit):
+        """Номера периодов строк от 1970 года (unit: 'D', 'W', 'M' или 'Y')"""
+        return coarsen_days(self.day, unit)
+
+    def period_counts(self, unit):
+        """Количество нарядов по периодам: (номера периодов, количества)"""
+        keys, counts, _ = group_sums(self.periods(unit), self.sign)
+        return keys, counts
+
+    def order_counts(self, unit):
+        """Количество нарядов по периодам: [(период, количество)]"""
+        keys, counts = self.period_counts(unit)
+        return list(zip(period_labels(keys, unit), counts.tolist()))
+
+    def operation_totals(self):
+        """Суммы по операциям: [(код операции, сумма нормы времени, количество)]"""
+        keys, counts, (time_sums,) = group_sums(self.operation, self.sign,
+                                                self.time_norm * self.sign)
+        return [(self.operations[code], time_sum, count)
+                for code, time_sum, count in zip(keys, time_sums.tolist(), counts.tolist())]
+
+    def workshop_daily_totals(self):
+        """Суммы цехов нарастающим итогом по дням"""
+        return WorkshopDailyTotals(self.workshop, self.day + EPOCH_ORDINAL,
+                                   [self.parts * self.sign, self.productivity() * self.sign,
+                                    self.sign])
+
+    def monthly_productivity(self, workshop=None):
+        """Средняя производительность по месяцам: {цех: [(месяц ГГГГ-ММ, производительность)]}"""
+        rows = self if workshop is None else self.select(self.workshop == workshop)
+        if not rows.size:
+            return {}
+        workshops, index = np.unique(rows.workshop, return_inverse=True)
+        months = rows.periods('M')
+        first = months.min()
+        width = months.max() - first + 1
+        keys, counts, (sums,) = group_sums(index * width + months - first, rows.sign,
+                                           rows.productivity() * rows.sign)
+        labels = period_labels(keys % width + first, 'M')
+        series = {}
+        for key, label, total, count in zip(keys // width, labels, sums.tolist(), counts.tolist()):
+            series.setdefault(int(workshops[key]), []).append((label, total / count))
+        return series
+
+    def select(self, mask):
+        """Снимок строк, отобранных маской"""
+        copy = self.snapshot()
+        for name, dtype in self.COLUMNS:
+            setattr(copy, name, getattr(self, name)[:self.size][mask])
+        copy.size = len(copy.day)
+        return copy
+
+
+@profiling.instrument('aggregates', exclude=(
+    'ensure', 'grouping', 'data_version', 'workshop_version', 'apply_record'))
+class AnalyticsAggregates:
+    """Агрегаты для графиков, корректируемые по приращениям при изменении записей.
+
+    Таблица нарядов один раз читается из базы в столбцы NumPy
+    (NaryadColumns), и все графики считаются по ним группировкой с
+    np.bincount без запросов к базе. Агрегаты читаются в фоновом потоке
+    построения графиков, а приращения приходят из потока интерфейса,
+    поэтому доступ к ним защищен блокировкой. Если во время чтения из
+    базы пришло изменение записи, прочитанный результат отбрасывается и
+    чтение повторяется.
+    """
 
-class Analytics:
     def __init__(self, database):
         self.db = database
-        plt.style.use('dark_background')
+        self.lock = threading.Lock()
+        self.generation = 0        # счетчик изменений записей
+        self.epoch = 0             # счетчик полных перезагрузок данных
+        self.workshop_versions = {}  # цех -> счетчик изменений его записей
+        self.table = None          # столбцы таблицы нарядов (NaryadColumns)
+        self.workshops = None      # суммы цехов по дням нарастающим итогом (WorkshopDailyTotals)
+        self.groupings = {}        # (метод NaryadColumns, аргументы) -> (версия данных, результат)
+        database.add_listener(self.apply_change)
+
+    def invalidate(self):
+        """Сброс агрегатов (будут перечитаны из базы при следующем запросе)"""
+        with self.lock:
+            self.generation += 1
+            self.epoch += 1
+            self.workshop_versions = {}
+            self.table = None
+            self.workshops = None
+            self.groupings = {}
+
+    def ensure(self, name, load, summarize):
+        """Получение сводки по агрегату с загрузкой его из базы при необходимости.
+
+        load() читает агрегат из базы без блокировки, summarize(value)
+        строит результат под блокировкой.
+        """
+        while True:
+            with self.lock:
+                value = getattr(self, name)
+                if value is not None:
+                    return summarize(value)
+                generation = self.generation
+            value = load()
+            with self.lock:
+                if generation == self.generation:
+                    setattr(self, name, value)
+                    return summarize(value)
+
+    def data_version(self):
+        """Версия данных: меняется при любом изменении записей"""
+        with self.lock:
+            return self.generation
+
+    def workshop_version(self, workshop):
+        """Версия данных цеха: меняется при любом изменении его записей"""
+        with self.lock:
+            return (self.epoch, self.workshop_versions.get(workshop, 0))
+
+    def load_table(self):
+        """Чтение таблицы нарядов из базы и архива закрытых месяцев в столбцы"""
+        columns = NaryadColumns.load(self.db.iter_analytics_rows())
+        for batch in self.db.iter_archive_columns():
+            columns.extend_columns(batch, 1)
+        return columns
+
+    def columns(self):
+        """Снимок столбцов таблицы нарядов; группировки по нему идут без блокировки"""
+        return self.ensure('table', self.load_table, NaryadColumns.snapshot)
+
+    def grouping(self, method, *args):
+        """Группировка по столбцам; результат запоминается до изменения записей"""
+        key = (method,) + args
+        with self.lock:
+            generation = self.generation
+            cached = self.groupings.get(key)
+            if cached is not None and cached[0] == generation:
+                return cached[1]
+        result = getattr(self.columns(), method)(*args)
+        with self.lock:
+            self.groupings[key] = (generation, result)
+        return result
+
+    def orders_by_period(self, period_type):
+        """Количество нарядов по периодам в виде [(период, количество)]"""
+        return self.grouping('order_counts', PERIOD_TYPES.get(period_type, 'D'))
+
+    def orders_by_scale(self, period_type, limit):
+        """Количество нарядов не более чем по limit периодам:
+        (единица периода, [(период, количество)]).
+
+        Если периодов больше limit, они укрупняются: дни до недель, недели
+        до месяцев, месяцы до лет. Укрупняется запомненный ряд по дням, а не
+        строки нарядов, поэтому время расчета зависит от числа дней, а число
+        столбцов - от ширины графика.
+        """
+        days, counts = self.grouping('period_counts', 'D')
+        requested = PERIOD_TYPES.get(period_type, 'D')
+        for unit in PERIOD_UNITS[PERIOD_UNITS.index(requested):]:
+            keys = coarsen_days(days, unit)
+            if unit == 'Y' or len(keys) <= 1 or np.count_nonzero(np.diff(keys)) < limit:
+                break
+        keys, totals, _ = group_sums(keys, counts)
+        return unit, list(zip(period_labels(keys, unit), totals.tolist()))
+
+    def workshop_productivity(self, start_date, end_date):
+        """Производительность цехов за период в виде [(цех, сумма деталей, производительность)].
+
+        Суммы по дням строятся по столбцам один раз, дальше любой период
+        считается по суммам нарастающим итогом.
+        """
+        date_range = (to_iso_date(start_date), to_iso_date(end_date))
+
+        def load():
+            return self.columns().workshop_daily_totals()
+
+        def summarize(workshops):
+            data = [(workshop, parts, productivity_sum / count)
+                    for workshop, (parts, productivity_sum, count)
+                    in workshops.totals(*date_range).items()]
+            return sorted(data, key=lambda row: row[2], reverse=True)
+
+        return self.ensure('workshops', load, summarize)
+
+    def operation_complexity(self):
+        """Трудоемкость операций в виде [(код операции, среднее время, количество)]"""
+        data = [(operation, time_sum / count, count)
+                for operation, time_sum, count in self.grouping('operation_totals')]
+        return sorted(data, key=lambda row: row[1], reverse=True)
+
+    def monthly_productivity(self, workshop=None):
+        """Средняя производительность цехов по месяцам: {цех: [(месяц, производительность)]}"""
+        return self.grouping('monthly_productivity', workshop)
+
+    def apply_change(self, event, old, new):
+        """Корректировка агрегатов по изменению одной записи"""
+        if event == 'reloaded':
+            self.invalidate()
+            return
+        with self.lock:
+            self.generation += 1
+            if old:
+                self.apply_record(old, -1)
+            if new:
+                self.apply_record(new, 1)
+
+    def apply_record(self, record, sign):
+        """Добавление (sign=1) или вычитание (sign=-1) вклада записи в агрегаты"""
+        shifr, date, workshop, employee, operation, time_norm, parts = record
+        day = to_iso_date(date)
+        self.workshop_versions[workshop] = self.workshop_versions.get(workshop, 0) + 1
+
+        if self.table is not None:
+            self.table.extend([(day, workshop, operation, time_norm, parts)], sign)
+
+        if self.workshops is not None:
+            self.workshops.add(workshop, day,
+                               [parts, parts / time_norm if time_norm else 0.0, 1], sign)
+
+
+@profiling.instrument('analytics', exclude=('create_chart',))
+class Analytics:
+    def __init__(self, database, horizon=FORECAST_HORIZON):
+        self.db = database
+        self.horizon = horizon     # горизонт прогноза (месяцев)
+        self.aggregates = AnalyticsAggregates(database)
+        self.forecasts = ForecastCache()
+        # Полные рейтинги сотрудников: (цех, начало, конец) -> (версия данных, строки)
+        self.employee_rankings = {}
+        # Стиль задается без pyplot: его импорт долог и не нужен для Figure
+        matplotlib.style.use('dark_background')
         self.colors = ['#00ff88', '#00bfff', '#ff3399', '#ffcc00', '#ff6600', '#9933ff']
         
         # Настройка глобального стиля для адаптивных графиков
-        plt.rcParams.update({
+        matplotlib.rcParams.update({
             'figure.facecolor': '#1e1e1e',
             'axes.facecolor': '#1e1e1e',
             'savefig.facecolor': '#1e1e1e',
@@ -41,198 +552,209 @@ class Analytics:
             'legend.fontsize': 9
         })
 
-    def plot_orders_by_period(self, period_type='month'):
-        """Построение графика количества нарядов по периодам"""
-        plt.close('all')  # Закрываем все предыдущие фигуры
-        data = self.db.get_orders_by_period(period_type)
+    def create_chart(self, name, figure, animated=False):
+        """Создание графика name на постоянной фигуре"""
+        if name == 'orders':
+            return BarChart(figure, 'Greens', 'Период', 'Количество нарядов',
+                            '{:.0f}', animated=animated)
+        if name == 'productivity':
+            return PieChart(figure, 'Spectral', animated=animated)
+        if name == 'complexity':
+            return BarChart(figure, 'cool', 'Код операции', 'Среднее время (норма)',
+                            '{:.1f}', alpha=0.8, animated=animated)
+        if name == 'employees':
+            return BarChart(figure, 'viridis', 'Табельный номер', '', '{:.5g}',
+                            animated=animated)
+        if name == 'employee_operations':
+            return HeatmapChart(figure, 'RdYlGn', 'Код операции', 'Табельный номер',
+                                '{:.0f}', animated=animated)
+        if name == 'prediction':
+            return ForecastChart(figure, self.colors[0], self.colors[1],
+                                 self.future_labels, animated=animated)
+        raise ValueError(f"Неизвестный график: {name}")
+
+    def render(self, name, data):
+        """Построение отдельной фигуры графика по готовым данным"""
+        if data is None:
+            return None
+        fig = Figure(figsize=(8, 5), dpi=100)
+        self.create_chart(name, fig).show(data)
+        fig.set_layout_engine('constrained')
+        return fig
+
+    def orders_data(self, period_type='month', width=None):
+        """Данные графика количества нарядов: (подписи периодов, количества) или,
+        если периоды укрупнены под ширину графика width (пикс.), (подписи,
+        количества, подпись оси Y)"""
+        unit, data = self.aggregates.orders_by_scale(period_type, bar_limit(width))
         periods, counts = zip(*data) if data else ([], [])
         
-        # Создаем фигуру с автоматическим масштабированием
-        fig = plt.figure(figsize=(8, 5), dpi=100, constrained_layout=True)
-        ax = fig.add_subplot(111)
-        
-        # Создаем градиент для столбцов
-        colors = np.linspace(0, 1, len(periods))
-        bars = plt.bar(periods, counts, color=plt.cm.Greens(colors))
-        
-        # Форматируем даты на оси X
-        formatted_periods = []
-        for period in periods:
-            if len(period) == 10:  # Для дат формата YYYY-MM-DD
-                date = datetime.strptime(period, '%Y-%m-%d')
-                formatted_periods.append(date.strftime('%d.%m.%Y'))
-            else:
-                formatted_periods.append(period)
-                
-        plt.xticks(range(len(periods)), formatted_periods, rotation=45)
-        plt.xlabel('Период', labelpad=8, color='white')
-        plt.ylabel('Количество нарядов', labelpad=8, color='white')
-        
-        # Добавляем значения над столбцами
-        for bar in bars:
-            height = bar.get_height()
-            plt.text(bar.get_x() + bar.get_width()/2., height,
-                    f'{int(height)}',
-                    ha='center', va='bottom', fontsize=9, color='white')
-        
-        plt.grid(True, linestyle='--', alpha=0.7)
-        return fig
+        # Форматируем даты на оси X (ГГГГ-ММ-ДД -> ДД.ММ.ГГГГ)
+        if unit in ('D', 'W'):
+            periods = [f'{period[8:10]}.{period[5:7]}.{period[:4]}' for period in periods]
+        if unit != PERIOD_TYPES.get(period_type, 'D'):
+            return list(periods), counts, ORDERS_LABELS[unit]
+        return list(periods), counts
 
-    def plot_workshop_productivity(self, start_date, end_date):
-        """Построение круговой диаграммы производительности цехов"""
-        data = self.db.get_workshop_productivity(start_date, end_date)
+    def productivity_data(self, start_date, end_date):
+        """Данные диаграммы производительности цехов: (подписи цехов, производительность)"""
+        data = self.aggregates.workshop_productivity(start_date, end_date)
         if not data:
             return None
-            
         workshops, parts, productivity = zip(*data)
-        
-        plt.close('all')  # Закрываем все предыдущие фигуры
-        # Создаем фигуру с автоматическим масштабированием
-        fig = plt.figure(figsize=(8, 5), dpi=100, constrained_layout=True)
-        ax = fig.add_subplot(111)
-        
-        # Создаем градиентную цветовую схему
-        colors = plt.cm.Spectral(np.linspace(0, 1, len(workshops)))
-        
-        wedges, texts, autotexts = plt.pie(
-            productivity, 
-            labels=[f'Цех {w}' for w in workshops],
-            autopct='%1.1f%%',
-            colors=colors,
-            shadow=False,
-            startangle=90,
-            wedgeprops=dict(width=0.7)
-        )
-        
-        # Улучшаем внешний вид подписей
-        plt.setp(autotexts, size=8, weight="bold")
-        plt.setp(texts, size=9)
-        
-        plt.axis('equal')
-        return fig
+        return [f'Цех {w}' for w in workshops], productivity
 
-    def plot_operation_complexity(self):
-        """Построение гистограммы трудоемкости операций"""
-        data = self.db.get_operation_complexity()
+    def complexity_data(self, width=None):
+        """Данные гистограммы трудоемкости: (коды операций, среднее время).
+
+        Операций не больше, чем помещается в ширину графика width (пикс.), и
+        не больше TOP_OPERATIONS: остальные показываются одним столбцом
+        прочих со средним временем по всем их нарядам.
+        """
+        data = self.aggregates.operation_complexity()
         if not data:
             return None
-            
+        limit = max(min(TOP_OPERATIONS, bar_limit(width)), 2)
+        if len(data) > limit:
+            rest = data[limit - 1:]
+            time_sum = sum(time * count for operation, time, count in rest)
+            count = sum(count for operation, time, count in rest)
+            data = data[:limit - 1] + [(f'{OTHER_OPERATIONS} ({len(rest)})',
+                                        time_sum / count, count)]
         operations, times, counts = zip(*data)
-        
-        plt.close('all')  # Закрываем все предыдущие фигуры
-        # Создаем фигуру с автоматическим масштабированием
-        fig = plt.figure(figsize=(8, 5), dpi=100, constrained_layout=True)
-        ax = fig.add_subplot(111)
-        
-        # Создаем градиент для столбцов
-        colors = plt.cm.cool(np.linspace(0, 1, len(operations)))
-        bars = plt.bar(operations, times, color=colors)
-        
-        # Добавляем свечение
-        for bar in bars:
-            bar.set_alpha(0.8)
-            
-        plt.xticks(rotation=45)
-        plt.xlabel('Код операции', labelpad=8, color='white')
-        plt.ylabel('Среднее время (норма)', labelpad=8, color='white')
-        
-        # Добавляем значения над столбцами
-        for bar in bars:
-            height = bar.get_height()
-            plt.text(bar.get_x() + bar.get_width()/2., height,
-                    f'{height:.1f}',
-                    ha='center', va='bottom', fontsize=9, color='white')
-        
-        plt.grid(True, linestyle='--', alpha=0.7)
-        return fig
+        return operations, times
+
+    def prediction_data(self, workshop_number):
+        """Данные прогноза цеха или текст сообщения.
+
+        Данные - (месяцы, значения, прогноз, нижняя и верхняя граница
+        интервала, подпись модели); пропущенные месяцы - NaN.
+        """
+        months, values, predictions, lower, upper, model = self.workshop_forecast(workshop_number)
+        if not months:
+            if not self.db.get_workshops():
+                return 'Нет данных для построения прогноза'
+            return f'Нет данных для цеха {workshop_number}'
+        if predictions is None:
+            return (f'Для построения прогноза необходимо\n' +
+                    f'минимум {MIN_MONTHS} месяца данных для цеха {workshop_number}\n' +
+                    f'Текущее количество месяцев: {np.count_nonzero(~np.isnan(values))}')
+        return months, values, predictions, lower, upper, MODELS[model]
+
+    def employee_ranking(self, workshop_number, start_date, end_date):
+        """Полный рейтинг сотрудников за период (кэшируется до изменения записей).
+
+        Страницы и смена показателя берутся из кэша без запросов к базе.
+        """
+        key = (workshop_number, start_date and to_iso_date(start_date),
+               end_date and to_iso_date(end_date))
+        version = self.aggregates.data_version()
+        cached = self.employee_rankings.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        rows = self.db.get_employee_ranking(*key, limit=-1)
+        self.employee_rankings = {key: (version, rows)}
+        return rows
+
+    def employee_data(self, workshop_number, start_date, end_date,
+                      metric='parts', page=0):
+        """Данные страницы рейтинга сотрудников.
+
+        Возвращает (номер страницы, всего сотрудников, данные столбчатой
+        диаграммы, данные тепловой карты выполнения нормы по операциям).
+        """
+        column, label = RANKING_METRICS[metric]
+        ranking = sorted(self.employee_ranking(workshop_number, start_date, end_date),
+                         key=lambda row: (-(row[column] or 0), row[0]))
+        if not ranking:
+            message = 'Нет нарядов за выбранный период'
+            return 0, 0, message, message
+        page = min(page, (len(ranking) - 1) // EMPLOYEE_PAGE_SIZE)
+        rows = ranking[page * EMPLOYEE_PAGE_SIZE:(page + 1) * EMPLOYEE_PAGE_SIZE]
+        employees = [row[0] for row in rows]
+        labels = [str(employee) for employee in employees]
+        values = [row[column] or 0 for row in rows]
+
+        # Тепловая карта: операции с наибольшим числом нарядов сотрудников страницы
+        cells = self.db.get_employee_operations(
+            employees, workshop_number, start_date and to_iso_date(start_date),
+            end_date and to_iso_date(end_date))
+        counts = {}
+        for employee, operation, count, fulfillment in cells:
+            counts[operation] = counts.get(operation, 0) + count
+        operations = sorted(sorted(counts), key=lambda op: -counts[op])[:HEATMAP_OPERATIONS]
+        operations.sort()
+        matrix = np.full((len(employees), len(operations)), np.nan)
+        rows_index = {employee: i for i, employee in enumerate(employees)}
+        columns_index = {operation: j for j, operation in enumerate(operations)}
+        for employee, operation, count, fulfillment in cells:
+            if operation in columns_index and fulfillment is not None:
+                matrix[rows_index[employee], columns_index[operation]] = fulfillment
+        return page, len(ranking), (labels, values, label), (labels, operations, matrix)
+
+    @staticmethod
+    def future_labels(months, horizon=FORECAST_HORIZON):
+        """Подписи месяцев прогноза"""
+        return [add_months(months[-1], step) for step in range(1, horizon + 1)]
+
+    def plot_orders_by_period(self, period_type='month'):
+        """Построение графика количества нарядов по периодам"""
+        return self.render('orders', self.orders_data(period_type))
+
+    def plot_workshop_productivity(self, start_date, end_date):
+        """Построение круговой диаграммы производительности цехов"""
+        return self.render('productivity', self.productivity_data(start_date, end_date))
+
+    def plot_operation_complexity(self):
+        """Построение гистограммы трудоемкости операций"""
+        return self.render('complexity', self.complexity_data())
+
+    def workshop_forecast(self, workshop_number):
+        """Прогноз цеха из кэша: (месяцы, значения, прогноз, нижняя граница,
+        верхняя граница, модель); без прогноза последние четыре - None.
+
+        Если прогноза по текущим данным цеха нет, прогнозы строятся сразу
+        для всех цехов: расчет пакетный, и его время почти не зависит от
+        числа цехов.
+        """
+        horizon = self.horizon
+        version = self.aggregates.workshop_version(workshop_number)
+        forecast = self.forecasts.get((workshop_number, version, horizon))
+        if forecast is None:
+            forecast = self.precompute_forecasts(horizon).get(workshop_number)
+        return forecast or ([], np.zeros(0), None, None, None, None)
+
+    def precompute_forecasts(self, horizon=None):
+        """Построение прогнозов всех цехов одной группировкой и одним расчетом;
+        возвращает {цех: прогноз}"""
+        horizon = horizon or self.horizon
+        workshops = self.db.get_workshops()
+        versions = {workshop: self.aggregates.workshop_version(workshop)
+                    for workshop in workshops}
+        forecasts = forecast_series(self.aggregates.monthly_productivity(), horizon)
+        for workshop, forecast in forecasts.items():
+            if workshop in versions:
+                self.forecasts.put((workshop, versions[workshop], horizon), forecast)
+        return forecasts
 
     def predict_workshop_productivity(self, workshop_number):
-        """Прогноз производительности цеха на следующие 2 месяца"""
-        # Получаем все записи и преобразуем в DataFrame
-        records = self.db.get_all_records()
-        if not records:
-            fig = plt.figure(figsize=(8, 5), dpi=100, constrained_layout=True)
-            ax = fig.add_subplot(111)
-            plt.text(0.5, 0.5, 'Нет данных для построения прогноза',
-                    ha='center', va='center', color='white',
-                    fontsize=10, transform=ax.transAxes)
-            plt.axis('off')
-            return fig
-            
-        df = pd.DataFrame(records, columns=['shifr', 'date', 'workshop_number', 
-                                          'employee_number', 'operation_code', 
-                                          'time_norm', 'parts_count'])
-        
-        # Фильтруем данные по цеху
-        df = df[df['workshop_number'] == workshop_number].copy()
-        if df.empty:
-            fig = plt.figure(figsize=(8, 5), dpi=100, constrained_layout=True)
-            ax = fig.add_subplot(111)
-            plt.text(0.5, 0.5, f'Нет данных для цеха {workshop_number}',
-                    ha='center', va='center', color='white',
-                    fontsize=10, transform=ax.transAxes)
-            plt.axis('off')
-            return fig
-            
-        # Преобразуем даты и считаем производительность
-        df['date'] = pd.to_datetime(df['date'])
-        df['productivity'] = df['parts_count'] / df['time_norm']
-        
-        # Группируем по месяцам
-        monthly = df.groupby(df['date'].dt.to_period('M'))['productivity'].mean()
-        if len(monthly) < 3:  # нужно минимум 3 месяца для прогноза
-            fig = plt.figure(figsize=(8, 5), dpi=100, constrained_layout=True)
-            ax = fig.add_subplot(111)
-            plt.text(0.5, 0.5, 
-                    f'Для построения прогноза необходимо\n' +
-                    f'минимум 3 месяца данных для цеха {workshop_number}\n' +
-                    f'Текущее количество месяцев: {len(monthly)}',
-                    ha='center', va='center', color='white',
-                    fontsize=10, transform=ax.transAxes)
-            plt.axis('off')
-            return fig
-            
-        # Подготовка данных для регрессии
-        X = np.arange(len(monthly)).reshape(-1, 1)
-        y = monthly.values
-        
-        # Обучение модели
-        model = LinearRegression()
-        model.fit(X, y)
-        
-        # Прогноз на следующие 2 месяца
-        future_months = np.array([[len(monthly)], [len(monthly) + 1]])
-        predictions = model.predict(future_months)
-        
-        # Построение графика
-        plt.close('all')  # Закрываем все предыдущие фигуры
-        # Создаем фигуру с автоматическим масштабированием
-        fig = plt.figure(figsize=(8, 5), dpi=100, constrained_layout=True)
-        ax = fig.add_subplot(111)
-        
-        # График фактической производительности с градиентной заливкой
-        x = np.arange(len(monthly))
-        plt.plot(x, monthly.values, color='#00ff88', linewidth=2, marker='o',
-                label='Фактическая производительность')
-        plt.fill_between(x, monthly.values, alpha=0.2, color='#00ff88')
-        
-        # Добавляем прогноз
-        last_date = monthly.index[-1]
-        future_dates = [
-            last_date + pd.offsets.MonthEnd(1),
-            last_date + pd.offsets.MonthEnd(2)
-        ]
-        plt.plot([str(last_date), str(future_dates[0]), str(future_dates[1])],
-                [monthly.values[-1], predictions[0], predictions[1]], 
-                color=self.colors[1], linewidth=2, linestyle='--', marker='s',
-                label='Прогноз на 2 месяца')
-        
-        plt.xticks(range(len(monthly)), monthly.index.astype(str), rotation=45, color='white')
-        plt.xlabel('Период', labelpad=8, color='white')
-        plt.ylabel('Производительность\n(детали/норма времени)', 
-                  labelpad=8, color='white')
-        
-        # Добавляем сетку и легенду
-        plt.grid(True, linestyle='--', alpha=0.7)
-        plt.legend(loc='upper left', fontsize=9)
+        """Прогноз производительности цеха на horizon месяцев"""
+        return self.render('prediction', self.prediction_data(workshop_number))
+
+    def build_figure(self, plot_func, args, width, height):
+        """Построение графика и подготовка фигуры к выводу (в фоновом потоке)"""
+        return self.prepare_figure(plot_func(*args), width, height)
+
+    def prepare_figure(self, fig, width, height):
+        """Расчет компоновки и растеризация фигуры заданного размера в пикселях.
+
+        Вызывается в фоновом потоке: после отрисовки через Agg компоновка
+        фиксируется, и потоку интерфейса остается только вывести изображение.
+        """
+        if fig is None:
+            return None
+        FigureCanvasAgg(fig)
+        fig.set_size_inches(width / fig.dpi, height / fig.dpi)
+        fig.canvas.draw()
+        fig.set_layout_engine('none')
         return fig
@@ -0,0 +1,311 @@
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import date
+
+# Формат файлов архива: Parquet (сжатый, по умолчанию) или Arrow IPC
+# (без сжатия, читается отображением в память)
+FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+DEFAULT_FORMAT = 'parquet'
+
+# Расширение временных файлов: файл месяца пишется во временный и подменяет
+# прежний только после фиксации удаления нарядов из базы
+TEMPORARY = '.tmp'
+
+# Форматы периодов для группировки по дате
+PERIOD_FORMATS = {'day': '%Y-%m-%d', 'month': '%Y-%m', 'year': '%Y'}
+
+# Сколько результатов группировок архива запоминается (по периодам и ключам)
+TOTALS_CACHE_SIZE = 64
+
+# Поля нарядов, нужные аналитике
+ANALYTICS_COLUMNS = ('date', 'workshop_number', 'operation_code', 'time_norm', 'parts_count')
+
+
+def import_pyarrow():
+    """Импорт pyarrow при первом обращении к файлам архива"""
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError("Для работы с архивом нарядов требуется пакет pyarrow")
+    return pyarrow
+
+
+def archive_directory(db_name):
+    """Каталог архива базы по умолчанию: <имя файла базы>_archive рядом с ней"""
+    return os.path.splitext(os.path.abspath(db_name))[0] + '_archive'
+
+
+def sync_file(path):
+    """Сброс файла на диск"""
+    with open(path, 'rb') as f:
+        os.fsync(f.fileno())
+
+
+def sync_directory(directory):
+    """Сброс на диск записи каталога о переименовании (где это поддерживается)"""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return  # Windows: каталог нельзя открыть как файл
+    descriptor = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+def next_month(month):
+    """Месяц ГГГГ-ММ, следующий за данным"""
+    year, number = map(int, month.split('-'))
+    year, number = divmod(year * 12 + number, 12)
+    return f'{year:04d}-{number + 1:02d}'
+
+
+class Archive:
+    """Архив закрытых месяцев: по файлу на месяц (ГГГГ-ММ.parquet).
+
+    Запросы за период читают только файлы месяцев периода. Файлы архива
+    не меняются, пока месяц не архивируется повторно, поэтому результаты
+    группировок запоминаются (не больше TOTALS_CACHE_SIZE) до изменения
+    списка файлов или их времени изменения. pyarrow импортируется при первом чтении или записи файла:
+    без архива программа работает и без этого пакета.
+
+    pending - функция, возвращающая временные файлы переносов, которые
+    уже зафиксированы в базе, но еще не подменили файлы месяцев
+    ({месяц: имя временного файла}): до подмены читаются они. Остальные
+    временные файлы - незавершенные переносы, они не читаются.
+
+    Если optional истинно, а pyarrow не установлен, файлы архива при
+    чтении пропускаются (аналитика - только по базе), а причина
+    сохраняется в unavailable; иначе чтение завершается ValueError.
+    """
+
+    def __init__(self, directory, pending=None, optional=False):
+        self.directory = directory
+        self.pending = pending
+        self.optional = optional
+        self.unavailable = None  # почему файлы архива не читаются
+        self.cache = OrderedDict()  # вытесняются давно не использованные (LRU)
+        self.lock = threading.Lock()
+
+    def partitions(self, start_date=None, end_date=None):
+        """Файлы месяцев, пересекающихся с периодом: [(месяц, путь)] по возрастанию"""
+        if not self.directory or not os.path.isdir(self.directory):
+            return []
+        files = {}
+        for name in os.listdir(self.directory):
+            month, extension = os.path.splitext(name)
+            if extension not in FORMATS.values():
+                continue  # в том числе временные файлы
+            if start_date and month < start_date[:7] or end_date and month > end_date[:7]:
+                continue
+            files.setdefault(month, []).append(os.path.join(self.directory, name))
+        pending = self.pending() if self.pending else {}
+        for month, name in pending.items():
+            if start_date and month < start_date[:7] or end_date and month > end_date[:7]:
+                continue
+            path = os.path.join(self.directory, name)
+            if os.path.exists(path):
+                files[month] = [path]
+        result = []
+        for month, paths in sorted(files.items()):
+            if len(paths) > 1:
+                # Месяц в двух форматах (подмена прервана до удаления
+                # прежнего файла): действителен записанный позже
+                paths.sort(key=lambda path: os.stat(path).st_mtime_ns)
+            result.append((month, paths[-1]))
+        if result and self.optional and not self.readable():
+            return []
+        return result
+
+    def readable(self):
+        """Можно ли читать файлы архива (установлен ли pyarrow)"""
+        if self.unavailable is None:
+            try:
+                import_pyarrow()
+            except ValueError as e:
+                self.unavailable = str(e)
+        return self.unavailable is None
+
+    @staticmethod
+    def signature(partitions):
+        """Отпечаток файлов: меняется при перезаписи любого из них"""
+        result = []
+        for _, path in partitions:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            result.append((path, stat.st_mtime_ns, stat.st_size))
+        return tuple(result)
+
+    @staticmethod
+    def schema():
+        """Схема файлов архива (столбцы таблицы naryad)"""
+        pa = import_pyarrow()
+        return pa.schema([('shifr', pa.string()), ('date', pa.date32()),
+                          ('workshop_number', pa.int64()), ('employee_number', pa.int64()),
+                          ('operation_code', pa.string()), ('time_norm', pa.float64()),
+                          ('parts_count', pa.int64())])
+
+    @staticmethod
+    def read_file(path, columns=None):
+        """Чтение файла месяца"""
+        pa = import_pyarrow()
+        if path.endswith(TEMPORARY):
+            path_format = os.path.splitext(path[:-len(TEMPORARY)])[1]
+        else:
+            path_format = os.path.splitext(path)[1]
+        if path_format == FORMATS['parquet']:
+            return pa.parquet.read_table(path, columns=list(columns) if columns else None)
+        with pa.memory_map(path) as source:
+            table = pa.ipc.open_file(source).read_all()
+        return table.select(columns) if columns else table
+
+    def read(self, columns=None, start_date=None, end_date=None):
+        """Наряды архива за период одной таблицей pyarrow (None, если их нет)"""
+        partitions = self.partitions(start_date, end_date)
+        if not partitions:
+            return None
+        pa = import_pyarrow()
+        table = pa.concat_tables([self.read_file(path, columns) for _, path in partitions])
+        # Крайние месяцы периода могут входить в него не целиком
+        pc = pa.compute
+        if start_date:
+            table = table.filter(pc.greater_equal(
+                table['date'], pa.scalar(date.fromisoformat(start_date), pa.date32())))
+        if end_date:
+            table = table.filter(pc.less_equal(
+                table['date'], pa.scalar(date.fromisoformat(end_date), pa.date32())))
+        return table
+
+    def prepare_month(self, month, rows, file_format=DEFAULT_FORMAT):
+        """Запись нарядов месяца (кортежи полей naryad) во временный файл архива.
+
+        Если месяц уже есть в архиве, наряды добавляются к нему; при
+        совпадении шифра остается новая запись. Возвращает (имя временного
+        файла, имя файла месяца) в каталоге архива: файл месяца подменяется
+        методом publish только после фиксации удаления нарядов из базы.
+        """
+        pa = import_pyarrow()
+        pc = pa.compute
+        os.makedirs(self.directory, exist_ok=True)
+        schema = self.schema()
+        columns = list(zip(*rows)) or [[] for _ in schema.names]
+        arrays = [pa.array(values, pa.string() if field.name == 'date' else field.type)
+                  for values, field in zip(columns, schema)]
+        arrays[1] = arrays[1].cast(pa.date32())
+        table = pa.Table.from_arrays(arrays, schema=schema)
+
+        existing = [path for _, path in self.partitions(month + '-01', month + '-01')]
+        if existing:
+            old = pa.concat_tables([self.read_file(path) for path in existing])
+            old = old.filter(pc.invert(pc.is_in(old['shifr'], value_set=table['shifr'])))
+            table = pa.concat_tables([old, table])
+        table = table.sort_by([('date', 'ascending'), ('shifr', 'ascending')])
+
+        # Имя временного файла уникально: переносы разных запусков не путаются
+        target = month + FORMATS[file_format]
+        temporary = f'{month}.{uuid.uuid4().hex[:12]}{FORMATS[file_format]}{TEMPORARY}'
+        path = os.path.join(self.directory, temporary)
+        try:
+            if file_format == 'parquet':
+                pa.parquet.write_table(table, path)
+            else:
+                with pa.OSFile(path, 'wb') as sink:
+                    with pa.ipc.new_file(sink, schema) as writer:
+                        writer.write_table(table)
+            sync_file(path)
+        except BaseException:
+            self.discard(temporary)
+            raise
+        return temporary, target
+
+    def publish(self, temporary, target):
+        """Подмена файла месяца временным файлом (имена в каталоге архива).
+
+        Повторный вызов безвреден: если временного файла уже нет, подмена
+        выполнена раньше, и остается только удалить файл месяца в другом
+        формате, если он уцелел.
+        """
+        path = os.path.join(self.directory, target)
+        temporary_path = os.path.join(self.directory, temporary)
+        if os.path.exists(temporary_path):
+            os.replace(temporary_path, path)
+            sync_directory(self.directory)
+        if not os.path.exists(path):
+            return
+        month = os.path.splitext(target)[0]
+        for extension in FORMATS.values():
+            other = os.path.join(self.directory, month + extension)
+            if other != path and os.path.exists(other):
+                os.remove(other)
+
+    def discard(self, temporary):
+        """Удаление временного файла незавершенного переноса"""
+        path = os.path.join(self.directory, temporary)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def temporary_files(self):
+        """Имена временных файлов в каталоге архива"""
+        if not self.directory or not os.path.isdir(self.directory):
+            return []
+        return [name for name in os.listdir(self.directory) if name.endswith(TEMPORARY)]
+
+    def totals(self, keys, start_date=None, end_date=None):
+        """Суммы нарядов архива по группам за период.
+
+        keys - поля группировки: столбцы naryad или период 'day', 'month',
+        'year'. Возвращает [(значения ключей..., сумма деталей, сумма
+        производительности, сумма нормы времени, количество нарядов)].
+        """
+        partitions = self.partitions(start_date, end_date)
+        if not partitions:
+            return []
+        cache_key = (tuple(keys), start_date, end_date)
+        signature = self.signature(partitions)
+        with self.lock:
+            cached = self.cache.get(cache_key)
+            if cached is not None and cached[0] == signature:
+                self.cache.move_to_end(cache_key)
+                return cached[1]
+
+        pa = import_pyarrow()
+        pc = pa.compute
+        fields = list(ANALYTICS_COLUMNS) + [key for key in keys if key not in PERIOD_FORMATS
+                                            and key not in ANALYTICS_COLUMNS]
+        table = self.read(fields, start_date, end_date)
+        time_norm = table['time_norm']
+        parts = table['parts_count']
+        # Производительность как в сводной таблице: 0 при нулевой норме времени
+        productivity = pc.if_else(pc.equal(time_norm, 0), 0.0,
+                                  pc.divide(pc.cast(parts, pa.float64()), time_norm))
+        columns = {'parts': parts, 'productivity': productivity, 'time_norm': time_norm}
+        for key in keys:
+            if key in PERIOD_FORMATS:
+                columns[key] = pc.strftime(table['date'], format=PERIOD_FORMATS[key])
+            else:
+                columns[key] = table[key]
+        grouped = pa.table(columns).group_by(list(keys)).aggregate([
+            ('parts', 'sum'), ('productivity', 'sum'), ('time_norm', 'sum'), ('parts', 'count')])
+        names = list(keys) + ['parts_sum', 'productivity_sum', 'time_norm_sum', 'parts_count']
+        result = list(zip(*(grouped[name].to_pylist() for name in names)))
+        with self.lock:
+            self.cache[cache_key] = (signature, result)
+            self.cache.move_to_end(cache_key)
+            while len(self.cache) > TOTALS_CACHE_SIZE:
+                self.cache.popitem(last=False)
+        return result
+
+    def iter_columns(self):
+        """Поля нарядов для аналитики по файлам месяцев: (даты datetime64, цехи,
+        коды операций, нормы времени, детали)"""
+        for _, path in self.partitions():
+            table = self.read_file(path, ANALYTICS_COLUMNS)
+            yield (table['date'].to_numpy(), table['workshop_number'].to_numpy(),
+                   table['operation_code'].to_pylist(), table['time_norm'].to_numpy(),
+                   table['parts_count'].to_numpy())
@@ -0,0 +1,620 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from database import Database
+
+# Каталог программы (в нем запускаются замеры времени запуска)
+PROGRAM_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Конфигурации для сравнения: прежняя (журнал DELETE, все запросы на одном
+# соединении) и текущая (WAL, пул соединений для чтения)
+CONFIGURATIONS = {
+    'before': {'journal_mode': 'DELETE', 'pool_size': 0},
+    'after': {'journal_mode': 'WAL', 'pool_size': 4},
+}
+
+
+# Параметры синтетических нарядов по умолчанию
+GENERATOR_DEFAULTS = {
+    'workshops': 20,
+    'employees': 500,
+    'operations': 200,
+    'years': 2,
+    'start_year': 2023,
+}
+
+# Размер пакета при создании базы с синтетическими нарядами
+GENERATE_BATCH = 100000
+
+
+def random_record(rng, shifr, workshops=20, employees=500, operations=200,
+                  years=2, start_year=2023):
+    """Случайный наряд"""
+    day = date(start_year, 1, 1) + timedelta(days=rng.randrange(365 * years))
+    return (shifr, day.isoformat(), rng.randint(1, workshops), rng.randint(1, employees),
+            f'OP{rng.randint(1, operations):03d}', round(rng.uniform(0.1, 8.0), 2),
+            rng.randint(1, 100))
+
+
+def generate_records(rows, seed=0, **params):
+    """Синтетические наряды пакетами по GENERATE_BATCH (одинаковы при одном seed)"""
+    rng = random.Random(seed)
+    for start in range(0, rows, GENERATE_BATCH):
+        yield [random_record(rng, f'S{i:08d}', **params)
+               for i in range(start, min(start + GENERATE_BATCH, rows))]
+
+
+def seed_database(path, rows, journal_mode, seed=0, **params):
+    """Создание базы с исходными нарядами"""
+    db = Database(path, journal_mode=journal_mode, pool_size=0)
+    try:
+        # Индексы строятся один раз после загрузки всех пакетов
+        with db.bulk_load(drop_indexes=rows >= GENERATE_BATCH):
+            for records in generate_records(rows, seed, **params):
+                db.add_records(records, notify=False)
+    finally:
+        db.close()
+
+
+def run_writer(path, config, duration, number, results):
+    """Процесс-писатель: добавление, изменение и удаление нарядов"""
+    rng = random.Random(number)
+    db = Database(path, **config)
+    ops = errors = 0
+    own = []
+    deadline = time.perf_counter() + duration
+    try:
+        while time.perf_counter() < deadline:
+            try:
+                action = rng.random()
+                if action < 0.6 or not own:
+                    record = random_record(rng, f'W{number}-{ops}')
+                    if db.add_record(*record):
+                        own.append(record)
+                elif action < 0.9:
+                    record = rng.choice(own)
+                    db.update_record(record[0], *record[1:6], rng.randint(1, 100))
+                else:
+                    db.delete_record(own.pop(rng.randrange(len(own)))[0])
+                ops += 1
+            except sqlite3.OperationalError:
+                errors += 1
+    finally:
+        db.close()
+    results.put(('write', ops, errors))
+
+
+def run_reader(path, config, duration, number, results):
+    """Процесс-читатель: запросы аналитики и постраничная загрузка таблицы"""
+    rng = random.Random(1000 + number)
+    db = Database(path, **config)
+    ops = errors = 0
+    deadline = time.perf_counter() + duration
+    try:
+        while time.perf_counter() < deadline:
+            try:
+                start = date(2023, 1, 1) + timedelta(days=rng.randrange(600))
+                db.get_workshop_productivity(start.isoformat(),
+                                             (start + timedelta(days=90)).isoformat())
+                db.get_operation_complexity()
+                db.get_records_page((start.isoformat(), ''), 500)
+                ops += 1
+            except sqlite3.OperationalError:
+                errors += 1
+    finally:
+        db.close()
+    results.put(('read', ops, errors))
+
+
+def run_concurrency(config, rows, writers, readers, duration):
+    """Прогон смешанной нагрузки для одной конфигурации"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.db')
+        seed_database(path, rows, config['journal_mode'])
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=run_writer,
+                                             args=(path, config, duration, i, results))
+                     for i in range(writers)]
+        processes += [multiprocessing.Process(target=run_reader,
+                                              args=(path, config, duration, i, results))
+                      for i in range(readers)]
+        for process in processes:
+            process.start()
+        totals = {'write': [0, 0], 'read': [0, 0]}
+        for _ in processes:
+            kind, ops, errors = results.get()
+            totals[kind][0] += ops
+            totals[kind][1] += errors
+        for process in processes:
+            process.join()
+    return {
+        'writes_per_second': round(totals['write'][0] / duration, 1),
+        'reads_per_second': round(totals['read'][0] / duration, 1),
+        'write_errors': totals['write'][1],
+        'read_errors': totals['read'][1],
+    }
+
+
+def concurrency(args):
+    """Сравнение пропускной способности смешанной нагрузки до и после настройки"""
+    report = {}
+    for name, config in CONFIGURATIONS.items():
+        report[name] = run_concurrency(config, args.rows, args.writers,
+                                       args.readers, args.duration)
+        if not args.json:
+            result = report[name]
+            print(f"{name:>7}: запись {result['writes_per_second']} оп/с "
+                  f"(ошибок {result['write_errors']}), "
+                  f"чтение {result['reads_per_second']} оп/с "
+                  f"(ошибок {result['read_errors']})")
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+def import_times(module, limit):
+    """Разбор вывода -X importtime: модули верхних уровней по суммарному времени (мс)"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=PROGRAM_DIR, capture_output=True, text=True, check=True)
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_time, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth <= 1:
+            entries.append({'module': name.strip(), 'depth': depth,
+                            'self_ms': int(self_time) / 1000,
+                            'cumulative_ms': int(cumulative) / 1000})
+    entries.sort(key=lambda entry: entry['cumulative_ms'], reverse=True)
+    return entries[:limit]
+
+
+def first_paint(command, directory):
+    """Время от запуска процесса до первой отрисовки (режим NARYAD_STARTUP_PROBE)"""
+    env = dict(os.environ, NARYAD_STARTUP_PROBE='1', NARYAD_PROBE_START=repr(time.time()))
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    result = subprocess.run(command, cwd=directory, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def build_size(executable):
+    """Размер сборки в байтах: каталог onedir-сборки или один файл onefile"""
+    directory = os.path.dirname(os.path.abspath(executable))
+    if not os.path.isdir(os.path.join(directory, '_internal')):
+        return os.path.getsize(executable)
+    # Символические ссылки на библиотеки Qt не учитываются повторно
+    paths = (os.path.join(root, name)
+             for root, _, names in os.walk(directory) for name in names)
+    return sum(os.path.getsize(path) for path in paths if not os.path.islink(path))
+
+
+def measure_startup(command, rows, repeat):
+    """Лучшее из нескольких измерений времени запуска команды"""
+    with tempfile.TemporaryDirectory() as directory:
+        seed_database(os.path.join(directory, 'naryad.db'), rows, 'WAL')
+        runs = [first_paint(command, directory) for _ in range(repeat)]
+    # Лучшее из повторов: меньше всего зависит от фоновой нагрузки
+    return {
+        'first_paint_s': round(min(run['first_paint'] for run in runs), 3),
+        'window_paint_s': round(min(run['window_paint'] for run in runs), 3),
+        'main_started_s': round(min(run['main_started'] for run in runs), 3),
+        'heavy_modules_at_start': runs[0]['heavy_modules_loaded'],
+    }
+
+
+def startup(args):
+    """Замер времени запуска: время до первой отрисовки и импорт модулей"""
+    report = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'label': args.label,
+        'python': sys.version.split()[0],
+        'rows': args.rows,
+    }
+    if args.executable:
+        # Сравнение собранных программ (например, naryad.spec и naryad_onedir.spec)
+        report['builds'] = [
+            dict(measure_startup([path], args.rows, args.repeat),
+                 executable=path, size_mb=round(build_size(path) / 2 ** 20, 1))
+            for path in args.executable]
+    else:
+        report.update(measure_startup([sys.executable, os.path.join(PROGRAM_DIR, 'main.py')],
+                                      args.rows, args.repeat))
+        report['import_main'] = import_times('main', args.top)
+        report['import_analytics'] = import_times('analytics', args.top)
+    if args.append:
+        with open(args.append, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(report, ensure_ascii=False) + '\n')
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return 0
+    for build in report.get('builds', [report]):
+        if 'executable' in build:
+            print(f"{build['executable']} ({build['size_mb']} МБ):")
+        print(f"  Первая отрисовка (заставка): {build['first_paint_s']} с")
+        print(f"  Отрисовка главного окна: {build['window_paint_s']} с")
+        print(f"  Начало main(): {build['main_started_s']} с")
+        print('  Загружены к отрисовке окна: '
+              + (', '.join(build['heavy_modules_at_start']) or 'нет'))
+    for title, key in (('import main', 'import_main'),
+                       ('import analytics (при открытии вкладки)', 'import_analytics')):
+        if key not in report:
+            continue
+        print(f'{title}:')
+        for entry in report[key]:
+            print(f"  {'  ' * entry['depth']}{entry['module']:<40} "
+                  f"{entry['cumulative_ms']:9.1f} мс")
+    return 0
+
+
+def timings(call, repeat):
+    """Время выполнения call в миллисекундах: лучшее, медиана и худшее из repeat"""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        times.append((time.perf_counter() - started) * 1000)
+    times.sort()
+    return {'min_ms': round(times[0], 3),
+            'median_ms': round(times[len(times) // 2], 3),
+            'max_ms': round(times[-1], 3)}
+
+
+def database_calls(db, rows, params):
+    """Замеряемые методы Database: имя -> функция без аргументов"""
+    middle = f'S{rows // 2:08d}'
+    middle_date = db.get_record(middle)[1] if rows else '2000-01-01'
+    start = f"{params['start_year']}-01-01"
+    end = f"{params['start_year']}-12-31"
+
+    def write_cycle():
+        record = ('BENCH-1', start, 1, 1, 'OP001', 1.0, 1)
+        db.add_record(*record)
+        db.update_record('BENCH-1', end, 2, 2, 'OP002', 2.0, 2)
+        db.delete_record('BENCH-1')
+
+    return {
+        'get_records_page(first)': lambda: db.get_records_page(None, 500),
+        'get_records_page(middle)': lambda: db.get_records_page((middle_date, middle), 500),
+        'get_record': lambda: db.get_record(middle),
+        'estimate_record_count': db.estimate_record_count,
+        'get_workshops': db.get_workshops,
+        'workshop_exists': lambda: db.workshop_exists(1),
+        'get_date_range': db.get_date_range,
+        'get_workshop_productivity': lambda: db.get_workshop_productivity(start, end),
+        'get_workshop_totals': lambda: db.get_workshop_totals(start, end),
+        'get_operation_complexity': db.get_operation_complexity,
+        'get_operation_totals': db.get_operation_totals,
+        'get_orders_by_period(day)': lambda: db.get_orders_by_period('day'),
+        'get_orders_by_period(month)': lambda: db.get_orders_by_period('month'),
+        'get_orders_by_period(year)': lambda: db.get_orders_by_period('year'),
+        'get_employee_count': lambda: db.get_employee_count(1, start, end),
+        'get_employee_ranking': lambda: db.get_employee_ranking(1, start, end, limit=15),
+        'get_employee_ranking(all)': lambda: db.get_employee_ranking(None, start, end,
+                                                                     limit=15),
+        'get_employee_operations': lambda: db.get_employee_operations(
+            list(range(1, 16)), 1, start, end),
+        'search_records(text)': lambda: db.search_records(middle[:-2]),
+        'search_records(broad)': lambda: db.search_records('OP0'),
+        'search_records(filters)': lambda: db.search_records(
+            order_by='time_norm', descending=True, parts_min=50, date_from=start),
+        'add/update/delete_record': write_cycle,
+    }
+
+
+def analytics_calls(analytics, start, end):
+    """Замеряемые построения графиков Analytics (с отрисовкой через Agg)"""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    def plot(method, *args):
+        def call():
+            figure = method(*args)
+            if figure is not None:
+                FigureCanvasAgg(figure).draw()
+        return call
+
+    return {
+        'plot_orders_by_period(day)': plot(analytics.plot_orders_by_period, 'day'),
+        'plot_orders_by_period(month)': plot(analytics.plot_orders_by_period, 'month'),
+        'plot_orders_by_period(year)': plot(analytics.plot_orders_by_period, 'year'),
+        'plot_workshop_productivity': plot(analytics.plot_workshop_productivity,
+                                           start, end),
+        'plot_operation_complexity': plot(analytics.plot_operation_complexity),
+        'predict_workshop_productivity': plot(analytics.predict_workshop_productivity, 1),
+    }
+
+
+def benchmark_analytics(path, repeat, params):
+    """Замер графиков: первый вызов (агрегаты читаются из базы) и повторные"""
+    import matplotlib
+    matplotlib.use('Agg')
+    from analytics import Analytics
+    start = f"{params['start_year']}-01-01"
+    end = f"{params['start_year'] + params['years'] - 1}-12-31"
+    results = {}
+    db = Database(path, read_only=True, pool_size=0)
+    try:
+        for name, call in analytics_calls(Analytics(db), start, end).items():
+            results[name + ' [cold]'] = timings(call, 1)
+        for name, call in analytics_calls(Analytics(db), start, end).items():
+            call()
+            results[name + ' [warm]'] = timings(call, repeat)
+    finally:
+        db.close()
+    return results
+
+
+def table_load(args):
+    """Загрузка таблицы в главном окне (выполняется в отдельном процессе)"""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    sys.path.insert(0, PROGRAM_DIR)
+    from PyQt6.QtWidgets import QApplication
+    app = QApplication([])
+    from main import MainWindow
+    started = time.perf_counter()
+    window = MainWindow()
+    elapsed = round((time.perf_counter() - started) * 1000, 3)
+    # Создание окна (с первой загрузкой таблицы) замеряется один раз
+    report = {'window_init': {'min_ms': elapsed, 'median_ms': elapsed, 'max_ms': elapsed},
+              'load_data': timings(window.load_data, args.repeat)}
+    report['rows_loaded'] = window.table_model.rowCount()
+    window.close()
+    app.processEvents()
+    print(json.dumps(report))
+    return 0
+
+
+def benchmark_table_load(directory, repeat):
+    """Запуск замера загрузки таблицы в каталоге с базой naryad.db"""
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    result = subprocess.run([sys.executable, os.path.join(PROGRAM_DIR, 'benchmark.py'),
+                             'table-load', '--repeat', str(repeat)],
+                            cwd=directory, env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def suite_database(data_dir, rows, seed, params):
+    """Каталог с базой naryad.db для набора параметров (создается один раз)"""
+    name = f"rows{rows}_seed{seed}_" + '_'.join(f'{key}{value}' for key, value in params.items())
+    directory = os.path.join(data_dir, name)
+    path = os.path.join(directory, 'naryad.db')
+    if os.path.exists(path):
+        return path, None
+    os.makedirs(directory, exist_ok=True)
+    started = time.perf_counter()
+    seed_database(path + '.tmp', rows, 'WAL', seed, **params)
+    os.replace(path + '.tmp', path)
+    return path, round(time.perf_counter() - started, 3)
+
+
+def git_commit():
+    """Текущий коммит репозитория программы (None вне git)"""
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROGRAM_DIR,
+                                capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def suite(args):
+    """Набор замеров: методы Database, графики Analytics и загрузка таблицы"""
+    params = {key: getattr(args, key) for key in GENERATOR_DEFAULTS}
+    report = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'label': args.label,
+        'commit': git_commit(),
+        'python': sys.version.split()[0],
+        'sqlite': sqlite3.sqlite_version,
+        'platform': sys.platform,
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'generator': params,
+        'results': {},
+    }
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix='naryad-bench-')
+    for rows in args.rows:
+        path, generate_s = suite_database(data_dir, rows, args.seed, params)
+        result = {'generate_s': generate_s,
+                  'db_size_mb': round(os.path.getsize(path) / 2 ** 20, 1)}
+        db = Database(path, pool_size=0)
+        try:
+            result['database'] = {name: timings(call, args.repeat)
+                                  for name, call in database_calls(db, rows, params).items()}
+        finally:
+            db.close()
+        result['analytics'] = benchmark_analytics(path, args.repeat, params)
+        if not args.skip_gui:
+            result['table_load'] = benchmark_table_load(os.path.dirname(path), args.repeat)
+        report['results'][str(rows)] = result
+        if not args.json:
+            print_suite_result(rows, result)
+    if not args.data_dir:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+def print_suite_result(rows, result):
+    """Вывод результатов набора замеров для одного размера базы"""
+    generated = (f", создана за {result['generate_s']} с"
+                 if result['generate_s'] is not None else '')
+    print(f"{rows} нарядов ({result['db_size_mb']} МБ{generated}):")
+    for group in ('database', 'analytics', 'table_load'):
+        for name, value in result.get(group, {}).items():
+            if isinstance(value, dict):
+                print(f"  {name:<45} {value['median_ms']:10.2f} мс")
+            else:
+                print(f"  {name:<45} {value:>10}")
+
+
+def suite_timings(report):
+    """Медианы замеров отчета: (размер базы, группа, имя) -> мс"""
+    return {(rows, group, name): value['median_ms']
+            for rows, result in report['results'].items()
+            for group in ('database', 'analytics', 'table_load')
+            for name, value in result.get(group, {}).items()
+            if isinstance(value, dict)}
+
+
+def compare(args):
+    """Сравнение двух отчетов набора замеров (например, двух коммитов)"""
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, encoding='utf-8') as f:
+        current = json.load(f)
+    before = suite_timings(baseline)
+    after = suite_timings(current)
+    regressions = 0
+    print(f"{baseline.get('commit') or args.baseline} -> {current.get('commit') or args.current}")
+    for key in sorted(before.keys() & after.keys()):
+        ratio = after[key] / before[key] if before[key] else 1.0
+        # Очень быстрые операции не считаются регрессией из-за шума измерений
+        regression = ratio > 1 + args.threshold and after[key] - before[key] > args.min_ms
+        regressions += regression
+        rows, group, name = key
+        print(f"{'!' if regression else ' '} {rows:>9} {name:<45} "
+              f"{before[key]:10.2f} -> {after[key]:10.2f} мс ({ratio:.2f}x)")
+    print(f'Регрессий: {regressions}')
+    return 1 if regressions else 0
+
+
+def build_parser():
+    """Разбор аргументов командной строки"""
+    parser = argparse.ArgumentParser(
+        description='Замеры производительности системы учета нарядов')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    mixed = commands.add_parser(
+        'concurrency',
+        help='смешанная нагрузка чтения/записи из нескольких процессов')
+    mixed.add_argument('--rows', type=int, default=50000,
+                       help='количество нарядов в исходной базе')
+    mixed.add_argument('--writers', type=int, default=2,
+                       help='количество процессов-писателей')
+    mixed.add_argument('--readers', type=int, default=4,
+                       help='количество процессов-читателей')
+    mixed.add_argument('--duration', type=float, default=5.0,
+                       help='длительность прогона в секундах')
+    mixed.add_argument('--json', action='store_true',
+                       help='вывести результат в формате JSON')
+    mixed.set_defaults(handler=concurrency)
+
+    start = commands.add_parser(
+        'startup', help='время запуска: -X importtime и время до первой отрисовки')
+    start.add_argument('--rows', type=int, default=50000,
+                       help='количество нарядов в базе')
+    start.add_argument('--repeat', type=int, default=3,
+                       help='количество запусков (берется лучший)')
+    start.add_argument('--top', type=int, default=15,
+                       help='сколько модулей показать в разборе импорта')
+    start.add_argument('--label', default='',
+                       help='метка замера (например, номер версии)')
+    start.add_argument('--append', metavar='FILE',
+                       help='дописать результат строкой JSON в файл истории замеров')
+    start.add_argument('--executable', action='append', metavar='PATH',
+                       help='замерить собранную программу вместо запуска из исходного '
+                            'кода (можно указать несколько раз)')
+    start.add_argument('--json', action='store_true',
+                       help='вывести результат в формате JSON')
+    start.set_defaults(handler=startup)
+
+    generate = commands.add_parser(
+        'generate', help='создание базы с синтетическими нарядами')
+    generate.add_argument('path', help='файл создаваемой базы')
+    generate.add_argument('--rows', type=int, default=100000,
+                          help='количество нарядов')
+    generate.add_argument('--seed', type=int, default=0,
+                          help='начальное значение генератора случайных чисел')
+    add_generator_arguments(generate)
+    generate.set_defaults(handler=generate_database)
+
+    benchmark = commands.add_parser(
+        'suite', help='замеры методов Database, графиков Analytics и загрузки таблицы')
+    benchmark.add_argument('--rows', type=int, nargs='+', default=[10000, 100000],
+                           help='размеры баз (количество нарядов), например 10000 1000000')
+    benchmark.add_argument('--seed', type=int, default=0,
+                           help='начальное значение генератора случайных чисел')
+    add_generator_arguments(benchmark)
+    benchmark.add_argument('--repeat', type=int, default=5,
+                           help='количество повторов каждого замера (берется медиана)')
+    benchmark.add_argument('--data-dir',
+                           help='каталог для сгенерированных баз (сохраняются между '
+                                'запусками); по умолчанию временный каталог')
+    benchmark.add_argument('--skip-gui', action='store_true',
+                           help='не замерять загрузку таблицы в главном окне')
+    benchmark.add_argument('--label', default='',
+                           help='метка замера (например, номер версии)')
+    benchmark.add_argument('--output', metavar='FILE',
+                           help='сохранить отчет в файл JSON')
+    benchmark.add_argument('--json', action='store_true',
+                           help='вывести отчет в формате JSON')
+    benchmark.set_defaults(handler=suite)
+
+    comparison = commands.add_parser(
+        'compare', help='сравнение двух отчетов suite (код возврата 1 при регрессии)')
+    comparison.add_argument('baseline', help='отчет JSON для сравнения (прежний коммит)')
+    comparison.add_argument('current', help='отчет JSON текущей версии')
+    comparison.add_argument('--threshold', type=float, default=0.2,
+                            help='допустимое замедление (доля, по умолчанию 0.2)')
+    comparison.add_argument('--min-ms', type=float, default=1.0,
+                            help='минимальная разница в мс, считающаяся регрессией')
+    comparison.set_defaults(handler=compare)
+
+    table = commands.add_parser(
+        'table-load', help='загрузка таблицы в главном окне (запускается командой suite '
+                           'в каталоге с базой naryad.db)')
+    table.add_argument('--repeat', type=int, default=5,
+                       help='количество повторов')
+    table.set_defaults(handler=table_load)
+
+    return parser
+
+
+def add_generator_arguments(parser):
+    """Параметры генератора синтетических нарядов"""
+    parser.add_argument('--workshops', type=int, default=GENERATOR_DEFAULTS['workshops'],
+                        help='количество цехов')
+    parser.add_argument('--employees', type=int, default=GENERATOR_DEFAULTS['employees'],
+                        help='количество сотрудников')
+    parser.add_argument('--operations', type=int, default=GENERATOR_DEFAULTS['operations'],
+                        help='количество операций')
+    parser.add_argument('--years', type=int, default=GENERATOR_DEFAULTS['years'],
+                        help='количество лет истории')
+    parser.add_argument('--start-year', type=int, default=GENERATOR_DEFAULTS['start_year'],
+                        help='первый год истории')
+
+
+def generate_database(args):
+    """Создание базы с синтетическими нарядами"""
+    if os.path.exists(args.path):
+        print(f'Файл уже существует: {args.path}', file=sys.stderr)
+        return 1
+    params = {key: getattr(args, key) for key in GENERATOR_DEFAULTS}
+    started = time.perf_counter()
+    seed_database(args.path, args.rows, 'WAL', args.seed, **params)
+    print(f'Создано нарядов: {args.rows} за {time.perf_counter() - started:.1f} с')
+    return 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,151 @@
+from collections import OrderedDict
+
+from PyQt6 import sip
+from PyQt6.QtCore import QRectF, QTimer, pyqtSignal
+from PyQt6.QtGui import QImage, QPainter
+from PyQt6.QtWidgets import QWidget
+from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg
+
+import profiling
+
+# Пауза после последнего изменения размера, после которой график
+# перерисовывается под новый размер (мс)
+SETTLE_DELAY = 200
+
+# Сколько растров (версия данных x размер) хранится для одного графика
+RASTER_CACHE_SIZE = 4
+
+
+class ChartCanvas(FigureCanvasQTAgg):
+    """Canvas графика с кэшем растра и отрисовкой только видимых графиков.
+
+    Полная отрисовка фигуры откладывается, пока canvas не виден (другая
+    вкладка или часть области прокрутки за пределами экрана), и
+    выполняется при его появлении. Результат каждой отрисовки запоминается
+    по ключу (версия данных графика, размер в пикселях). Пока размер
+    виджета меняется, фигура не перестраивается: выводится растр нужного
+    размера из кэша или последний растр, масштабированный до размера
+    виджета; компоновка пересчитывается и фигура перерисовывается один раз
+    через SETTLE_DELAY мс после последнего изменения размера; тогда же
+    выдается сигнал settled (например, для пересчета детализации данных
+    под новую ширину).
+    """
+
+    settled = pyqtSignal()
+
+    def __init__(self, figure):
+        super().__init__(figure)
+        self.chart = None        # график на фигуре: его версия входит в ключ растра
+        self.rasters = OrderedDict()
+        self.pending = False     # отрисовка отложена до появления на экране
+        self.settle_timer = QTimer(self)
+        self.settle_timer.setSingleShot(True)
+        self.settle_timer.setInterval(SETTLE_DELAY)
+        self.settle_timer.timeout.connect(self.update)
+        self.settle_timer.timeout.connect(self.settled)
+
+    def version(self):
+        """Версия данных графика"""
+        return self.chart.version if self.chart is not None else 0
+
+    def pixel_size(self):
+        """Размер виджета в физических пикселях"""
+        ratio = self.device_pixel_ratio
+        return (int(self.width() * ratio), int(self.height() * ratio))
+
+    def is_exposed(self):
+        """Виден ли canvas хотя бы частично (с учетом области прокрутки)"""
+        return self.isVisible() and not self.visibleRegion().isEmpty()
+
+    def is_resizing(self):
+        """Меняется ли размер виджета (пауза после изменения еще не прошла)"""
+        return self.settle_timer.isActive()
+
+    @property
+    def deferred(self):
+        """Отрисовка отложена или canvas не виден: изменения графика нужно
+        выводить через draw_idle, а не блиттингом"""
+        return self.pending or not self.is_exposed()
+
+    def is_current(self):
+        """Соответствует ли отрисованная фигура данным и размеру виджета"""
+        return not self.pending and self.get_width_height(physical=True) == self.pixel_size()
+
+    def draw(self):
+        """Полная отрисовка; для невидимого canvas и во время изменения
+        размера откладывается"""
+        if not self.is_exposed() or self.is_resizing():
+            self.pending = True
+            return
+        self.pending = False
+        if self.get_width_height(physical=True) != self.pixel_size():
+            self.fit_figure()
+        with profiling.span('FigureCanvas.draw', 'matplotlib'):
+            super().draw()
+        self.remember()
+
+    def blit(self, bbox=None):
+        """Вывод изменившейся области с сохранением нового растра"""
+        super().blit(bbox)
+        self.remember()
+
+    def fit_figure(self):
+        """Размер фигуры по размеру виджета с пересчетом компоновки"""
+        width, height = self.pixel_size()
+        dpi = self.figure.dpi
+        self.figure.set_size_inches(width / dpi, height / dpi, forward=False)
+        if self.chart is not None:
+            self.chart.fit()
+        self.figure.tight_layout()
+
+    def remember(self):
+        """Запоминание отрисованного растра"""
+        if not hasattr(self, 'renderer'):
+            return
+        buffer = memoryview(self.buffer_rgba())
+        image = QImage(int(sip.voidptr(buffer)), buffer.shape[1], buffer.shape[0],
+                       QImage.Format.Format_RGBA8888).copy()
+        key = (self.version(),) + self.get_width_height(physical=True)
+        self.rasters[key] = image
+        self.rasters.move_to_end(key)
+        while len(self.rasters) > RASTER_CACHE_SIZE:
+            self.rasters.popitem(last=False)
+
+    def raster(self):
+        """Растр текущей версии под размер виджета (None, если его нет)"""
+        key = (self.version(),) + self.pixel_size()
+        image = self.rasters.get(key)
+        if image is not None:
+            self.rasters.move_to_end(key)
+        return image
+
+    def resizeEvent(self, event):
+        """Изменение размера: фигура перестраивается после паузы"""
+        QWidget.resizeEvent(self, event)
+        if self.rasters:
+            self.settle_timer.start()
+        else:
+            self.draw_idle()  # первая отрисовка - без ожидания
+            self.settled.emit()
+
+    def paintEvent(self, event):
+        """Вывод фигуры, растра из кэша или масштабированного последнего растра"""
+        if self.is_current():
+            super().paintEvent(event)
+            return
+        image = self.raster()
+        if image is None and not self.is_resizing():
+            self.draw()
+            if self.is_current():
+                super().paintEvent(event)
+                return
+        if image is None and self.rasters:
+            image = next(reversed(self.rasters.values()))
+        painter = QPainter(self)
+        try:
+            painter.eraseRect(event.rect())
+            if image is not None:
+                painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+                painter.drawImage(QRectF(self.rect()), image, QRectF(image.rect()))
+        finally:
+            painter.end()
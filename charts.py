@@ -0,0 +1,404 @@
+import math
+
+import numpy as np
+from matplotlib import colormaps
+from matplotlib.artist import setp
+
+
+class Chart:
+    """График на постоянной фигуре с изменением артистов на месте.
+
+    Артисты создаются при первом выводе и при смене набора категорий (тогда
+    же пересчитывается компоновка). В остальных случаях меняются только их
+    данные: высоты столбцов, углы секторов, координаты линий. Если график
+    привязан к canvas (attach), изменившиеся артисты выводятся блиттингом
+    поверх сохраненного фона, а полная перерисовка выполняется только при
+    изменении масштаба осей. Версия (version) меняется при каждом изменении
+    выведенных данных: по ней canvas различает свои сохраненные растры.
+    """
+
+    # Наименьший шаг подписей оси X (пт)
+    TICK_SPACING = 14
+
+    def __init__(self, figure, animated=False):
+        self.figure = figure
+        self.animated = animated
+        self.ax = figure.add_subplot(111)
+        self.categories = None  # категории, под которые созданы артисты
+        self.dynamic = []       # артисты, изменяемые на месте
+        self.canvas = None
+        self.background = None
+        self.background_size = None
+        self.version = 0
+        self.tick_step = None   # шаг выведенных подписей оси X
+        # Компоновка рассчитывается явно, а не при каждой отрисовке
+        figure.set_layout_engine('none')
+
+    def attach(self, canvas):
+        """Привязка к canvas для вывода изменений блиттингом"""
+        self.canvas = canvas
+        canvas.mpl_connect('draw_event', self.on_draw)
+
+    def on_draw(self, event):
+        """Сохранение фона после полной перерисовки и вывод артистов поверх него"""
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self.background_size = tuple(self.figure.bbox.size)
+        self.draw_dynamic()
+
+    def draw_dynamic(self):
+        """Отрисовка изменяемых артистов"""
+        for artist in self.dynamic:
+            self.ax.draw_artist(artist)
+
+    def show(self, data):
+        """Вывод данных графика или текстового сообщения (строка)"""
+        categories = ('message', data) if isinstance(data, str) else self.categories_of(data)
+        view = (self.ax.get_xlim(), self.ax.get_ylim())
+        relayout = categories != self.categories
+        if relayout:
+            self.ax.clear()
+            self.dynamic = []
+            if isinstance(data, str):
+                self.build_message(data)
+            else:
+                self.build(data)
+                for artist in self.dynamic:
+                    artist.set_animated(self.animated)
+                self.fit()
+            self.categories = categories
+        elif isinstance(data, str):
+            return  # то же сообщение уже выведено
+        else:
+            self.update(data)
+            self.rescale()
+            self.fit()
+        self.version += 1
+        if self.canvas is None:
+            return
+        if relayout:
+            self.figure.tight_layout()
+            self.canvas.draw_idle()
+        elif (self.background is None or getattr(self.canvas, 'deferred', False)
+              or self.background_size != tuple(self.figure.bbox.size)
+              or view != (self.ax.get_xlim(), self.ax.get_ylim())):
+            self.canvas.draw_idle()
+        else:
+            self.canvas.restore_region(self.background)
+            self.draw_dynamic()
+            self.canvas.blit(self.figure.bbox)
+
+    def build_message(self, text):
+        """Текстовое сообщение вместо графика"""
+        self.ax.text(0.5, 0.5, text,
+                     ha='center', va='center', color='white',
+                     fontsize=10, transform=self.ax.transAxes)
+        self.ax.axis('off')
+
+    def categories_of(self, data):
+        """Набор категорий данных: при его изменении артисты создаются заново"""
+        return tuple(data[0])
+
+    def rescale(self):
+        """Пересчет масштаба осей по измененным данным"""
+        self.ax.relim()
+        self.ax.autoscale_view()
+
+    def fit(self):
+        """Подгонка подписей под размер осей (при изменении данных и размера фигуры)"""
+
+    def thin_ticks(self, labels, **style):
+        """Подписи оси X через шаг, при котором они не налезают друг на друга"""
+        points = self.figure.dpi / 72  # пикселей в пункте
+        column = self.ax.bbox.width / len(labels)
+        step = max(math.ceil(self.TICK_SPACING * points / max(column, 1)), 1)
+        if step != self.tick_step:
+            ticks = range(0, len(labels), step)
+            self.ax.set_xticks(ticks, [labels[i] for i in ticks], rotation=45, **style)
+            self.tick_step = step
+
+    def build(self, data):
+        """Создание артистов графика"""
+        raise NotImplementedError
+
+    def update(self, data):
+        """Изменение данных артистов на месте"""
+        raise NotImplementedError
+
+
+class BarChart(Chart):
+    """Столбчатая диаграмма с подписями значений.
+
+    Данные - (подписи, значения) или (подписи, значения, подпись оси Y),
+    если подпись оси меняется вместе с данными. Подписи оси X
+    прореживаются, если не помещаются под столбцами, а подписи значений
+    выводятся, только если они не шире столбцов.
+    """
+
+    # Размер шрифта подписей значений (пт), ширина символа подписи в долях
+    # размера шрифта
+    VALUE_FONT_SIZE = 9
+    CHAR_WIDTH = 0.6
+
+    def __init__(self, figure, colormap, xlabel, ylabel, value_format,
+                 alpha=None, animated=False):
+        super().__init__(figure, animated)
+        self.colormap = colormap
+        self.xlabel = xlabel
+        self.ylabel = ylabel
+        self.value_format = value_format
+        self.alpha = alpha
+        self.bars = []
+        self.value_labels = []
+        self.labels = []
+
+    def categories_of(self, data):
+        """Категории - подписи столбцов и подпись оси Y, если она передана"""
+        return tuple(data[0]) + tuple(data[2:])
+
+    def build(self, data):
+        """Создание столбцов, подписей осей и значений"""
+        labels, values = data[:2]
+        colors = colormaps[self.colormap](np.linspace(0, 1, len(labels)))
+        self.bars = list(self.ax.bar(range(len(labels)), values,
+                                     color=colors, alpha=self.alpha))
+        self.labels = list(labels)
+        self.tick_step = None
+        self.ax.set_xlabel(self.xlabel, labelpad=8, color='white')
+        self.ax.set_ylabel(data[2] if len(data) > 2 else self.ylabel,
+                           labelpad=8, color='white')
+
+        # Значения над столбцами
+        self.value_labels = [
+            self.ax.text(bar.get_x() + bar.get_width() / 2., bar.get_height(),
+                         self.value_format.format(bar.get_height()),
+                         ha='center', va='bottom', fontsize=self.VALUE_FONT_SIZE,
+                         color='white')
+            for bar in self.bars]
+
+        self.ax.grid(True, linestyle='--', alpha=0.7)
+        self.dynamic = self.bars + self.value_labels
+
+    def update(self, data):
+        """Изменение высот столбцов и подписей значений"""
+        for bar, label, value in zip(self.bars, self.value_labels, data[1]):
+            bar.set_height(value)
+            label.set_y(value)
+            label.set_text(self.value_format.format(value))
+
+    def fit(self):
+        """Прореживание подписей оси X и скрытие подписей значений шире столбцов"""
+        if not self.bars:
+            return
+        self.thin_ticks(self.labels)
+        points = self.figure.dpi / 72  # пикселей в пункте
+        column = self.ax.bbox.width / len(self.bars)
+        bar_width = column * self.bars[0].get_width()
+        char_width = self.CHAR_WIDTH * self.VALUE_FONT_SIZE * points
+        # Подписи выводятся все или ни одной: по самой длинной из них
+        fits = max(len(label.get_text()) for label in self.value_labels) * char_width <= bar_width
+        for label in self.value_labels:
+            label.set_visible(fits)
+
+
+class PieChart(Chart):
+    """Кольцевая диаграмма долей; данные - (подписи, значения)"""
+
+    START_ANGLE = 90
+    LABEL_DISTANCE = 1.1
+    PERCENT_DISTANCE = 0.6
+
+    def __init__(self, figure, colormap, animated=False):
+        super().__init__(figure, animated)
+        self.colormap = colormap
+        self.wedges = []
+        self.texts = []
+        self.autotexts = []
+
+    def build(self, data):
+        """Создание секторов и подписей"""
+        labels, values = data
+        colors = colormaps[self.colormap](np.linspace(0, 1, len(labels)))
+        wedges, texts, autotexts = self.ax.pie(
+            values,
+            labels=labels,
+            autopct='%1.1f%%',
+            colors=colors,
+            shadow=False,
+            startangle=self.START_ANGLE,
+            labeldistance=self.LABEL_DISTANCE,
+            pctdistance=self.PERCENT_DISTANCE,
+            wedgeprops=dict(width=0.7)
+        )
+        setp(autotexts, size=8, weight="bold")
+        setp(texts, size=9)
+        self.ax.axis('equal')
+        self.wedges, self.texts, self.autotexts = wedges, texts, autotexts
+        self.dynamic = wedges + texts + autotexts
+
+    def update(self, data):
+        """Пересчет углов секторов и положения подписей (как в Axes.pie)"""
+        values = np.asarray(data[1], dtype=float)
+        fractions = values / values.sum()
+        start = self.START_ANGLE / 360
+        for wedge, text, autotext, fraction in zip(
+                self.wedges, self.texts, self.autotexts, fractions):
+            wedge.set_theta1(360 * start)
+            wedge.set_theta2(360 * (start + fraction))
+            middle = 2 * np.pi * (start + fraction / 2)
+            x, y = np.cos(middle), np.sin(middle)
+            text.set_position((self.LABEL_DISTANCE * x, self.LABEL_DISTANCE * y))
+            text.set_horizontalalignment('left' if x > 0 else 'right')
+            autotext.set_position((self.PERCENT_DISTANCE * x, self.PERCENT_DISTANCE * y))
+            autotext.set_text(f'{100 * fraction:.1f}%')
+            start += fraction
+
+
+class HeatmapChart(Chart):
+    """Тепловая карта со значениями в ячейках; данные - (строки, столбцы, матрица).
+
+    Пустые ячейки матрицы задаются значением NaN.
+    """
+
+    def __init__(self, figure, colormap, xlabel, ylabel, value_format,
+                 animated=False):
+        super().__init__(figure, animated)
+        self.colormap = colormap
+        self.xlabel = xlabel
+        self.ylabel = ylabel
+        self.value_format = value_format
+        self.image = None
+        self.value_labels = []
+
+    def categories_of(self, data):
+        """Категории - подписи строк и столбцов"""
+        return tuple(data[0]), tuple(data[1])
+
+    def build(self, data):
+        """Создание изображения матрицы, подписей осей и значений"""
+        rows, columns, matrix = data
+        self.image = self.ax.imshow(np.ma.masked_invalid(matrix), cmap=self.colormap,
+                                    aspect='auto', interpolation='nearest')
+        self.ax.set_xticks(range(len(columns)))
+        self.ax.set_xticklabels(columns, rotation=45)
+        self.ax.set_yticks(range(len(rows)))
+        self.ax.set_yticklabels(rows)
+        self.ax.set_xlabel(self.xlabel, labelpad=8, color='white')
+        self.ax.set_ylabel(self.ylabel, labelpad=8, color='white')
+        self.ax.grid(False)
+        self.value_labels = [
+            [self.ax.text(j, i, '', ha='center', va='center', fontsize=8, color='black')
+             for j in range(len(columns))]
+            for i in range(len(rows))]
+        self.update(data)
+        self.dynamic = [self.image] + [label for row in self.value_labels for label in row]
+
+    def update(self, data):
+        """Изменение значений матрицы, шкалы цветов и подписей"""
+        matrix = np.asarray(data[2], dtype=float)
+        self.image.set_data(np.ma.masked_invalid(matrix))
+        if np.isfinite(matrix).any():
+            self.image.set_clim(np.nanmin(matrix), np.nanmax(matrix))
+        for row, values in zip(self.value_labels, matrix):
+            for label, value in zip(row, values):
+                label.set_text('' if np.isnan(value) else self.value_format.format(value))
+
+    def rescale(self):
+        """Границы осей заданы размером матрицы и не меняются"""
+
+
+class ForecastChart(Chart):
+    """Фактическая производительность и прогноз с интервалом.
+
+    Данные - (месяцы, значения, прогноз, нижняя граница, верхняя граница,
+    подпись модели); значения пропущенных месяцев - NaN, линия факта на
+    них прерывается.
+    """
+
+    def __init__(self, figure, actual_color, forecast_color, future_labels,
+                 animated=False):
+        super().__init__(figure, animated)
+        self.actual_color = actual_color
+        self.forecast_color = forecast_color
+        self.future_labels = future_labels
+        self.actual = None
+        self.fill = None
+        self.band = None
+        self.band_points = None  # углы интервала прогноза для масштаба осей
+        self.forecast = None
+        self.labels = []
+
+    def categories_of(self, data):
+        """Категории - подписи месяцев, включая месяцы прогноза, и модель"""
+        months, predictions, model = data[0], data[2], data[5]
+        return tuple(months) + tuple(self.future_labels(months, len(predictions))) + (model,)
+
+    def build(self, data):
+        """Создание линий факта и прогноза"""
+        months, values, predictions, lower, upper, model = data
+        x = np.arange(len(months))
+        self.actual, = self.ax.plot(x, values, color=self.actual_color,
+                                    linewidth=2, marker='o',
+                                    label='Фактическая производительность')
+
+        # Прогноз продолжает линию факта от последнего месяца
+        self.forecast, = self.ax.plot(*self.forecast_points(values, predictions),
+                                      color=self.forecast_color, linewidth=2,
+                                      linestyle='--', marker='s',
+                                      label=f'Прогноз на {len(predictions)} мес. ({model})')
+        self.fill, self.band = self.areas(data)
+
+        self.labels = list(months) + self.future_labels(months, len(predictions))
+        self.tick_step = None
+        self.ax.set_xlabel('Период', labelpad=8, color='white')
+        self.ax.set_ylabel('Производительность\n(детали/норма времени)',
+                           labelpad=8, color='white')
+        self.ax.grid(True, linestyle='--', alpha=0.7)
+        self.ax.legend(loc='upper left', fontsize=9)
+        self.dynamic = [self.fill, self.band, self.actual, self.forecast]
+
+    def areas(self, data):
+        """Заливка под линией факта (без пропущенных месяцев) и интервал прогноза"""
+        months, values, predictions, lower, upper, model = data
+        x = np.arange(len(months))
+        fill = self.ax.fill_between(x, values, where=~np.isnan(values), alpha=0.2,
+                                    color=self.actual_color)
+        future = np.arange(len(months), len(months) + len(predictions))
+        band = self.ax.fill_between(future, lower, upper, alpha=0.25,
+                                    color=self.forecast_color, label='Интервал 95 %')
+        self.band_points = np.concatenate([np.column_stack([future, lower]),
+                                           np.column_stack([future, upper])])
+        return fill, band
+
+    def update(self, data):
+        """Изменение данных линий; заливки создаются заново"""
+        months, values, predictions = data[:3]
+        self.actual.set_data(np.arange(len(months)), values)
+        self.forecast.set_data(*self.forecast_points(values, predictions))
+        self.fill.remove()
+        self.band.remove()
+        self.fill, self.band = self.areas(data)
+        for artist in (self.fill, self.band):
+            artist.set_animated(self.animated)
+        self.dynamic = [self.fill, self.band, self.actual, self.forecast]
+
+    def fit(self):
+        """Прореживание подписей месяцев, если они не помещаются"""
+        if self.labels:
+            self.thin_ticks(self.labels, color='white')
+
+    def rescale(self):
+        """Пересчет масштаба с учетом заливки до нуля и интервала
+        (relim не учитывает коллекции)"""
+        self.ax.relim()
+        self.ax.update_datalim([(0, 0)])
+        self.ax.update_datalim(self.band_points)
+        self.ax.autoscale_view()
+
+    @staticmethod
+    def forecast_points(values, predictions):
+        """Точки линии прогноза: последний месяц (если по нему есть данные) и месяцы прогноза"""
+        start = len(values)
+        if len(values) and not np.isnan(values[-1]):
+            return (np.arange(start - 1, start + len(predictions)),
+                    np.concatenate([[values[-1]], predictions]))
+        return np.arange(start, start + len(predictions)), np.asarray(predictions)
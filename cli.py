@@ -0,0 +1,130 @@
+import argparse
+import sqlite3
+import sys
+from datetime import date
+from archive import DEFAULT_FORMAT, FORMATS
+from database import Database
+from importer import import_file
+
+
+def rebuild_summaries(args):
+    """Пересоздание сводной таблицы аналитики"""
+    db = Database(args.db)
+    try:
+        db.rebuild_summaries()
+    finally:
+        db.close()
+    print('Сводная таблица аналитики пересоздана')
+    return 0
+
+
+def rebuild_search_index(args):
+    """Пересоздание полнотекстового индекса поиска"""
+    db = Database(args.db)
+    try:
+        rebuilt = db.rebuild_search_index()
+    finally:
+        db.close()
+    if not rebuilt:
+        print('Индекс поиска недоступен: SQLite собран без FTS5 или триграммного '
+              'токенизатора', file=sys.stderr)
+        return 1
+    print('Индекс поиска пересоздан')
+    return 0
+
+
+def import_records(args):
+    """Импорт нарядов из CSV/XLSX-файлов"""
+    db = Database(args.db)
+    try:
+        for path in args.files:
+            print(f'Импорт {path}')
+            try:
+                report = import_file(db, path, batch_size=args.batch_size)
+            except (OSError, ValueError, sqlite3.Error) as e:
+                print(f'Ошибка: {e}', file=sys.stderr)
+                return 1
+            print(report.summary())
+    finally:
+        db.close()
+    return 0
+
+
+def archive_months(args):
+    """Перенос нарядов закрытых месяцев в архив"""
+    db = Database(args.db, archive_dir=args.archive_dir)
+    try:
+        try:
+            archived = db.archive_months(args.before, args.format)
+        except ValueError as e:
+            print(f'Ошибка: {e}', file=sys.stderr)
+            return 1
+        for month, count in archived:
+            print(f'{month}: перенесено нарядов: {count}')
+        if not archived:
+            print(f'Нет нарядов ранее {args.before}')
+        if args.vacuum:
+            db.vacuum()
+            print('Файл базы сжат')
+    finally:
+        db.close()
+    print(f'Архив: {db.archive.directory}')
+    return 0
+
+
+def month_argument(value):
+    """Месяц ГГГГ-ММ в аргументе командной строки"""
+    try:
+        date.fromisoformat(value + '-01')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'ожидается месяц в формате ГГГГ-ММ: {value}')
+    return value
+
+
+def build_parser():
+    """Разбор аргументов командной строки"""
+    parser = argparse.ArgumentParser(
+        description='Служебные команды системы учета нарядов')
+    parser.add_argument('--db', default='naryad.db',
+                        help='путь к файлу базы данных (по умолчанию naryad.db)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    rebuild = commands.add_parser(
+        'rebuild-summaries',
+        help='пересоздать сводную таблицу аналитики по исходным нарядам')
+    rebuild.set_defaults(handler=rebuild_summaries)
+
+    reindex = commands.add_parser(
+        'rebuild-search-index',
+        help='пересоздать индекс поиска по шифру и коду операции (например, после VACUUM)')
+    reindex.set_defaults(handler=rebuild_search_index)
+
+    importer = commands.add_parser(
+        'import', help='импортировать наряды из CSV/XLSX-файлов')
+    importer.add_argument('files', nargs='+', help='файлы для импорта')
+    importer.add_argument('--batch-size', type=int, default=10000,
+                          help='количество записей в одной транзакции')
+    importer.set_defaults(handler=import_records)
+
+    archive = commands.add_parser(
+        'archive', help='перенести наряды закрытых месяцев из базы в архив (Parquet/Arrow)')
+    archive.add_argument('--before', type=month_argument, default=date.today().strftime('%Y-%m'),
+                         help='первый не архивируемый месяц ГГГГ-ММ (по умолчанию текущий)')
+    archive.add_argument('--format', choices=sorted(FORMATS), default=DEFAULT_FORMAT,
+                         help='формат файлов архива (по умолчанию parquet)')
+    archive.add_argument('--archive-dir',
+                         help='каталог архива (по умолчанию <имя базы>_archive рядом с базой)')
+    archive.add_argument('--vacuum', action='store_true',
+                         help='сжать файл базы после переноса')
+    archive.set_defaults(handler=archive_months)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
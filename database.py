@@ -1,19 +1,574 @@
+import functools
+import os
+import queue
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
+from pathlib import Path
 
+import profiling
+from archive import Archive, DEFAULT_FORMAT, archive_directory, next_month
+
+# Режим журнала по умолчанию. WAL позволяет читателям не блокировать
+# писателя, но требует разделяемой памяти и не работает на сетевых дисках
+# без поддержки блокировок - для них следует передать journal_mode='DELETE'.
+JOURNAL_MODE = 'WAL'
+
+# Настройки каждого соединения
+CONNECTION_PRAGMAS = {
+    'synchronous': 'NORMAL',   # в режиме WAL безопасно и без fsync на каждую транзакцию
+    'cache_size': -65536,      # 64 МБ кэша страниц
+    'mmap_size': 268435456,    # чтение файла базы через отображение в память (256 МБ)
+    'temp_store': 'MEMORY',    # временные B-деревья GROUP BY/ORDER BY в памяти
+}
+
+# Ожидание освобождения базы другим пользователем (секунды) и повторы записи
+BUSY_TIMEOUT = 10.0
+WRITE_RETRIES = 3
+RETRY_DELAY = 0.2
+
+# Размер пула соединений для чтения
+READER_POOL_SIZE = 4
+
+
+def read_only_uri(db_name):
+    """URI файла базы для открытия только на чтение"""
+    return Path(os.path.abspath(db_name)).as_uri() + '?mode=ro'
+
+
+def is_locked_error(error):
+    """Ошибка из-за занятости базы другим соединением"""
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+
+def retry_when_locked(method):
+    """Повтор операции записи, если база занята другим пользователем"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        for attempt in range(WRITE_RETRIES):
+            try:
+                return method(self, *args, **kwargs)
+            except sqlite3.OperationalError as e:
+                if not is_locked_error(e) or attempt == WRITE_RETRIES - 1:
+                    raise
+                if self.conn.in_transaction:
+                    self.conn.rollback()
+                time.sleep(RETRY_DELAY * 2 ** attempt)
+    return wrapper
+
+
+def apply_pragmas(conn):
+    """Применение настроек соединения"""
+    for name, value in CONNECTION_PRAGMAS.items():
+        conn.execute(f'PRAGMA {name} = {value}')
+    conn.create_function('contains_text', 2, contains_text, deterministic=True)
+
+
+def contains_text(value, text):
+    """Функция SQL: содержит ли значение подстроку text без учета регистра.
+
+    text передается уже приведенным к нижнему регистру (casefold), как и
+    в триграммном индексе поиска, в отличие от LIKE это работает и для
+    кириллицы.
+    """
+    return text in str(value).casefold()
+
+
+def add_totals(totals, rows):
+    """Прибавление строк [(ключ, суммы...)] к суммам по ключам {ключ: [суммы]}"""
+    for key, *values in rows:
+        total = totals.get(key)
+        if total is None:
+            totals[key] = values
+        else:
+            for index, value in enumerate(values):
+                total[index] += value
+    return totals
+
+
+class ConnectionPool:
+    """Пул соединений только для чтения.
+
+    Соединения создаются по мере необходимости (не более size) и могут
+    использоваться из любого потока, но одновременно - только одним.
+    """
+
+    def __init__(self, db_name, size=READER_POOL_SIZE):
+        self.db_name = db_name
+        self.size = size
+        self.idle = queue.LifoQueue()
+        self.connections = []
+        self.lock = threading.Lock()
+        self.trace_callback = profiling.SQL_TRACE
+
+    def open(self):
+        """Открытие нового соединения только для чтения"""
+        uri = read_only_uri(self.db_name)
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                               timeout=BUSY_TIMEOUT, isolation_level=None)
+        apply_pragmas(conn)
+        conn.set_trace_callback(self.trace_callback)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Получение свободного соединения на время блока with"""
+        try:
+            conn = self.idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self.lock:
+                if len(self.connections) < self.size:
+                    conn = self.open()
+                    self.connections.append(conn)
+            if conn is None:
+                conn = self.idle.get()
+        try:
+            yield conn
+        finally:
+            self.idle.put(conn)
+
+    def set_trace_callback(self, callback):
+        """Установка функции трассировки SQL для всех соединений пула"""
+        with self.lock:
+            self.trace_callback = callback
+            for conn in self.connections:
+                conn.set_trace_callback(callback)
+
+    def close(self):
+        """Закрытие всех соединений пула"""
+        with self.lock:
+            for conn in self.connections:
+                conn.close()
+            self.connections = []
+            self.idle = queue.LifoQueue()
+
+# Вторичные индексы таблицы naryad: имя -> столбцы. Индексы создаются
+# миграцией 1 и проверяются при каждом запуске, поэтому после массовой
+# загрузки (см. Database.bulk_load) они восстанавливаются даже при сбое.
+NARYAD_INDEXES = {
+    'idx_naryad_date_shifr': '(date, shifr)',
+    'idx_naryad_date_workshop': '(date, workshop_number, parts_count, time_norm)',
+    'idx_naryad_operation': '(operation_code, time_norm)',
+    'idx_naryad_workshop': '(workshop_number)',
+    'idx_naryad_employee': '(employee_number)',
+    # сортировка и фильтры по диапазону в поиске (search_records)
+    'idx_naryad_time_norm': '(time_norm, shifr)',
+    'idx_naryad_parts': '(parts_count, shifr)',
+}
+
+# Заполнение сводной таблицы по дням, цехам и операциям из исходных записей
+SUMMARY_REBUILD_SQL = '''
+    INSERT INTO daily_summary (date, workshop_number, operation_code,
+                               order_count, parts_sum, productivity_sum, time_norm_sum)
+    SELECT date, workshop_number, operation_code,
+           COUNT(*), SUM(parts_count), TOTAL(parts_count * 1.0 / time_norm), SUM(time_norm)
+    FROM naryad
+    GROUP BY date, workshop_number, operation_code
+'''
+
+# Триггер пополнения сводной таблицы при добавлении наряда
+SUMMARY_INSERT_TRIGGER_SQL = '''
+    CREATE TRIGGER IF NOT EXISTS naryad_summary_insert
+    AFTER INSERT ON naryad
+    BEGIN
+        INSERT INTO daily_summary VALUES (
+            NEW.date, NEW.workshop_number, NEW.operation_code, 1,
+            NEW.parts_count, IFNULL(NEW.parts_count * 1.0 / NEW.time_norm, 0), NEW.time_norm)
+        ON CONFLICT (date, workshop_number, operation_code) DO UPDATE SET
+            order_count = order_count + 1,
+            parts_sum = parts_sum + excluded.parts_sum,
+            productivity_sum = productivity_sum + excluded.productivity_sum,
+            time_norm_sum = time_norm_sum + excluded.time_norm_sum;
+    END
+'''
+
+# Добавление в сводную таблицу вклада группы записей
+SUMMARY_UPSERT_SQL = '''
+    INSERT INTO daily_summary VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (date, workshop_number, operation_code) DO UPDATE SET
+        order_count = order_count + excluded.order_count,
+        parts_sum = parts_sum + excluded.parts_sum,
+        productivity_sum = productivity_sum + excluded.productivity_sum,
+        time_norm_sum = time_norm_sum + excluded.time_norm_sum
+'''
+
+# Заполнение сводной таблицы по цехам, сотрудникам, месяцам и операциям
+EMPLOYEE_SUMMARY_REBUILD_SQL = '''
+    INSERT INTO employee_summary (workshop_number, employee_number, month, operation_code,
+                                  order_count, parts_sum, productivity_sum, time_norm_sum)
+    SELECT workshop_number, employee_number, substr(date, 1, 7), operation_code,
+           COUNT(*), SUM(parts_count), TOTAL(parts_count * 1.0 / time_norm), SUM(time_norm)
+    FROM naryad
+    GROUP BY workshop_number, employee_number, substr(date, 1, 7), operation_code
+'''
+
+# Триггер пополнения сводной таблицы сотрудников при добавлении наряда
+EMPLOYEE_SUMMARY_INSERT_TRIGGER_SQL = '''
+    CREATE TRIGGER IF NOT EXISTS naryad_employee_insert
+    AFTER INSERT ON naryad
+    BEGIN
+        INSERT INTO employee_summary VALUES (
+            NEW.workshop_number, NEW.employee_number, substr(NEW.date, 1, 7),
+            NEW.operation_code, 1, NEW.parts_count,
+            IFNULL(NEW.parts_count * 1.0 / NEW.time_norm, 0), NEW.time_norm)
+        ON CONFLICT (workshop_number, employee_number, month, operation_code) DO UPDATE SET
+            order_count = order_count + 1,
+            parts_sum = parts_sum + excluded.parts_sum,
+            productivity_sum = productivity_sum + excluded.productivity_sum,
+            time_norm_sum = time_norm_sum + excluded.time_norm_sum;
+    END
+'''
+
+# Добавление в сводную таблицу сотрудников вклада группы записей
+EMPLOYEE_SUMMARY_UPSERT_SQL = '''
+    INSERT INTO employee_summary VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (workshop_number, employee_number, month, operation_code) DO UPDATE SET
+        order_count = order_count + excluded.order_count,
+        parts_sum = parts_sum + excluded.parts_sum,
+        productivity_sum = productivity_sum + excluded.productivity_sum,
+        time_norm_sum = time_norm_sum + excluded.time_norm_sum
+'''
+
+# Вычитание вклада удаленной или измененной записи из сводной таблицы сотрудников
+EMPLOYEE_SUMMARY_REMOVE_SQL = '''
+               UPDATE employee_summary SET
+                   order_count = order_count - 1,
+                   parts_sum = parts_sum - OLD.parts_count,
+                   productivity_sum = productivity_sum - IFNULL(OLD.parts_count * 1.0 / OLD.time_norm, 0),
+                   time_norm_sum = time_norm_sum - OLD.time_norm
+               WHERE workshop_number = OLD.workshop_number
+                 AND employee_number = OLD.employee_number
+                 AND month = substr(OLD.date, 1, 7) AND operation_code = OLD.operation_code;
+               DELETE FROM employee_summary
+               WHERE workshop_number = OLD.workshop_number
+                 AND employee_number = OLD.employee_number
+                 AND month = substr(OLD.date, 1, 7) AND operation_code = OLD.operation_code
+                 AND order_count <= 0;
+'''
+
+# Триггер вычитания удаленного наряда из сводной таблицы
+SUMMARY_DELETE_TRIGGER_SQL = '''
+    CREATE TRIGGER IF NOT EXISTS naryad_summary_delete
+    AFTER DELETE ON naryad
+    BEGIN
+        UPDATE daily_summary SET
+            order_count = order_count - 1,
+            parts_sum = parts_sum - OLD.parts_count,
+            productivity_sum = productivity_sum - IFNULL(OLD.parts_count * 1.0 / OLD.time_norm, 0),
+            time_norm_sum = time_norm_sum - OLD.time_norm
+        WHERE date = OLD.date AND workshop_number = OLD.workshop_number
+          AND operation_code = OLD.operation_code;
+        DELETE FROM daily_summary
+        WHERE date = OLD.date AND workshop_number = OLD.workshop_number
+          AND operation_code = OLD.operation_code AND order_count <= 0;
+    END
+'''
+
+# Триггер вычитания удаленного наряда из сводной таблицы сотрудников
+EMPLOYEE_SUMMARY_DELETE_TRIGGER_SQL = f'''
+    CREATE TRIGGER IF NOT EXISTS naryad_employee_delete
+    AFTER DELETE ON naryad
+    BEGIN
+{EMPLOYEE_SUMMARY_REMOVE_SQL}
+    END
+'''
+
+# Триггер пополнения индекса поиска при добавлении наряда
+SEARCH_INSERT_TRIGGER_SQL = '''
+    CREATE TRIGGER IF NOT EXISTS naryad_fts_insert AFTER INSERT ON naryad
+    BEGIN
+        INSERT INTO naryad_fts (rowid, shifr, operation_code)
+        VALUES (NEW.rowid, NEW.shifr, NEW.operation_code);
+    END
+'''
+
+# Триггер удаления наряда из индекса поиска
+SEARCH_DELETE_TRIGGER_SQL = '''
+    CREATE TRIGGER IF NOT EXISTS naryad_fts_delete AFTER DELETE ON naryad
+    BEGIN
+        INSERT INTO naryad_fts (naryad_fts, rowid, shifr, operation_code)
+        VALUES ('delete', OLD.rowid, OLD.shifr, OLD.operation_code);
+    END
+'''
+
+# Полнотекстовый индекс для поиска по подстроке шифра и кода операции.
+# Триграммный токенизатор FTS5 (SQLite 3.34+) находит любую подстроку от
+# трех символов без учета регистра. Индекс хранит только триграммы, сами
+# значения читаются из naryad по rowid. Если SQLite собран без FTS5 или
+# триграмм, индекс не создается (миграция 6) и поиск выполняется без него
+# (медленнее).
+SEARCH_INDEX_SQL = [
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS naryad_fts USING fts5(
+           shifr, operation_code,
+           content='naryad', content_rowid='rowid', tokenize='trigram')''',
+    SEARCH_INSERT_TRIGGER_SQL,
+    SEARCH_DELETE_TRIGGER_SQL,
+    '''CREATE TRIGGER IF NOT EXISTS naryad_fts_update
+       AFTER UPDATE OF shifr, operation_code ON naryad
+       WHEN OLD.shifr IS NOT NEW.shifr OR OLD.operation_code IS NOT NEW.operation_code
+       BEGIN
+           INSERT INTO naryad_fts (naryad_fts, rowid, shifr, operation_code)
+           VALUES ('delete', OLD.rowid, OLD.shifr, OLD.operation_code);
+           INSERT INTO naryad_fts (rowid, shifr, operation_code)
+           VALUES (NEW.rowid, NEW.shifr, NEW.operation_code);
+       END''',
+]
+
+def create_search_index(cursor):
+    """Создание полнотекстового индекса поиска (миграция 6), если SQLite его поддерживает"""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'naryad_fts'")
+    if cursor.fetchone():
+        return  # создан до появления миграции
+    cursor.execute('SAVEPOINT search_index')
+    try:
+        for statement in SEARCH_INDEX_SQL:
+            cursor.execute(statement)
+        cursor.execute("INSERT INTO naryad_fts (naryad_fts) VALUES ('rebuild')")
+    except sqlite3.OperationalError:
+        # SQLite без FTS5 или триграммного токенизатора: поиск без индекса
+        cursor.execute('ROLLBACK TO search_index')
+    cursor.execute('RELEASE search_index')
+
+
+# Миграции схемы: элемент с индексом i переводит базу с версии i на версию i + 1.
+# Текущая версия хранится в PRAGMA user_version, уже примененные миграции
+# не изменяются - новые добавляются в конец списка. Шаг миграции - запрос SQL
+# или функция, получающая курсор (для шагов с условиями).
+MIGRATIONS = [
+    # 1: индексы для постраничного просмотра, аналитики и поиска
+    [f'CREATE INDEX IF NOT EXISTS {name} ON naryad {columns}'
+     for name, columns in NARYAD_INDEXES.items()],
+    # 2: сводная таблица для аналитики, поддерживаемая триггерами
+    [
+        '''CREATE TABLE IF NOT EXISTS daily_summary (
+               date TEXT NOT NULL,
+               workshop_number INTEGER NOT NULL,
+               operation_code TEXT NOT NULL,
+               order_count INTEGER NOT NULL,
+               parts_sum INTEGER NOT NULL,
+               productivity_sum REAL NOT NULL,
+               time_norm_sum REAL NOT NULL,
+               PRIMARY KEY (date, workshop_number, operation_code)
+           ) WITHOUT ROWID''',
+        '''CREATE INDEX IF NOT EXISTS idx_daily_summary_workshop
+           ON daily_summary (workshop_number, date)''',
+        '''CREATE INDEX IF NOT EXISTS idx_daily_summary_operation
+           ON daily_summary (operation_code)''',
+        SUMMARY_INSERT_TRIGGER_SQL,
+        SUMMARY_DELETE_TRIGGER_SQL,
+        '''CREATE TRIGGER IF NOT EXISTS naryad_summary_update
+           AFTER UPDATE OF date, workshop_number, operation_code, time_norm, parts_count
+           ON naryad
+           BEGIN
+               UPDATE daily_summary SET
+                   order_count = order_count - 1,
+                   parts_sum = parts_sum - OLD.parts_count,
+                   productivity_sum = productivity_sum - IFNULL(OLD.parts_count * 1.0 / OLD.time_norm, 0),
+                   time_norm_sum = time_norm_sum - OLD.time_norm
+               WHERE date = OLD.date AND workshop_number = OLD.workshop_number
+                 AND operation_code = OLD.operation_code;
+               DELETE FROM daily_summary
+               WHERE date = OLD.date AND workshop_number = OLD.workshop_number
+                 AND operation_code = OLD.operation_code AND order_count <= 0;
+               INSERT INTO daily_summary VALUES (
+                   NEW.date, NEW.workshop_number, NEW.operation_code, 1,
+                   NEW.parts_count, IFNULL(NEW.parts_count * 1.0 / NEW.time_norm, 0), NEW.time_norm)
+               ON CONFLICT (date, workshop_number, operation_code) DO UPDATE SET
+                   order_count = order_count + 1,
+                   parts_sum = parts_sum + excluded.parts_sum,
+                   productivity_sum = productivity_sum + excluded.productivity_sum,
+                   time_norm_sum = time_norm_sum + excluded.time_norm_sum;
+           END''',
+        'DELETE FROM daily_summary',
+        SUMMARY_REBUILD_SQL,
+    ],
+    # 3: приведение дат к виду ГГГГ-ММ-ДД (даты сравниваются как строки);
+    # сводная таблица исправляется триггером изменения записи
+    [
+        '''UPDATE naryad
+           SET date = substr(date, 7, 4) || '-' || substr(date, 4, 2) || '-' || substr(date, 1, 2)
+           WHERE date GLOB '[0-9][0-9].[0-9][0-9].[0-9][0-9][0-9][0-9]' ''',
+        '''UPDATE naryad SET date = substr(date, 1, 10)
+           WHERE date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]?*' ''',
+    ],
+    # 4: сводная таблица по сотрудникам (цех × сотрудник × месяц × операция)
+    [
+        '''CREATE TABLE IF NOT EXISTS employee_summary (
+               workshop_number INTEGER NOT NULL,
+               employee_number INTEGER NOT NULL,
+               month TEXT NOT NULL,
+               operation_code TEXT NOT NULL,
+               order_count INTEGER NOT NULL,
+               parts_sum INTEGER NOT NULL,
+               productivity_sum REAL NOT NULL,
+               time_norm_sum REAL NOT NULL,
+               PRIMARY KEY (workshop_number, employee_number, month, operation_code)
+           ) WITHOUT ROWID''',
+        '''CREATE INDEX IF NOT EXISTS idx_employee_summary_employee
+           ON employee_summary (employee_number, month)''',
+        EMPLOYEE_SUMMARY_INSERT_TRIGGER_SQL,
+        EMPLOYEE_SUMMARY_DELETE_TRIGGER_SQL,
+        f'''CREATE TRIGGER IF NOT EXISTS naryad_employee_update
+           AFTER UPDATE OF date, workshop_number, employee_number, operation_code,
+                           time_norm, parts_count
+           ON naryad
+           BEGIN
+{EMPLOYEE_SUMMARY_REMOVE_SQL}
+               INSERT INTO employee_summary VALUES (
+                   NEW.workshop_number, NEW.employee_number, substr(NEW.date, 1, 7),
+                   NEW.operation_code, 1, NEW.parts_count,
+                   IFNULL(NEW.parts_count * 1.0 / NEW.time_norm, 0), NEW.time_norm)
+               ON CONFLICT (workshop_number, employee_number, month, operation_code) DO UPDATE SET
+                   order_count = order_count + 1,
+                   parts_sum = parts_sum + excluded.parts_sum,
+                   productivity_sum = productivity_sum + excluded.productivity_sum,
+                   time_norm_sum = time_norm_sum + excluded.time_norm_sum;
+           END''',
+        'DELETE FROM employee_summary',
+        EMPLOYEE_SUMMARY_REBUILD_SQL,
+    ],
+    # 5: файлы архива, перенос в которые зафиксирован, но еще не завершен
+    # подменой файлов месяцев (см. Database.archive_months)
+    [
+        '''CREATE TABLE IF NOT EXISTS archive_pending (
+               month TEXT PRIMARY KEY,
+               temporary TEXT NOT NULL,
+               target TEXT NOT NULL
+           )''',
+    ],
+    # 6: полнотекстовый индекс поиска по шифру и коду операции
+    [create_search_index],
+]
+
+# Минимальная длина строки поиска для триграммного индекса; более короткие
+# строки ищутся как начало шифра или кода операции по обычным индексам
+SEARCH_MIN_LENGTH = 3
+
+# Доля удаляемых записей, начиная с которой индекс поиска выгоднее пересоздать,
+# чем удалять из него записи по одной (см. Database.delete_before)
+SEARCH_REBUILD_SHARE = 0.05
+
+# Если под строку поиска подходит не меньше записей, чем BROAD_SEARCH_ROWS,
+# записи читаются по индексу сортировки с проверкой строки в каждой из них:
+# нужная страница набирается быстро, тогда как выборка по индексу поиска
+# потребовала бы сортировки всех совпадений
+BROAD_SEARCH_ROWS = 5000
+
+# Столбцы, по которым можно сортировать результаты поиска
+SORT_COLUMNS = ('shifr', 'date', 'workshop_number', 'employee_number',
+                'operation_code', 'time_norm', 'parts_count')
+
+# Показатели рейтинга сотрудников: параметр -> столбец сортировки
+EMPLOYEE_METRICS = {
+    'parts': 'parts_sum',
+    'orders': 'order_count',
+    'productivity': 'productivity',
+    'fulfillment': 'fulfillment',
+}
+
+# Фильтры поиска: параметр -> условие
+SEARCH_FILTERS = {
+    'date_from': 'date >= ?',
+    'date_to': 'date <= ?',
+    'workshop_number': 'workshop_number = ?',
+    'employee_number': 'employee_number = ?',
+    'time_norm_min': 'time_norm >= ?',
+    'time_norm_max': 'time_norm <= ?',
+    'parts_min': 'parts_count >= ?',
+    'parts_max': 'parts_count <= ?',
+}
+
+
+@profiling.instrument('database', exclude=(
+    'query', 'reader_connection', 'iter_analytics_rows', 'iter_archive_columns',
+    'pending_archive_files', 'set_trace_callback', 'add_listener', 'remove_listener',
+    'notify', 'check_query_plans'))
 class Database:
-    def __init__(self, db_name='naryad.db'):
+    def __init__(self, db_name='naryad.db', read_only=False,
+                 journal_mode=JOURNAL_MODE, pool_size=READER_POOL_SIZE, archive_dir=None,
+                 archive_optional=False):
         self.db_name = db_name
+        self.read_only = read_only
+        self.journal_mode = journal_mode
         self.conn = None
         self.cursor = None
+        self.pool = None
+        self.listeners = []
+        self.search_index = None  # есть ли индекс поиска (проверяется при первом поиске)
         self.connect()
-        self.create_tables()
+        if not read_only:
+            self.create_tables()
+        # Читающие запросы выполняются на соединениях пула и не ждут
+        # основного соединения; для базы в памяти пул невозможен
+        if pool_size and db_name != ':memory:':
+            self.pool = ConnectionPool(db_name, pool_size)
+        # Архив закрытых месяцев: по умолчанию каталог <имя базы>_archive рядом с ней;
+        # archive_optional - без pyarrow аналитика строится только по базе
+        if archive_dir is None and db_name != ':memory:':
+            archive_dir = archive_directory(db_name)
+        self.archive = Archive(archive_dir, self.pending_archive_files, archive_optional)
+        if not read_only:
+            self.finish_archive()
 
     def connect(self):
         """Установка соединения с базой данных"""
-        self.conn = sqlite3.connect(self.db_name)
+        if self.read_only:
+            # Соединение только для чтения может использоваться из фонового потока
+            uri = read_only_uri(self.db_name)
+            self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                                        timeout=BUSY_TIMEOUT)
+        else:
+            self.conn = sqlite3.connect(self.db_name, timeout=BUSY_TIMEOUT)
+            if self.journal_mode:
+                self.conn.execute(f'PRAGMA journal_mode = {self.journal_mode}')
+        apply_pragmas(self.conn)
+        self.conn.set_trace_callback(profiling.SQL_TRACE)
         self.cursor = self.conn.cursor()
 
+    def query(self, sql, params=()):
+        """Выполнение читающего запроса на соединении из пула"""
+        with self.reader_connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    @contextmanager
+    def reader_connection(self):
+        """Соединение для чтения на время блока with (из пула или основное)"""
+        if self.pool is None:
+            yield self.conn
+        else:
+            with self.pool.connection() as conn:
+                yield conn
+
+    def data_version(self):
+        """Версия данных базы (PRAGMA data_version основного соединения).
+
+        Меняется после фиксации изменений любым другим соединением, в том
+        числе из другого процесса. Значения разных соединений несравнимы.
+        """
+        return self.conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def set_trace_callback(self, callback=profiling.SQL_TRACE):
+        """Установка функции трассировки SQL для всех соединений
+        (по умолчанию - трассировка профилирования, если оно включено)"""
+        self.conn.set_trace_callback(callback)
+        if self.pool is not None:
+            self.pool.set_trace_callback(callback)
+
+    def open_reader(self):
+        """Открытие отдельного соединения только для чтения.
+
+        Читающее соединение разделяет с исходным список подписчиков, поэтому
+        подписка через него получает события об изменениях записей.
+        """
+        reader = Database(self.db_name, read_only=True, archive_dir=self.archive.directory,
+                          archive_optional=self.archive.optional)
+        reader.listeners = self.listeners
+        return reader
+
     def create_tables(self):
         """Создание необходимых таблиц"""
         self.cursor.execute('''
@@ -28,7 +583,130 @@ class Database:
             )
         ''')
         self.conn.commit()
+        self.migrate()
+        self.create_indexes()
+        if self.has_search_index():
+            # Виртуальная таблица подключается сразу: если это происходит
+            # при компиляции триггера после изменения схемы другим
+            # соединением, SQLite сообщает «no such table: naryad»
+            self.cursor.execute('SELECT rowid FROM naryad_fts WHERE 0')
+
+    def create_indexes(self):
+        """Создание недостающих вторичных индексов таблицы naryad"""
+        for name, columns in NARYAD_INDEXES.items():
+            self.cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON naryad {columns}')
+        self.conn.commit()
+
+    def has_search_index(self):
+        """Есть ли в базе полнотекстовый индекс поиска"""
+        if self.search_index is None:
+            self.search_index = bool(self.query(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'naryad_fts'"))
+        return self.search_index
+
+    @retry_when_locked
+    def rebuild_search_index(self):
+        """Пересоздание полнотекстового индекса по исходным записям.
+
+        Индекс ссылается на записи по rowid, поэтому его нужно пересоздать
+        после VACUUM, который может изменить rowid записей.
+        """
+        if not self.has_search_index():
+            return False
+        self.cursor.execute("INSERT INTO naryad_fts (naryad_fts) VALUES ('rebuild')")
+        self.conn.commit()
+        return True
+
+    def drop_indexes(self):
+        """Удаление вторичных индексов таблицы naryad"""
+        for name in NARYAD_INDEXES:
+            self.cursor.execute(f'DROP INDEX IF EXISTS {name}')
+        self.conn.commit()
+
+    @contextmanager
+    def bulk_load(self, drop_indexes=True):
+        """Режим массовой загрузки записей.
+
+        При drop_indexes вторичные индексы удаляются на время загрузки и
+        создаются заново в конце: построение индекса по готовой таблице
+        обходится на порядок дешевле, чем его пополнение при каждой вставке.
+        """
+        if drop_indexes:
+            self.drop_indexes()
+        try:
+            yield
+        finally:
+            if drop_indexes:
+                self.create_indexes()
 
+    def estimate_record_count(self):
+        """Быстрая оценка количества записей (без полного подсчета)"""
+        self.cursor.execute('SELECT MAX(rowid) FROM naryad')
+        return self.cursor.fetchone()[0] or 0
+
+    def get_schema_version(self):
+        """Получение версии схемы базы данных"""
+        self.cursor.execute('PRAGMA user_version')
+        return self.cursor.fetchone()[0]
+
+    def migrate(self):
+        """Обновление схемы существующей базы до последней версии"""
+        version = self.get_schema_version()
+        for number, statements in enumerate(MIGRATIONS[version:], version + 1):
+            try:
+                self.cursor.execute('BEGIN')
+                for statement in statements:
+                    if callable(statement):
+                        statement(self.cursor)
+                    else:
+                        self.cursor.execute(statement)
+                self.cursor.execute(f'PRAGMA user_version = {number}')
+                self.conn.commit()
+            except sqlite3.Error:
+                self.conn.rollback()
+                raise
+
+    @retry_when_locked
+    def rebuild_summaries(self):
+        """Пересоздание сводных таблиц аналитики по исходным записям"""
+        try:
+            self.cursor.execute('BEGIN')
+            self.cursor.execute('DELETE FROM daily_summary')
+            self.cursor.execute(SUMMARY_REBUILD_SQL)
+            self.cursor.execute('DELETE FROM employee_summary')
+            self.cursor.execute(EMPLOYEE_SUMMARY_REBUILD_SQL)
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+
+    def add_listener(self, callback):
+        """Подписка на изменения записей.
+
+        callback(event, old, new) вызывается после каждого изменения, где
+        event - 'added', 'updated' или 'removed', а old/new - кортежи записи
+        до и после изменения (None, если записи нет). После пакетных
+        изменений приходит событие 'reloaded' (old и new равны None):
+        подписчик должен перечитать данные целиком.
+        """
+        self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """Отписка от изменений записей"""
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def notify(self, event, old, new):
+        """Оповещение подписчиков об изменении записи"""
+        for callback in list(self.listeners):
+            callback(event, old, new)
+
+    def get_record(self, shifr):
+        """Получение записи по шифру"""
+        self.cursor.execute('SELECT * FROM naryad WHERE shifr = ?', (shifr,))
+        return self.cursor.fetchone()
+
+    @retry_when_locked
     def add_record(self, shifr, date, workshop_number, employee_number, 
                   operation_code, time_norm, parts_count):
         """Добавление новой записи"""
@@ -38,18 +716,111 @@ class Database:
             ''', (shifr, date, workshop_number, employee_number, 
                  operation_code, time_norm, parts_count))
             self.conn.commit()
-            return True
         except sqlite3.IntegrityError:
             return False
+        self.notify('added', None, (shifr, date, workshop_number, employee_number,
+                                    operation_code, time_norm, parts_count))
+        return True
+
+    @retry_when_locked
+    def add_records(self, records, notify=True):
+        """Пакетное добавление записей в одной транзакции.
+
+        Записи с шифрами, которые уже есть в базе или повторяются в пакете,
+        пропускаются. Возвращает (количество добавленных записей, список
+        пропущенных шифров). Вместо событий по каждой записи подписчики
+        получают одно событие 'reloaded'.
+        """
+        try:
+            # Блокировка на запись берется сразу, чтобы между проверкой
+            # шифров и вставкой никто не добавил записи с теми же шифрами
+            self.cursor.execute('BEGIN IMMEDIATE')
+            existing = set()
+            shifrs = [record[0] for record in records]
+            for i in range(0, len(shifrs), 500):
+                chunk = shifrs[i:i + 500]
+                placeholders = ', '.join('?' * len(chunk))
+                self.cursor.execute(
+                    f'SELECT shifr FROM naryad WHERE shifr IN ({placeholders})', chunk)
+                existing.update(row[0] for row in self.cursor.fetchall())
+
+            fresh = []
+            duplicates = []
+            summary = {}
+            employee_summary = {}
+            for record in records:
+                shifr, date, workshop_number, employee_number, \
+                    operation_code, time_norm, parts_count = record
+                if shifr in existing:
+                    duplicates.append(shifr)
+                    continue
+                existing.add(shifr)
+                fresh.append(record)
+                totals = summary.setdefault((date, workshop_number, operation_code),
+                                            [0, 0, 0.0, 0.0])
+                totals[0] += 1
+                totals[1] += parts_count
+                totals[2] += parts_count / time_norm if time_norm else 0.0
+                totals[3] += time_norm
+                totals = employee_summary.setdefault(
+                    (workshop_number, employee_number, date[:7], operation_code),
+                    [0, 0, 0.0, 0.0])
+                totals[0] += 1
+                totals[1] += parts_count
+                totals[2] += parts_count / time_norm if time_norm else 0.0
+                totals[3] += time_norm
+
+            # Построчные триггеры сводных таблиц и индекса поиска на время
+            # пакета снимаются: вклад пакета добавляется агрегированными
+            # вставками, а в индекс поиска - одной выборкой новых записей
+            # (rowid больше прежнего максимума). Все это происходит в одной
+            # транзакции, поэтому другие соединения не видят базу без триггеров.
+            search_index = self.has_search_index()
+            last_rowid = self.estimate_record_count()
+            self.cursor.execute('DROP TRIGGER IF EXISTS naryad_summary_insert')
+            self.cursor.execute('DROP TRIGGER IF EXISTS naryad_employee_insert')
+            if search_index:
+                self.cursor.execute('DROP TRIGGER IF EXISTS naryad_fts_insert')
+            # Вставка в порядке дат уменьшает число затрагиваемых страниц индексов
+            fresh.sort(key=lambda record: (record[1], record[0]))
+            self.cursor.executemany('''
+                INSERT INTO naryad VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', fresh)
+            self.cursor.executemany(SUMMARY_UPSERT_SQL,
+                                    [key + tuple(totals) for key, totals in summary.items()])
+            self.cursor.execute(SUMMARY_INSERT_TRIGGER_SQL)
+            self.cursor.executemany(EMPLOYEE_SUMMARY_UPSERT_SQL,
+                                    [key + tuple(totals)
+                                     for key, totals in employee_summary.items()])
+            self.cursor.execute(EMPLOYEE_SUMMARY_INSERT_TRIGGER_SQL)
+            if search_index:
+                self.cursor.execute('''
+                    INSERT INTO naryad_fts (rowid, shifr, operation_code)
+                    SELECT rowid, shifr, operation_code FROM naryad WHERE rowid > ?
+                ''', (last_rowid,))
+                self.cursor.execute(SEARCH_INSERT_TRIGGER_SQL)
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+        if notify and fresh:
+            self.notify('reloaded', None, None)
+        return len(fresh), duplicates
 
+    @retry_when_locked
     def delete_record(self, shifr):
         """Удаление записи по шифру"""
+        old = self.get_record(shifr)
         self.cursor.execute('DELETE FROM naryad WHERE shifr = ?', (shifr,))
         self.conn.commit()
+        if old:
+            self.notify('removed', old, None)
 
+    @retry_when_locked
     def update_record(self, shifr, date, workshop_number, employee_number, 
                      operation_code, time_norm, parts_count):
         """Обновление существующей записи"""
+        old = self.get_record(shifr)
         self.cursor.execute('''
             UPDATE naryad 
             SET date = ?, workshop_number = ?, employee_number = ?, 
@@ -58,52 +829,494 @@ class Database:
         ''', (date, workshop_number, employee_number, operation_code, 
               time_norm, parts_count, shifr))
         self.conn.commit()
+        if old:
+            self.notify('updated', old, (shifr, date, workshop_number, employee_number,
+                                         operation_code, time_norm, parts_count))
 
-    def search_records(self, **kwargs):
-        """Поиск записей по различным параметрам"""
-        query = 'SELECT * FROM naryad WHERE 1=1'
+    def search_conditions(self, text='', broad=False, **filters):
+        """Условие WHERE и параметры поиска (см. search_records).
+
+        При broad строка поиска проверяется в каждой записи, а не выбирается
+        по индексу - так запрос может идти по индексу сортировки.
+        """
+        conditions = []
         params = []
-        
-        for key, value in kwargs.items():
-            if value:
-                query += f' AND {key} = ?'
+        text = text.strip()
+        if len(text) < SEARCH_MIN_LENGTH and text:
+            # Начало шифра или кода операции - диапазон по индексам этих
+            # столбцов (унарный плюс отключает индекс)
+            plus = '+' if broad else ''
+            conditions.append(f'(({plus}shifr >= ? AND {plus}shifr < ?) '
+                              f'OR ({plus}operation_code >= ? AND {plus}operation_code < ?))')
+            params += [text, text + '\uffff'] * 2
+        elif text and not broad and self.has_search_index():
+            conditions.append(
+                'rowid IN (SELECT rowid FROM naryad_fts WHERE naryad_fts MATCH ?)')
+            params.append(self.search_phrase(text))
+        elif text:
+            conditions.append('(contains_text(shifr, ?) OR contains_text(operation_code, ?))')
+            params += [text.casefold()] * 2
+        for name, value in filters.items():
+            if name not in SEARCH_FILTERS:
+                raise ValueError(f"Неизвестный фильтр поиска: {name}")
+            if value is not None and value != '':
+                conditions.append(SEARCH_FILTERS[name])
                 params.append(value)
-        
-        self.cursor.execute(query, params)
-        return self.cursor.fetchall()
+        return ' AND '.join(conditions) or '1', params
+
+    @staticmethod
+    def search_phrase(text):
+        """Строка поиска как фраза FTS5 (для триграмм - поиск подстроки)"""
+        return '"' + text.replace('"', '""') + '"'
+
+    def is_broad_search(self, text):
+        """Подходит ли под строку поиска не меньше BROAD_SEARCH_ROWS записей"""
+        text = text.strip()
+        if len(text) < SEARCH_MIN_LENGTH and text:
+            where, params = self.search_conditions(text)
+            sql = f'SELECT 1 FROM naryad WHERE {where}'
+        elif text and self.has_search_index():
+            sql = 'SELECT 1 FROM naryad_fts WHERE naryad_fts MATCH ?'
+            params = [self.search_phrase(text)]
+        else:
+            # Без индекса строка и так проверяется в каждой записи
+            return False
+        # Подсчет останавливается на пороге и не зависит от размера таблицы
+        count = self.query(f'SELECT COUNT(*) FROM ({sql} LIMIT ?)',
+                           params + [BROAD_SEARCH_ROWS])[0][0]
+        return count >= BROAD_SEARCH_ROWS
+
+    def search_records(self, text='', order_by='date', descending=False,
+                       limit=500, offset=0, **filters):
+        """Поиск записей с фильтрами, сортировкой и постраничной выдачей.
+
+        text ищется как подстрока шифра или кода операции без учета
+        регистра (строки короче SEARCH_MIN_LENGTH - как начало шифра или
+        кода). Фильтры - ключи SEARCH_FILTERS, пустые значения пропускаются.
+        order_by - один из SORT_COLUMNS, записи с равными значениями
+        упорядочиваются по шифру.
+        """
+        if order_by not in SORT_COLUMNS:
+            raise ValueError(f"Недопустимый столбец сортировки: {order_by}")
+        where, params = self.search_conditions(text, self.is_broad_search(text), **filters)
+        direction = 'DESC' if descending else 'ASC'
+        order = f'{order_by} {direction}'
+        if order_by != 'shifr':
+            order += f', shifr {direction}'
+        return self.query(f'''
+            SELECT * FROM naryad
+            WHERE {where}
+            ORDER BY {order}
+            LIMIT ? OFFSET ?
+        ''', params + [limit, offset])
 
     def get_all_records(self):
         """Получение всех записей"""
-        self.cursor.execute('SELECT * FROM naryad')
-        return self.cursor.fetchall()
+        return self.query('SELECT * FROM naryad')
+
+    def iter_analytics_rows(self, batch_size=100000):
+        """Потоковое чтение полей нарядов для аналитики пачками по batch_size строк:
+        [(дата, цех, код операции, норма времени, количество деталей)]"""
+        with self.reader_connection() as conn:
+            cursor = conn.execute('''
+                SELECT date, workshop_number, operation_code, time_norm, parts_count
+                FROM naryad
+            ''')
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield rows
+
+    def iter_archive_columns(self):
+        """Поля нарядов архива для аналитики по файлам месяцев (см. Archive.iter_columns)"""
+        return self.archive.iter_columns()
+
+    @retry_when_locked
+    def archive_months(self, before_month, file_format=DEFAULT_FORMAT):
+        """Перенос нарядов закрытых месяцев (до before_month ГГГГ-ММ) в архив.
+
+        Все месяцы переносятся одной транзакцией: наряды каждого месяца
+        записываются во временный файл (со сбросом на диск), в той же
+        транзакции, что и удаление нарядов из базы, временные файлы
+        записываются в таблицу archive_pending, и только после фиксации
+        они подменяют файлы месяцев. При ошибке до фиксации база и архив
+        остаются прежними; если подмена прервана после фиксации, ее
+        завершает следующее открытие базы, а до тех пор читаются временные
+        файлы. Возвращает [(месяц, количество нарядов)].
+        """
+        end_date = before_month + '-01'
+        archived = []
+        prepared = []
+        try:
+            # Блокировка записи: до удаления в месяцы не добавятся новые
+            # наряды, и других переносов сейчас нет - временные файлы, не
+            # записанные в archive_pending, остались от прерванных переносов
+            self.cursor.execute('BEGIN IMMEDIATE')
+            self.finish_archive(commit=False)
+            for name in self.archive.temporary_files():
+                self.archive.discard(name)
+            self.cursor.execute('''
+                SELECT DISTINCT substr(date, 1, 7) FROM daily_summary
+                WHERE date < ?
+                ORDER BY 1
+            ''', (end_date,))
+            months = [row[0] for row in self.cursor.fetchall()]
+            for month in months:
+                self.cursor.execute('SELECT * FROM naryad WHERE date >= ? AND date < ?',
+                                    (month + '-01', next_month(month) + '-01'))
+                rows = self.cursor.fetchall()
+                temporary, target = self.archive.prepare_month(month, rows, file_format)
+                prepared.append(temporary)
+                self.cursor.execute('INSERT OR REPLACE INTO archive_pending VALUES (?, ?, ?)',
+                                    (month, temporary, target))
+                archived.append((month, len(rows)))
+            if archived:
+                self.delete_before(end_date, sum(count for _, count in archived))
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            for temporary in prepared:
+                self.archive.discard(temporary)
+            raise
+        self.finish_archive()
+        if archived:
+            self.notify('reloaded', None, None)
+        return archived
+
+    def pending_archive_files(self):
+        """Временные файлы зафиксированных, но не завершенных переносов в
+        архив: {месяц: имя файла}"""
+        try:
+            return dict(self.query('SELECT month, temporary FROM archive_pending'))
+        except sqlite3.OperationalError:
+            return {}  # база старой версии, открытая только для чтения
+
+    def finish_archive(self, commit=True):
+        """Подмена файлов месяцев временными файлами зафиксированных переносов.
+
+        Вызывается после фиксации переноса и при открытии базы (если
+        программа была прервана между фиксацией и подменой); повторная
+        подмена безвредна. Если база занята, записи archive_pending
+        удаляются при следующем вызове.
+        """
+        pending = self.cursor.execute(
+            'SELECT month, temporary, target FROM archive_pending').fetchall()
+        for month, temporary, target in pending:
+            self.archive.publish(temporary, target)
+        if not pending:
+            return
+        try:
+            self.cursor.executemany(
+                'DELETE FROM archive_pending WHERE month = ? AND temporary = ?',
+                [(month, temporary) for month, temporary, target in pending])
+            if commit:
+                self.conn.commit()
+        except sqlite3.OperationalError as e:
+            if not is_locked_error(e) or not commit:
+                raise
+            self.conn.rollback()
+
+    def delete_before(self, end_date, count):
+        """Удаление count нарядов с датой раньше end_date в открытой транзакции.
+
+        Как и в add_records, построчные триггеры на время удаления
+        снимаются: месяцы уходят из базы целиком, поэтому их строки сводных
+        таблиц удаляются напрямую. Удаление записи из триграммного индекса
+        поиска на порядок дороже ее индексации, поэтому при удалении
+        заметной доли записей индекс пересоздается целиком.
+        """
+        search_index = self.has_search_index()
+        rebuild_search = (search_index and
+                          count >= SEARCH_REBUILD_SHARE * self.estimate_record_count())
+        self.cursor.execute('DROP TRIGGER IF EXISTS naryad_summary_delete')
+        self.cursor.execute('DROP TRIGGER IF EXISTS naryad_employee_delete')
+        if search_index:
+            self.cursor.execute('DROP TRIGGER IF EXISTS naryad_fts_delete')
+        if search_index and not rebuild_search:
+            self.cursor.execute('''
+                INSERT INTO naryad_fts (naryad_fts, rowid, shifr, operation_code)
+                SELECT 'delete', rowid, shifr, operation_code FROM naryad
+                WHERE date < ?
+            ''', (end_date,))
+        self.cursor.execute('DELETE FROM naryad WHERE date < ?', (end_date,))
+        self.cursor.execute('DELETE FROM daily_summary WHERE date < ?', (end_date,))
+        self.cursor.execute('DELETE FROM employee_summary WHERE month < ?', (end_date[:7],))
+        self.cursor.execute(SUMMARY_DELETE_TRIGGER_SQL)
+        self.cursor.execute(EMPLOYEE_SUMMARY_DELETE_TRIGGER_SQL)
+        if search_index:
+            self.cursor.execute(SEARCH_DELETE_TRIGGER_SQL)
+        if rebuild_search:
+            self.cursor.execute("INSERT INTO naryad_fts (naryad_fts) VALUES ('rebuild')")
+
+    def vacuum(self):
+        """Сжатие файла базы (VACUUM) с пересозданием индекса поиска"""
+        self.cursor.execute('VACUUM')
+        self.rebuild_search_index()
+
+    def get_records_page(self, after=None, limit=500):
+        """Получение страницы записей (keyset-пагинация по дате и шифру)"""
+        if after is None:
+            return self.query('''
+                SELECT * FROM naryad
+                ORDER BY date, shifr
+                LIMIT ?
+            ''', (limit,))
+        else:
+            after_date, after_shifr = after
+            return self.query('''
+                SELECT * FROM naryad
+                WHERE (date, shifr) > (?, ?)
+                ORDER BY date, shifr
+                LIMIT ?
+            ''', (after_date, after_shifr, limit))
+
+    def get_workshops(self):
+        """Получение списка номеров цехов (с учетом архива)"""
+        rows = self.query('''
+            SELECT DISTINCT workshop_number FROM daily_summary
+            ORDER BY workshop_number
+        ''')
+        archived = {row[0] for row in self.archive.totals(('workshop_number',))}
+        if archived:
+            return sorted(archived.union(row[0] for row in rows))
+        return [row[0] for row in rows]
+
+    def workshop_exists(self, workshop_number):
+        """Проверка наличия записей для цеха (с учетом архива)"""
+        return bool(self.query('''
+            SELECT 1 FROM daily_summary WHERE workshop_number = ? LIMIT 1
+        ''', (workshop_number,))) or any(
+            row[0] == workshop_number for row in self.archive.totals(('workshop_number',)))
 
     def get_workshop_productivity(self, start_date, end_date):
-        """Получение производительности цехов за период"""
-        self.cursor.execute('''
+        """Получение производительности цехов за период (с учетом архива)"""
+        archived = self.archive.totals(('workshop_number',), start_date, end_date)
+        if archived:
+            totals = add_totals({}, self.get_workshop_totals(start_date, end_date))
+            add_totals(totals, [(workshop, parts, productivity, count)
+                                for workshop, parts, productivity, _, count in archived])
+            rows = [(workshop, parts, productivity / count)
+                    for workshop, (parts, productivity, count) in totals.items()]
+            return sorted(rows, key=lambda row: row[2], reverse=True)
+        return self.query('''
             SELECT workshop_number, 
-                   SUM(parts_count) as total_parts,
-                   AVG(parts_count * 1.0 / time_norm) as productivity
-            FROM naryad
+                   SUM(parts_sum) as total_parts,
+                   SUM(productivity_sum) / SUM(order_count) as productivity
+            FROM daily_summary
             WHERE date BETWEEN ? AND ?
             GROUP BY workshop_number
             ORDER BY productivity DESC
         ''', (start_date, end_date))
-        return self.cursor.fetchall()
 
     def get_operation_complexity(self):
-        """Получение трудоемкости операций"""
-        self.cursor.execute('''
+        """Получение трудоемкости операций (с учетом архива)"""
+        archived = self.archive.totals(('operation_code',))
+        if archived:
+            totals = add_totals({}, self.get_operation_totals())
+            add_totals(totals, [(operation, time_sum, count)
+                                for operation, _, _, time_sum, count in archived])
+            rows = [(operation, time_sum / count, count)
+                    for operation, (time_sum, count) in totals.items()]
+            return sorted(rows, key=lambda row: row[1], reverse=True)
+        return self.query('''
             SELECT operation_code,
-                   AVG(time_norm) as avg_time,
-                   COUNT(*) as operation_count
-            FROM naryad
+                   SUM(time_norm_sum) / SUM(order_count) as avg_time,
+                   SUM(order_count) as operation_count
+            FROM daily_summary
             GROUP BY operation_code
             ORDER BY avg_time DESC
         ''')
-        return self.cursor.fetchall()
+
+    def get_workshop_totals(self, start_date, end_date):
+        """Получение сумм по цехам за период (без архива)"""
+        return self.query('''
+            SELECT workshop_number,
+                   SUM(parts_sum) as total_parts,
+                   SUM(productivity_sum) as productivity_sum,
+                   SUM(order_count) as record_count
+            FROM daily_summary
+            WHERE date BETWEEN ? AND ?
+            GROUP BY workshop_number
+        ''', (start_date, end_date))
+
+    def get_date_range(self):
+        """Получение первой и последней даты нарядов (None, если нарядов нет; с учетом архива)"""
+        first, last = self.query('SELECT MIN(date), MAX(date) FROM daily_summary')[0]
+        days = [row[0] for row in self.archive.totals(('day',))]
+        if first is not None:
+            days += [first, last]
+        if not days:
+            return first, last
+        return min(days), max(days)
+
+    @staticmethod
+    def employee_scope(workshop_number=None, start_date=None, end_date=None):
+        """Условие WHERE и параметры выборки из сводной таблицы сотрудников.
+
+        Период задается датами ГГГГ-ММ-ДД и округляется до целых месяцев.
+        """
+        conditions = []
+        params = []
+        if workshop_number is not None:
+            conditions.append('workshop_number = ?')
+            params.append(workshop_number)
+        if start_date:
+            conditions.append('month >= ?')
+            params.append(start_date[:7])
+        if end_date:
+            conditions.append('month <= ?')
+            params.append(end_date[:7])
+        return ' AND '.join(conditions) or '1', params
+
+    def get_employee_count(self, workshop_number=None, start_date=None, end_date=None):
+        """Количество сотрудников с нарядами (для постраничного рейтинга; с учетом архива)"""
+        archived = self.archived_employee_totals(workshop_number, start_date, end_date)
+        if archived:
+            totals = self.employee_operation_totals(workshop_number, start_date, end_date,
+                                                    archived)
+            return len({employee for employee, _ in totals})
+        where, params = self.employee_scope(workshop_number, start_date, end_date)
+        return self.query(f'''
+            SELECT COUNT(DISTINCT employee_number) FROM employee_summary WHERE {where}
+        ''', params)[0][0]
+
+    def archived_employee_totals(self, workshop_number=None, start_date=None, end_date=None):
+        """Суммы архива по сотрудникам и операциям в границах employee_scope:
+        [((табельный номер, код операции), нарядов, деталей, сумма производительности)]"""
+        rows = self.archive.totals(('workshop_number', 'employee_number', 'month',
+                                    'operation_code'))
+        return [((employee, operation), count, parts, productivity)
+                for workshop, employee, month, operation, parts, productivity, _, count in rows
+                if (workshop_number is None or workshop == workshop_number)
+                and (not start_date or month >= start_date[:7])
+                and (not end_date or month <= end_date[:7])]
+
+    def employee_operation_totals(self, workshop_number, start_date, end_date, archived):
+        """Суммы сводной таблицы сотрудников вместе с суммами архива:
+        {(табельный номер, код операции): [нарядов, деталей, сумма производительности]}"""
+        where, params = self.employee_scope(workshop_number, start_date, end_date)
+        rows = self.query(f'''
+            SELECT employee_number, operation_code,
+                   SUM(order_count), SUM(parts_sum), SUM(productivity_sum)
+            FROM employee_summary WHERE {where}
+            GROUP BY employee_number, operation_code
+        ''', params)
+        totals = add_totals({}, [((employee, operation), *values)
+                                 for employee, operation, *values in rows])
+        return add_totals(totals, archived)
+
+    @staticmethod
+    def operation_averages(totals):
+        """Средняя производительность операций по суммам employee_operation_totals"""
+        averages = add_totals({}, [(operation, productivity, count)
+                                   for (_, operation), (count, _, productivity)
+                                   in totals.items()])
+        return {operation: productivity / count
+                for operation, (productivity, count) in averages.items()}
+
+    def get_employee_ranking(self, workshop_number=None, start_date=None, end_date=None,
+                             order_by='parts', limit=20, offset=0):
+        """Рейтинг сотрудников по показателю order_by (страница limit/offset;
+        с учетом архива).
+
+        Возвращает строки (табельный номер, количество нарядов, сумма
+        деталей, средняя производительность, выполнение нормы в процентах).
+        Выполнение нормы - производительность сотрудника по каждой операции
+        относительно средней производительности всех сотрудников на этой
+        операции за тот же период, взвешенная по числу нарядов.
+        """
+        if order_by not in EMPLOYEE_METRICS:
+            raise ValueError(f"Неизвестный показатель: {order_by}")
+        archived = self.archived_employee_totals(workshop_number, start_date, end_date)
+        if archived:
+            totals = self.employee_operation_totals(workshop_number, start_date, end_date,
+                                                    archived)
+            averages = self.operation_averages(totals)
+            employees = add_totals({}, [
+                (employee, count, parts, productivity, count * averages[operation])
+                for (employee, operation), (count, parts, productivity) in totals.items()])
+            rows = [(employee, count, parts, productivity / count,
+                     100.0 * productivity / expected if expected else None)
+                    for employee, (count, parts, productivity, expected) in employees.items()]
+            # Порядок как в SQL: NULL - в конце, при равенстве - по табельному номеру
+            column = {'parts': 2, 'orders': 1, 'productivity': 3, 'fulfillment': 4}[order_by]
+            rows.sort(key=lambda row: (row[column] is None, -(row[column] or 0), row[0]))
+            return rows[offset:] if limit < 0 else rows[offset:offset + limit]
+        where, params = self.employee_scope(workshop_number, start_date, end_date)
+        # Средняя производительность операции - оконной функцией за тот же
+        # проход по сводной таблице, без соединения с отдельной выборкой
+        return self.query(f'''
+            WITH scope AS (
+                SELECT employee_number, order_count, parts_sum, productivity_sum,
+                       SUM(productivity_sum) OVER operation
+                           / SUM(order_count) OVER operation as average
+                FROM employee_summary WHERE {where}
+                WINDOW operation AS (PARTITION BY operation_code)
+            )
+            SELECT employee_number,
+                   SUM(order_count) as order_count,
+                   SUM(parts_sum) as parts_sum,
+                   SUM(productivity_sum) / SUM(order_count) as productivity,
+                   100.0 * SUM(productivity_sum)
+                       / NULLIF(SUM(order_count * average), 0) as fulfillment
+            FROM scope
+            GROUP BY employee_number
+            ORDER BY {EMPLOYEE_METRICS[order_by]} DESC, employee_number
+            LIMIT ? OFFSET ?
+        ''', params + [limit, offset])
+
+    def get_employee_operations(self, employees, workshop_number=None,
+                                start_date=None, end_date=None):
+        """Показатели сотрудников по операциям (для тепловой карты; с учетом архива).
+
+        Возвращает строки (табельный номер, код операции, количество
+        нарядов, выполнение нормы в процентах) для указанных сотрудников.
+        """
+        if not employees:
+            return []
+        archived = self.archived_employee_totals(workshop_number, start_date, end_date)
+        if archived:
+            totals = self.employee_operation_totals(workshop_number, start_date, end_date,
+                                                    archived)
+            averages = self.operation_averages(totals)
+            selected = set(employees)
+            return [(employee, operation, count,
+                     100.0 * productivity / (count * averages[operation])
+                     if averages[operation] else None)
+                    for (employee, operation), (count, _, productivity) in totals.items()
+                    if employee in selected]
+        where, params = self.employee_scope(workshop_number, start_date, end_date)
+        placeholders = ', '.join('?' * len(employees))
+        return self.query(f'''
+            WITH scope AS (
+                SELECT employee_number, operation_code, order_count, productivity_sum,
+                       SUM(productivity_sum) OVER operation
+                           / SUM(order_count) OVER operation as average
+                FROM employee_summary WHERE {where}
+                WINDOW operation AS (PARTITION BY operation_code)
+            )
+            SELECT employee_number, operation_code,
+                   SUM(order_count) as order_count,
+                   100.0 * SUM(productivity_sum)
+                       / NULLIF(SUM(order_count * average), 0) as fulfillment
+            FROM scope
+            WHERE employee_number IN ({placeholders})
+            GROUP BY employee_number, operation_code
+        ''', params + list(employees))
+
+    def get_operation_totals(self):
+        """Получение сумм нормы времени по операциям (без архива)"""
+        return self.query('''
+            SELECT operation_code,
+                   SUM(time_norm_sum) as time_sum,
+                   SUM(order_count) as operation_count
+            FROM daily_summary
+            GROUP BY operation_code
+        ''')
 
     def get_orders_by_period(self, period_type):
-        """Получение количества нарядов по периодам"""
+        """Получение количества нарядов по периодам (с учетом архива)"""
         if period_type == 'year':
             date_format = '%Y'
         elif period_type == 'month':
@@ -113,15 +1326,74 @@ class Database:
         
         query = f'''
             SELECT strftime('{date_format}', date) as period,
-                   COUNT(*) as order_count
-            FROM naryad
+                   SUM(order_count) as order_count
+            FROM daily_summary
             GROUP BY period
             ORDER BY period
         '''
-        self.cursor.execute(query)
-        return self.cursor.fetchall()
+        archived = self.archive.totals((period_type if period_type in ('year', 'month')
+                                        else 'day',))
+        if archived:
+            totals = add_totals({}, self.query(query))
+            add_totals(totals, [(period, count) for period, _, _, _, count in archived])
+            return sorted((period, count) for period, (count,) in totals.items())
+        return self.query(query)
+
+    def check_query_plans(self):
+        """Проверка планов аналитических запросов (EXPLAIN QUERY PLAN).
+
+        Выполняет аналитические методы, перехватывает их SQL и возвращает
+        список (метод, запрос, шаги плана, используется ли индекс). Запрос
+        считается использующим индекс, если в плане нет полного
+        сканирования таблицы naryad (просмотр сводной таблицы daily_summary
+        допустим - ее размер не зависит от числа нарядов за день).
+        """
+        checks = [
+            ('get_records_page', lambda: self.get_records_page(('2000-01-01', ''), 1)),
+            ('get_workshops', self.get_workshops),
+            ('workshop_exists', lambda: self.workshop_exists(1)),
+            ('get_workshop_productivity',
+             lambda: self.get_workshop_productivity('2000-01-01', '2100-01-01')),
+            ('get_workshop_totals',
+             lambda: self.get_workshop_totals('2000-01-01', '2100-01-01')),
+            ('get_date_range', self.get_date_range),
+            ('get_employee_count', lambda: self.get_employee_count(1)),
+            ('get_employee_ranking', lambda: self.get_employee_ranking(1, limit=1)),
+            ('get_employee_operations', lambda: self.get_employee_operations([1], 1)),
+            ('get_operation_complexity', self.get_operation_complexity),
+            ('get_operation_totals', self.get_operation_totals),
+            ('get_orders_by_period', lambda: self.get_orders_by_period('month')),
+            ('search_records',
+             lambda: self.search_records('S00', order_by='date', limit=1)),
+            ('search_records',
+             lambda: self.search_records('S', order_by='shifr', limit=1)),
+            ('search_records',
+             lambda: self.search_records('OP0', order_by='time_norm', limit=1)),
+            ('search_records',
+             lambda: self.search_records(order_by='time_norm', descending=True,
+                                         parts_min=10, limit=1)),
+        ]
+        results = []
+        for name, call in checks:
+            statements = []
+            self.set_trace_callback(statements.append)
+            try:
+                call()
+            finally:
+                self.set_trace_callback()
+            for sql in statements:
+                if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+                    continue
+                plan = [row[3] for row in
+                        self.conn.execute('EXPLAIN QUERY PLAN ' + sql).fetchall()]
+                uses_index = not any(step.startswith('SCAN naryad') and 'INDEX' not in step
+                                     for step in plan)
+                results.append((name, sql, plan, uses_index))
+        return results
 
     def close(self):
         """Закрытие соединения с базой данных"""
+        if self.pool is not None:
+            self.pool.close()
         if self.conn:
             self.conn.close()
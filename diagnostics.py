@@ -0,0 +1,108 @@
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                            QTableWidget, QTableWidgetItem, QHeaderView, QFileDialog,
+                            QMessageBox)
+from PyQt6.QtCore import Qt, QTimer
+
+import profiling
+
+# Период автоматического обновления панели (мс)
+REFRESH_INTERVAL = 1000
+
+
+class DiagnosticsPanel(QWidget):
+    """Панель диагностики: сводка замеров, медленные запросы и экспорт трассировки.
+
+    Создается только при включенном профилировании (NARYAD_PROFILE=1) и
+    обновляется раз в секунду, пока видна.
+    """
+
+    def __init__(self, profiler, refresh=None, parent=None):
+        super().__init__(parent)
+        self.profiler = profiler
+        self.refresh = refresh
+        layout = QVBoxLayout(self)
+
+        buttons = QHBoxLayout()
+        update_button = QPushButton("Обновить")
+        update_button.clicked.connect(self.update_tables)
+        clear_button = QPushButton("Сбросить")
+        clear_button.clicked.connect(self.clear)
+        export_button = QPushButton("Сохранить трассировку...")
+        export_button.clicked.connect(self.export_trace)
+        for button in (update_button, clear_button, export_button):
+            buttons.addWidget(button)
+        buttons.addStretch()
+        layout.addLayout(buttons)
+
+        self.refresh_label = QLabel()
+        layout.addWidget(self.refresh_label)
+
+        self.spans_table = self.create_table(
+            ["Операция", "Категория", "Вызовов", "Всего, мс", "Среднее, мс", "Максимум, мс"],
+            stretch=0)
+        layout.addWidget(self.spans_table)
+        layout.addWidget(QLabel(f"Медленные запросы (от {profiling.SLOW_SQL_MS:g} мс)"))
+        self.sql_table = self.create_table(["Метод", "Время, мс", "Запрос"], stretch=2)
+        layout.addWidget(self.sql_table)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(REFRESH_INTERVAL)
+        self.timer.timeout.connect(self.update_tables)
+
+    def create_table(self, headers, stretch):
+        """Таблица только для чтения; столбец stretch занимает свободную ширину"""
+        table = QTableWidget(0, len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        table.verticalHeader().setVisible(False)
+        table.horizontalHeader().setSectionResizeMode(stretch, QHeaderView.ResizeMode.Stretch)
+        return table
+
+    def fill_table(self, table, rows):
+        """Заполнение таблицы строками; числа выравниваются вправо"""
+        table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                if isinstance(value, float):
+                    item = QTableWidgetItem(f'{value:.1f}')
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                elif isinstance(value, int):
+                    item = QTableWidgetItem(str(value))
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                else:
+                    item = QTableWidgetItem(value)
+                table.setItem(row, column, item)
+
+    def update_tables(self):
+        """Обновление сводки замеров и списка медленных запросов"""
+        self.fill_table(self.spans_table, [
+            (name, category, count, total, total / count, maximum)
+            for name, category, count, total, maximum in self.profiler.stats()])
+        self.fill_table(self.sql_table, self.profiler.slow_sql())
+        if self.refresh is not None:
+            self.refresh_label.setText(self.refresh.summary())
+
+    def clear(self):
+        """Удаление накопленных замеров"""
+        self.profiler.clear()
+        self.update_tables()
+
+    def export_trace(self):
+        """Сохранение трассировки в формате Chrome Trace Event"""
+        path, _ = QFileDialog.getSaveFileName(self, "Сохранить трассировку",
+                                              "naryad_trace.json", "JSON (*.json)")
+        if not path:
+            return
+        try:
+            self.profiler.export_chrome_trace(path)
+        except OSError as e:
+            QMessageBox.warning(self, "Ошибка", f"Не удалось сохранить трассировку: {e}")
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.update_tables()
+        self.timer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.timer.stop()
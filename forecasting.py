@@ -0,0 +1,209 @@
+import numpy as np
+
+# Модели прогноза: имя -> подпись
+MODELS = {
+    'linear': 'линейный тренд',
+    'seasonal': 'сезонный наивный',
+    'smoothing': 'экспоненциальное сглаживание',
+}
+
+# Длина сезона (месяцев), минимальное число месяцев с данными для прогноза,
+# число точек начала проверки (rolling origin) и сетка коэффициентов сглаживания
+SEASON = 12
+MIN_MONTHS = 3
+BACKTEST_ORIGINS = 6
+SMOOTHING_LEVELS = np.array([0.1, 0.3, 0.5, 0.7, 0.9])
+
+# Множитель ширины доверительного интервала (95 % для нормального распределения)
+INTERVAL_Z = 1.96
+
+
+def month_index(month):
+    """Номер месяца ГГГГ-ММ от начала нашей эры"""
+    year, number = map(int, month.split('-'))
+    return year * 12 + number - 1
+
+
+def month_label(index):
+    """Месяц ГГГГ-ММ по номеру"""
+    year, number = divmod(int(index), 12)
+    return f'{year:04d}-{number + 1:02d}'
+
+
+def calendar(series):
+    """Ряды на помесячном календаре, выровненные по своему последнему месяцу.
+
+    series - {ключ: [(месяц ГГГГ-ММ, значение)]}. Возвращает (ключи,
+    номера первых месяцев календаря каждого ряда, матрица ряд x месяц),
+    пропущенные месяцы - NaN. Последний столбец - последний месяц с
+    данными своего ряда, поэтому пропуски внутри ряда не сдвигают ось
+    времени, а прогноз ряда, данные которого кончились раньше других,
+    начинается после его собственного последнего месяца.
+    """
+    keys = list(series)
+    indices = [np.array([month_index(month) for month, _ in series[key]], dtype=int)
+               for key in keys]
+    lasts = np.array([index.max() if len(index) else 0 for index in indices], dtype=int)
+    width = max((lasts[row] - index.min() + 1 for row, index in enumerate(indices)
+                 if len(index)), default=0)
+    firsts = lasts - width + 1
+    matrix = np.full((len(keys), width), np.nan)
+    for row, (key, index) in enumerate(zip(keys, indices)):
+        matrix[row, index - firsts[row]] = [value for _, value in series[key]]
+    return keys, firsts, matrix
+
+
+def masked_mean(values, axis):
+    """Среднее без учета NaN (NaN, если значений нет), без предупреждений"""
+    observed = ~np.isnan(values)
+    counts = observed.sum(axis=axis)
+    totals = np.where(observed, values, 0.0).sum(axis=axis)
+    return np.divide(totals, counts, out=np.full(np.shape(counts), np.nan), where=counts > 0)
+
+
+def linear_fit(matrix):
+    """Прямые по методу наименьших квадратов для всех рядов сразу.
+
+    x - номер месяца календаря, пропуски исключаются маской. Возвращает
+    (свободный член, наклон, стандартное отклонение остатков); для рядов
+    меньше чем из двух значений - NaN.
+    """
+    observed = ~np.isnan(matrix)
+    x = np.where(observed, np.arange(matrix.shape[1]), 0.0)
+    y = np.where(observed, matrix, 0.0)
+    n = observed.sum(axis=1)
+    sum_x = x.sum(axis=1)
+    sum_y = y.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (n * (x * y).sum(axis=1) - sum_x * sum_y) / (n * (x * x).sum(axis=1) - sum_x ** 2)
+        intercept = (sum_y - slope * sum_x) / n
+        residuals = np.where(observed, y - intercept[:, None] - slope[:, None] * x, 0.0)
+        deviation = np.sqrt((residuals ** 2).sum(axis=1) / np.maximum(n - 2, 1))
+    return intercept, slope, deviation
+
+
+def linear_forecast(matrix, horizon):
+    """Прогноз линейным трендом: продолжение прямой за конец календаря"""
+    intercept, slope, _ = linear_fit(matrix)
+    future = matrix.shape[1] + np.arange(horizon)
+    return intercept[:, None] + slope[:, None] * future
+
+
+def seasonal_forecast(matrix, horizon, season=SEASON):
+    """Сезонный наивный прогноз: значение того же месяца в последний год с данными"""
+    width = matrix.shape[1]
+    forecast = np.full((matrix.shape[0], horizon), np.nan)
+    for step in range(horizon):
+        column = width + step - season
+        while column >= 0:
+            missing = np.isnan(forecast[:, step])
+            if not missing.any():
+                break
+            if column < width:
+                forecast[missing, step] = matrix[missing, column]
+            column -= season
+    return forecast
+
+
+def smoothing_forecast(matrix, horizon, levels=SMOOTHING_LEVELS):
+    """Простое экспоненциальное сглаживание с подбором коэффициента для каждого ряда.
+
+    Уровень всех рядов пересчитывается для всей сетки коэффициентов сразу
+    (массив коэффициент x ряд); для каждого ряда выбирается коэффициент с
+    наименьшей ошибкой прогноза на месяц вперед. Пропущенные месяцы
+    уровень не меняют. Прогноз - последний уровень на весь горизонт.
+    """
+    rows = matrix.shape[0]
+    level = np.full((len(levels), rows), np.nan)
+    errors = np.zeros((len(levels), rows))
+    alpha = levels[:, None]
+    for column in matrix.T:
+        observed = ~np.isnan(column)
+        started = observed & ~np.isnan(level)
+        errors += np.where(started, (column - level) ** 2, 0.0)
+        level = np.where(started, alpha * column + (1 - alpha) * level,
+                         np.where(observed, column, level))
+    best = errors.argmin(axis=0)
+    return np.repeat(level[best, np.arange(rows)][:, None], horizon, axis=1)
+
+
+FORECASTERS = {
+    'linear': linear_forecast,
+    'seasonal': seasonal_forecast,
+    'smoothing': smoothing_forecast,
+}
+
+
+def backtest(matrix, horizon, origins=BACKTEST_ORIGINS, min_months=MIN_MONTHS):
+    """Проверка моделей со скользящей точкой начала прогноза (rolling origin).
+
+    Для каждой из последних origins точек ряды обрезаются по ней, модели
+    строят прогноз на horizon месяцев и сравниваются с фактом. Точки, до
+    которых у ряда меньше min_months значений, не учитываются. Возвращает
+    {модель: (средняя абсолютная ошибка по рядам, среднеквадратичная
+    ошибка по рядам и шагам горизонта)}; без данных для проверки - NaN.
+    """
+    rows, width = matrix.shape
+    counts = np.cumsum(~np.isnan(matrix), axis=1)
+    starts = range(max(1, width - origins), width)
+    differences = {name: [] for name in FORECASTERS}
+    for origin in starts:
+        actual = np.full((rows, horizon), np.nan)
+        actual[:, :min(horizon, width - origin)] = matrix[:, origin:origin + horizon]
+        actual[counts[:, origin - 1] < min_months] = np.nan
+        for name, forecaster in FORECASTERS.items():
+            differences[name].append(forecaster(matrix[:, :origin], horizon) - actual)
+    results = {}
+    for name, values in differences.items():
+        values = np.array(values).reshape(len(starts), rows, horizon)
+        results[name] = (masked_mean(np.abs(values).transpose(1, 0, 2).reshape(rows, -1), 1),
+                         np.sqrt(masked_mean(values ** 2, 0)))
+    return results
+
+
+def forecast_series(series, horizon, min_months=MIN_MONTHS):
+    """Прогнозы для всех рядов одним расчетом.
+
+    series - {ключ: [(месяц ГГГГ-ММ, значение)]}. Для каждого ряда
+    проверкой на истории (backtest) выбирается модель с наименьшей средней
+    абсолютной ошибкой (без данных для проверки - линейный тренд).
+    Возвращает {ключ: (месяцы, значения, прогноз, нижняя граница, верхняя
+    граница, модель)}: месяцы - календарь от первого до последнего месяца
+    с данными ряда, значения пропущенных месяцев - NaN; при числе месяцев с данными меньше
+    min_months прогноз и границы - None.
+    """
+    if not series:
+        return {}
+    keys, firsts, matrix = calendar(series)
+    errors = backtest(matrix, horizon, min_months=min_months)
+    names = list(FORECASTERS)
+    scores = np.array([errors[name][0] for name in names])
+    best = np.where(np.isnan(scores).all(axis=0), names.index('linear'),
+                    np.where(np.isnan(scores), np.inf, scores).argmin(axis=0))
+    forecasts = np.array([FORECASTERS[name](matrix, horizon) for name in names])
+    rows = np.arange(len(keys))
+    # Модель без прогноза (например, сезонная без года истории) заменяется трендом
+    best = np.where(np.isnan(forecasts[best, rows]).any(axis=1), names.index('linear'), best)
+    predictions = forecasts[best, rows]
+
+    # Ширина интервала - ошибка модели на истории для каждого шага горизонта;
+    # без проверки - отклонение остатков тренда, растущее с горизонтом
+    deviation = np.array([errors[name][1] for name in names])[best, rows]
+    spread = linear_fit(matrix)[2][:, None] * np.sqrt(np.arange(1, horizon + 1))
+    width = INTERVAL_Z * np.where(np.isnan(deviation), spread, deviation)
+    # Дальние шаги проверяются по меньшему числу точек: интервал не сужается с горизонтом
+    width = np.fmax.accumulate(width, axis=1)
+
+    observed = ~np.isnan(matrix)
+    result = {}
+    for row, key in enumerate(keys):
+        start = observed[row].argmax()
+        months = [month_label(firsts[row] + column)
+                  for column in range(start, matrix.shape[1])]
+        values = matrix[row, start:]
+        if observed[row].sum() < min_months:
+            result[key] = (months, values, None, None, None, None)
+            continue
+        result[key] = (months, values, predictions[row], predictions[row] - width[row],
+                       predictions[row] + width[row], names[best[row]])
+    return result
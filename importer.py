@@ -0,0 +1,259 @@
+import csv
+import math
+import os
+import sqlite3
+from datetime import date as date_type, datetime
+from functools import lru_cache
+
+# Порядок полей наряда в таблице naryad
+COLUMNS = ['shifr', 'date', 'workshop_number', 'employee_number',
+           'operation_code', 'time_norm', 'parts_count']
+
+# Допустимые заголовки столбцов файла (названия полей и подписи таблицы)
+HEADER_ALIASES = {
+    'shifr': 'shifr', 'шифр': 'shifr', 'шифр наряда': 'shifr',
+    'date': 'date', 'дата': 'date',
+    'workshop_number': 'workshop_number', 'цех': 'workshop_number',
+    'номер цеха': 'workshop_number',
+    'employee_number': 'employee_number', 'таб. номер': 'employee_number',
+    'табельный номер': 'employee_number',
+    'operation_code': 'operation_code', 'операция': 'operation_code',
+    'код операции': 'operation_code',
+    'time_norm': 'time_norm', 'норма времени': 'time_norm',
+    'parts_count': 'parts_count', 'кол-во деталей': 'parts_count',
+    'количество деталей': 'parts_count',
+}
+
+# Сколько примеров дубликатов и ошибок хранить в отчете
+REPORT_EXAMPLES = 20
+
+# Средний размер строки файла в байтах (для оценки числа строк по размеру)
+BYTES_PER_ROW = 40
+
+
+def parse_date(value):
+    """Приведение даты к формату базы (ГГГГ-ММ-ДД).
+
+    Принимаются даты формы ввода (ДД.ММ.ГГГГ), даты в формате базы и
+    значения date/datetime из ячеек Excel.
+    """
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, date_type):
+        return value.isoformat()
+    return parse_date_text(str(value).strip())
+
+
+@lru_cache(maxsize=8192)
+def parse_date_text(text):
+    """Разбор текстовой даты (в выгрузках даты повторяются, поэтому кэшируется)"""
+    for date_format in ('%d.%m.%Y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(text, date_format).strftime('%Y-%m-%d')
+        except ValueError:
+            pass
+    raise ValueError("Неверный формат даты")
+
+
+def parse_integer(value, message):
+    """Целое поле наряда (при ошибке - ValueError с текстом message).
+
+    Дробные числа из ячеек Excel не округляются: форма ввода их тоже не
+    принимает. nan и inf также не целые (int() от бесконечности дает
+    OverflowError, а не ValueError).
+    """
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(message)
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(message)
+
+
+def parse_record(shifr, date, workshop_number, employee_number,
+                 operation_code, time_norm, parts_count):
+    """Проверка и приведение полей наряда по правилам формы ввода.
+
+    Возвращает словарь полей для записи в базу, при ошибке - ValueError.
+    """
+    record = {
+        'shifr': str(shifr),
+        'date': parse_date(date),
+        'workshop_number': parse_integer(workshop_number, "Номер цеха должен быть целым числом"),
+        'employee_number': parse_integer(employee_number,
+                                         "Табельный номер должен быть целым числом"),
+        'operation_code': str(operation_code),
+        'time_norm': float(time_norm),
+        'parts_count': parse_integer(parts_count, "Количество деталей должно быть целым числом")
+    }
+    # float() и ячейки Excel допускают nan и inf, а в базе они недопустимы
+    if not math.isfinite(record['time_norm']):
+        raise ValueError("Норма времени должна быть конечным числом")
+    # Производительность - детали на единицу нормы: при норме 0 она не
+    # определена, при отрицательной - отрицательна
+    if record['time_norm'] <= 0:
+        raise ValueError("Норма времени должна быть больше нуля")
+    return record
+
+
+class ImportReport:
+    """Итоги импорта: счетчики и примеры пропущенных строк"""
+
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.duplicate_examples = []
+        self.errors = 0
+        self.error_examples = []
+
+    def add_duplicates(self, shifrs):
+        """Учет записей с уже существующим шифром"""
+        self.duplicates += len(shifrs)
+        free = REPORT_EXAMPLES - len(self.duplicate_examples)
+        self.duplicate_examples.extend(shifrs[:free])
+
+    def add_batch_error(self, first_line, last_line, count, message):
+        """Учет пакета строк, который база не приняла"""
+        self.errors += count
+        if len(self.error_examples) < REPORT_EXAMPLES:
+            lines = first_line if first_line == last_line else f'{first_line}-{last_line}'
+            self.error_examples.append((lines, message))
+
+    def add_error(self, line, message):
+        """Учет строки, не прошедшей проверку"""
+        self.errors += 1
+        if len(self.error_examples) < REPORT_EXAMPLES:
+            self.error_examples.append((line, message))
+
+    def summary(self):
+        """Текстовый отчет об импорте"""
+        lines = [
+            f'Обработано строк: {self.rows}',
+            f'Импортировано нарядов: {self.imported}',
+            f'Пропущено (шифр уже существует): {self.duplicates}',
+            f'Пропущено (ошибки в данных): {self.errors}',
+        ]
+        if self.duplicate_examples:
+            lines.append('Повторяющиеся шифры: ' + ', '.join(self.duplicate_examples)
+                         + (' ...' if self.duplicates > len(self.duplicate_examples) else ''))
+        for line, message in self.error_examples:
+            lines.append(f'Строка {line}: {message}')
+        if self.errors > len(self.error_examples):
+            lines.append('...')
+        return '\n'.join(lines)
+
+
+def read_csv_rows(path, encoding='utf-8-sig'):
+    """Построчное чтение CSV-файла (разделитель определяется автоматически)"""
+    with open(path, newline='', encoding=encoding) as f:
+        sample = f.read(64 * 1024)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=';,\t')
+        except csv.Error:
+            dialect = csv.excel
+        yield from csv.reader(f, dialect)
+
+
+def read_xlsx_rows(path):
+    """Построчное чтение первого листа XLSX-файла"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("Для импорта XLSX требуется пакет openpyxl")
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            yield ['' if value is None else
+                   int(value) if isinstance(value, float) and value.is_integer() else value
+                   for value in row]
+    finally:
+        workbook.close()
+
+
+def read_rows(path):
+    """Чтение строк файла в зависимости от расширения"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.xlsx':
+        return read_xlsx_rows(path)
+    if extension in ('.csv', '.txt'):
+        return read_csv_rows(path)
+    raise ValueError(f"Неподдерживаемый формат файла: {extension}")
+
+
+def header_mapping(row):
+    """Позиции полей по строке заголовка; None, если строка - не заголовок"""
+    names = [HEADER_ALIASES.get(str(value).strip().lower()) for value in row]
+    if not all(column in names for column in COLUMNS):
+        return None
+    return [names.index(column) for column in COLUMNS]
+
+
+def import_file(db, path, batch_size=10000, progress=None):
+    """Импорт нарядов из CSV/XLSX-файла.
+
+    Файл читается потоково; строки проверяются по правилам формы ввода и
+    добавляются пакетами по batch_size записей, каждый пакет - одной
+    транзакцией. Если файл по оценке больше уже накопленной таблицы,
+    вторичные индексы на время импорта удаляются (Database.bulk_load).
+    progress(rows) вызывается после каждого пакета. Возвращает ImportReport.
+    """
+    estimated_rows = os.path.getsize(path) // BYTES_PER_ROW
+    with db.bulk_load(drop_indexes=estimated_rows > db.estimate_record_count()):
+        report = read_into_database(db, path, batch_size, progress)
+    if report.imported:
+        db.notify('reloaded', None, None)
+    return report
+
+
+def read_into_database(db, path, batch_size, progress):
+    """Чтение, проверка и пакетная запись строк файла"""
+    report = ImportReport()
+    positions = list(range(len(COLUMNS)))
+    batch = []
+    lines = []  # номера строк файла для записей пакета
+
+    def flush():
+        try:
+            inserted, duplicates = db.add_records(batch, notify=False)
+        except sqlite3.Error as e:
+            # Пакет откатывается целиком, импорт продолжается со следующего
+            report.add_batch_error(lines[0], lines[-1], len(batch),
+                                   f"Ошибка записи в базу: {e}")
+        else:
+            report.imported += inserted
+            report.add_duplicates(duplicates)
+        batch.clear()
+        lines.clear()
+        if progress:
+            progress(report.rows)
+
+    first = True  # заголовком может быть только первая непустая строка
+    for line, row in enumerate(read_rows(path), 1):
+        if not any(str(value).strip() for value in row):
+            continue
+        if first:
+            first = False
+            mapping = header_mapping(row)
+            if mapping:
+                positions = mapping
+                continue
+        report.rows += 1
+        try:
+            values = [row[i] for i in positions]
+            record = parse_record(*values)
+        except IndexError:
+            report.add_error(line, "Недостаточно столбцов")
+            continue
+        except ValueError as e:
+            report.add_error(line, str(e))
+            continue
+        batch.append(tuple(record[column] for column in COLUMNS))
+        lines.append(line)
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+    return report
@@ -1,17 +1,51 @@
+import importlib
+import json
+import os
 import sys
-from datetime import datetime, timedelta
+import threading
+import time
+from contextlib import contextmanager
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QLabel, QLineEdit, QPushButton, 
-                            QTableWidget, QTableWidgetItem, QTabWidget,
+                            QTableView, QTabWidget, QDateEdit,
                             QMessageBox, QComboBox, QScrollArea,
                             QSizePolicy, QHeaderView, QCalendarWidget,
-                            QToolButton)
-from PyQt6.QtCore import Qt, QDate, QTimer
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-import matplotlib
-matplotlib.use('Qt5Agg')
+                            QToolButton, QFileDialog, QProgressDialog,
+                            QSplashScreen, QSpinBox)
+from PyQt6.QtCore import Qt, QDate, QEvent, QObject, QTimer, QThreadPool
+from PyQt6.QtGui import QColor, QPixmap
 from database import Database
-from analytics import Analytics
+from table_model import NaryadTableModel
+from importer import parse_date, parse_record
+from workers import ChartPipeline, ImportTask
+from scheduler import RefreshScheduler
+import profiling
+
+# Периоды диаграммы эффективности цехов: название -> начало периода
+# относительно сегодняшней даты (None - произвольный период или все время)
+PRODUCTIVITY_RANGES = {
+    "Неделя": lambda today: today.addDays(-6),
+    "Месяц": lambda today: today.addMonths(-1).addDays(1),
+    "Квартал": lambda today: today.addMonths(-3).addDays(1),
+    "Год": lambda today: today.addDays(-365),
+    "Все время": None,
+    "Произвольный": None,
+}
+
+# Показатели рейтинга сотрудников: параметр -> название
+EMPLOYEE_METRICS = {
+    'parts': "Количество деталей",
+    'orders': "Количество нарядов",
+    'productivity': "Производительность",
+    'fulfillment': "Выполнение нормы",
+}
+ALL_WORKSHOPS = "Все цеха"
+
+def preload_analytics_modules():
+    """Импорт модулей аналитики (выполняется в фоновом потоке)"""
+    importlib.import_module('analytics')
+    importlib.import_module('chart_canvas')
+
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -20,13 +54,34 @@ class MainWindow(QMainWindow):
         self.setGeometry(100, 100, 1200, 800)
         self.setMinimumSize(800, 600)
         
-        # Таймер для отложенного обновления графиков
-        self.resize_timer = QTimer()
-        self.resize_timer.setSingleShot(True)
-        self.resize_timer.timeout.connect(self.delayed_update_analytics)
+        # Поиск запускается после паузы в вводе, а не на каждый символ
+        self.filter_timer = QTimer()
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(300)
+        self.filter_timer.timeout.connect(self.apply_filters)
         
-        self.db = Database()
-        self.analytics = Analytics(self.db)
+        # Без pyarrow архив закрытых месяцев пропускается с предупреждением
+        self.db = Database(archive_optional=True)
+        self.archive_warning_shown = False
+        # Графики строятся в фоновом потоке через отдельное соединение только для чтения
+        self.reader = self.db.open_reader()
+        # Модули аналитики (numpy, matplotlib) загружаются при первом открытии вкладки
+        self.analytics = None
+        self.preload_thread = None
+        self.preload_timer = QTimer(self)
+        self.preload_timer.setInterval(50)
+        self.preload_timer.timeout.connect(self.check_analytics_loaded)
+        self.chart_pipeline = ChartPipeline(self)
+        self.chart_pipeline.finished.connect(self.on_chart_ready)
+        self.chart_pipeline.failed.connect(self.on_chart_failed)
+        # Запросы на обновление графиков объединяются в пределах прохода цикла событий
+        self.refresh = RefreshScheduler({'summary': self.update_summary_charts,
+                                         'productivity': self.update_productivity_chart,
+                                         'employees': self.update_employee_charts,
+                                         'prediction': self.update_prediction}, parent=self)
+        # Цеха, затронутые изменениями записей с момента последнего обновления графиков
+        self.changed_workshops = set()
+        self.db.add_listener(self.on_record_changed)
         
         # Создаем вкладки
         self.tabs = QTabWidget()
@@ -35,9 +90,28 @@ class MainWindow(QMainWindow):
         # Инициализация вкладок
         self.init_data_tab()
         self.init_analytics_tab()
+        if profiling.ENABLED:
+            # Панель замеров появляется только при NARYAD_PROFILE=1
+            from diagnostics import DiagnosticsPanel
+            self.tabs.addTab(DiagnosticsPanel(profiling.profiler, self.refresh), "Диагностика")
         
-        # Загружаем данные
+        # Загружаем данные; графики строятся при открытии вкладки аналитики
         self.load_data()
+        self.tabs.currentChanged.connect(self.on_tab_changed)
+
+    def closeEvent(self, event):
+        """Остановка фоновых задач и закрытие соединений с базой"""
+        self.refresh.cancel()
+        self.chart_pipeline.cancel_all()
+        QThreadPool.globalInstance().waitForDone()
+        self.preload_timer.stop()
+        if self.preload_thread is not None:
+            self.preload_thread.join()
+        self.reader.close()
+        self.db.close()
+        if profiling.ENABLED and profiling.TRACE_FILE:
+            profiling.profiler.export_chrome_trace(profiling.TRACE_FILE)
+        super().closeEvent(event)
 
     def resizeEvent(self, event):
         """Обработка изменения размера окна"""
@@ -51,35 +125,8 @@ class MainWindow(QMainWindow):
             content_widget = scroll_area.widget()
             if content_widget:
                 content_widget.setMinimumWidth(new_size.width() - 60)
-        # Запускаем таймер для отложенного обновления
-        self.resize_timer.start(200)
-
-    def delayed_update_analytics(self):
-        """Отложенное обновление графиков"""
-        # Получаем размер окна
-        window_size = self.size()
-        # Вычисляем новый размер для графиков (с учетом отступов)
-        canvas_width = window_size.width() - 100
-        canvas_height = 300
-        
-        # Обновляем размеры всех canvas и их содержимого
-        for canvas in [self.orders_canvas, self.productivity_canvas, 
-                      self.complexity_canvas]:
-            if canvas:
-                # Обновляем размеры canvas
-                canvas.setMinimumWidth(canvas_width)
-                canvas.setMaximumWidth(canvas_width)
-                # Обновляем размеры figure
-                canvas.figure.set_size_inches(canvas_width/100, canvas_height/100)
-                canvas.figure.tight_layout()
-                canvas.draw_idle()
-        
-        if self.prediction_canvas:
-            self.prediction_canvas.setMinimumWidth(canvas_width)
-            self.prediction_canvas.setMaximumWidth(canvas_width)
-            self.prediction_canvas.figure.set_size_inches(canvas_width/100, canvas_height/100)
-            self.prediction_canvas.figure.tight_layout()
-            self.prediction_canvas.draw_idle()
+        # Графики следуют за размером окна сами: пока размер меняется, они
+        # выводят масштабированный растр и перерисовываются после паузы
 
     def init_data_tab(self):
         """Инициализация вкладки с данными"""
@@ -298,24 +345,64 @@ class MainWindow(QMainWindow):
         self.delete_button.clicked.connect(self.delete_record)
         self.clear_button = QPushButton("Очистить")
         self.clear_button.clicked.connect(self.clear_form)
+        self.import_button = QPushButton("Импорт...")
+        self.import_button.clicked.connect(self.import_records)
         
         buttons_layout.addWidget(self.add_button)
         buttons_layout.addWidget(self.update_button)
         buttons_layout.addWidget(self.delete_button)
         buttons_layout.addWidget(self.clear_button)
+        buttons_layout.addWidget(self.import_button)
+        
+        # Панель поиска и фильтров таблицы (поиск выполняет база данных)
+        filter_layout = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Шифр или код операции")
+        self.date_from_input = QLineEdit()
+        self.date_to_input = QLineEdit()
+        self.time_norm_min_input = QLineEdit()
+        self.time_norm_max_input = QLineEdit()
+        self.parts_min_input = QLineEdit()
+        self.parts_max_input = QLineEdit()
+        # Фильтр -> (поле ввода, подпись, преобразование значения)
+        self.filter_inputs = {
+            'date_from': (self.date_from_input, "Дата с", parse_date),
+            'date_to': (self.date_to_input, "Дата по", parse_date),
+            'time_norm_min': (self.time_norm_min_input, "Норма от", float),
+            'time_norm_max': (self.time_norm_max_input, "Норма до", float),
+            'parts_min': (self.parts_min_input, "Детали от", int),
+            'parts_max': (self.parts_max_input, "Детали до", int),
+        }
+        self.search_input.setStyleSheet(input_style)
+        self.search_input.textChanged.connect(lambda: self.filter_timer.start())
+        filter_layout.addWidget(QLabel("Поиск:"))
+        filter_layout.addWidget(self.search_input, 2)
+        for input_field, label, _ in self.filter_inputs.values():
+            input_field.setStyleSheet(input_style)
+            input_field.setPlaceholderText(label)
+            input_field.textChanged.connect(lambda: self.filter_timer.start())
+            filter_layout.addWidget(input_field, 1)
+        self.reset_filters_button = QPushButton("Сбросить")
+        self.reset_filters_button.clicked.connect(self.reset_filters)
+        filter_layout.addWidget(self.reset_filters_button)
+        self.filter_status = QLabel()
+        self.filter_status.setStyleSheet("color: #ff6b6b;")
+        self.filter_status.hide()
         
-        # Таблица данных
-        self.table = QTableWidget()
-        self.table.setColumnCount(7)
-        self.table.setHorizontalHeaderLabels([
-            "Шифр", "Дата", "Цех", "Таб. номер", 
-            "Операция", "Норма времени", "Кол-во деталей"
-        ])
-        self.table.cellClicked.connect(self.load_record_to_form)
+        # Таблица данных (строки подгружаются из базы постранично)
+        self.table_model = NaryadTableModel(self.db)
+        self.table = QTableView()
+        self.table.setModel(self.table_model)
+        self.table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.table.clicked.connect(self.load_record_to_form)
+        # Сортировка по щелчку на заголовке выполняется запросом к базе
+        self.table.horizontalHeader().setSortIndicator(
+            NaryadTableModel.DATE_COLUMN, Qt.SortOrder.AscendingOrder)
+        self.table.setSortingEnabled(True)
         
         # Настройка равномерного распределения столбцов
         header = self.table.horizontalHeader()
-        for i in range(self.table.columnCount()):
+        for i in range(self.table_model.columnCount()):
             header.setSectionResizeMode(i, QHeaderView.ResizeMode.Stretch)
         
         # Настройка стиля и выравнивания таблицы
@@ -327,33 +414,34 @@ class MainWindow(QMainWindow):
                 border: 1px solid #3d3d3d;
                 font-weight: bold;
             }
-            QTableWidget {
+            QTableView {
                 gridline-color: #3d3d3d;
                 background-color: #1e1e1e;
                 color: white;
                 selection-background-color: #404040;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 8px;
                 border: none;
                 text-align: center;
             }
         """)
         
-        # Настройка выравнивания текста в заголовках и ячейках
-        for i in range(self.table.columnCount()):
-            self.table.horizontalHeaderItem(i).setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            # Устанавливаем выравнивание для всех ячеек в столбце
-            self.table.horizontalHeader().setDefaultAlignment(Qt.AlignmentFlag.AlignCenter)
+        # Настройка выравнивания текста в заголовках
+        self.table.horizontalHeader().setDefaultAlignment(Qt.AlignmentFlag.AlignCenter)
         
         # Добавляем все элементы на вкладку
         form_container = QWidget()
         form_container.setLayout(form_layout)
         buttons_container = QWidget()
         buttons_container.setLayout(buttons_layout)
+        filter_container = QWidget()
+        filter_container.setLayout(filter_layout)
         
         layout.addWidget(form_container)
         layout.addWidget(buttons_container)
+        layout.addWidget(filter_container)
+        layout.addWidget(self.filter_status)
         layout.addWidget(self.table)
         
         data_tab.setLayout(layout)
@@ -384,38 +472,59 @@ class MainWindow(QMainWindow):
         # Выбор периода
         self.period_combo = QComboBox()
         self.period_combo.addItems(["День", "Месяц", "Год"])
-        self.period_combo.currentTextChanged.connect(self.update_analytics)
+        self.period_combo.currentTextChanged.connect(
+            lambda: self.refresh.request('summary'))
         
         # Выбор цеха для прогноза
         self.workshop_combo = QComboBox()
-        self.workshop_combo.currentTextChanged.connect(self.update_analytics)
+        self.workshop_combo.currentTextChanged.connect(
+            lambda: self.refresh.request('prediction'))
+
+        # Горизонт прогноза, месяцев (наибольший - MAX_FORECAST_HORIZON модуля analytics)
+        self.horizon_spin = QSpinBox()
+        self.horizon_spin.setRange(1, 12)
+        self.horizon_spin.setValue(2)
+        self.horizon_spin.setSuffix(" мес.")
+        self.horizon_spin.valueChanged.connect(self.on_horizon_changed)
+        
+        # Период диаграммы эффективности цехов
+        self.range_combo = QComboBox()
+        self.range_combo.addItems(list(PRODUCTIVITY_RANGES))
+        self.range_from = QDateEdit()
+        self.range_to = QDateEdit()
+        for date_edit in [self.range_from, self.range_to]:
+            date_edit.setCalendarPopup(True)
+            date_edit.setDisplayFormat("dd.MM.yyyy")
+            date_edit.dateChanged.connect(self.on_range_date_changed)
+        self.range_combo.setCurrentText("Год")
+        self.update_range_dates()
+        self.range_combo.currentTextChanged.connect(self.on_range_preset_changed)
         
         controls_layout.addWidget(QLabel("Период:"))
         controls_layout.addWidget(self.period_combo)
+        controls_layout.addWidget(QLabel("Эффективность цехов за:"))
+        controls_layout.addWidget(self.range_combo)
+        controls_layout.addWidget(self.range_from)
+        controls_layout.addWidget(QLabel("—"))
+        controls_layout.addWidget(self.range_to)
         controls_layout.addWidget(QLabel("Цех для прогноза:"))
         controls_layout.addWidget(self.workshop_combo)
+        controls_layout.addWidget(QLabel("на"))
+        controls_layout.addWidget(self.horizon_spin)
         
-        # Создаем и настраиваем графики
-        self.orders_canvas = FigureCanvas(self.analytics.plot_orders_by_period())
-        self.productivity_canvas = FigureCanvas(
-            self.analytics.plot_workshop_productivity(
-                datetime.now() - timedelta(days=365),
-                datetime.now()
-            ) or self.analytics.plot_orders_by_period()
-        )
-        self.complexity_canvas = FigureCanvas(
-            self.analytics.plot_operation_complexity() or 
-            self.analytics.plot_orders_by_period()
-        )
-        
-        # Устанавливаем политику размера для графиков
-        for canvas in [self.orders_canvas, self.productivity_canvas, self.complexity_canvas]:
-            canvas.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
-            canvas.setMinimumHeight(300)
-            canvas.setMinimumWidth(400)
-            canvas.figure.set_size_inches(8, 5, forward=True)
-        
+        # Графики создаются в load_analytics() при первом открытии вкладки
+        self.analytics_status = QLabel("Загрузка аналитики...")
+        self.analytics_status.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.analytics_status.hide()
+        self.orders_canvas = None
+        self.productivity_canvas = None
+        self.complexity_canvas = None
         self.prediction_canvas = None
+        self.employees_canvas = None
+        self.employee_operations_canvas = None
+        self.summary_widths = (0, 0)  # ширины графиков при последнем расчете их данных
+        self.charts = {}
+        self.chart_layouts = {}
         
         # Добавляем все элементы в layout
         controls_container = QWidget()
@@ -423,6 +532,7 @@ class MainWindow(QMainWindow):
         controls_container.setMaximumHeight(50)
         
         layout.addWidget(controls_container)
+        layout.addWidget(self.analytics_status)
         
         # Добавляем заголовки и графики в контейнеры
         orders_container = QWidget()
@@ -449,7 +559,7 @@ class MainWindow(QMainWindow):
             }
         """)
         orders_layout.addWidget(orders_label)
-        orders_layout.addWidget(self.orders_canvas)
+        self.chart_layouts['orders'] = orders_layout
         layout.addWidget(orders_container)
 
         productivity_container = QWidget()
@@ -476,7 +586,7 @@ class MainWindow(QMainWindow):
             }
         """)
         productivity_layout.addWidget(productivity_label)
-        productivity_layout.addWidget(self.productivity_canvas)
+        self.chart_layouts['productivity'] = productivity_layout
         layout.addWidget(productivity_container)
 
         complexity_container = QWidget()
@@ -503,8 +613,61 @@ class MainWindow(QMainWindow):
             }
         """)
         complexity_layout.addWidget(complexity_label)
-        complexity_layout.addWidget(self.complexity_canvas)
+        self.chart_layouts['complexity'] = complexity_layout
         layout.addWidget(complexity_container)
+
+        employees_container = QWidget()
+        employees_layout = QVBoxLayout(employees_container)
+        employees_container.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        employees_container.setStyleSheet("""
+            QWidget {
+                background-color: #2d2d2d;
+                border-radius: 10px;
+                padding: 10px;
+                margin: 5px;
+            }
+        """)
+        employees_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        employees_label = QLabel("ПРОИЗВОДИТЕЛЬНОСТЬ СОТРУДНИКОВ")
+        employees_label.setStyleSheet("""
+            QLabel {
+                color: white;
+                font-size: 14px;
+                font-weight: bold;
+                padding: 10px;
+                background-color: #363636;
+                border-radius: 5px;
+            }
+        """)
+        employees_layout.addWidget(employees_label)
+
+        # Рейтинг сотрудников: цех, показатель и страницы (период - как у
+        # эффективности цехов, округляется до целых месяцев)
+        self.employee_page = 0
+        self.employee_workshop_combo = QComboBox()
+        self.employee_workshop_combo.currentTextChanged.connect(self.on_employee_scope_changed)
+        self.employee_metric_combo = QComboBox()
+        for metric, title in EMPLOYEE_METRICS.items():
+            self.employee_metric_combo.addItem(title, metric)
+        self.employee_metric_combo.currentIndexChanged.connect(self.on_employee_scope_changed)
+        self.employee_prev_button = QPushButton("◀")
+        self.employee_prev_button.clicked.connect(lambda: self.show_employee_page(-1))
+        self.employee_next_button = QPushButton("▶")
+        self.employee_next_button.clicked.connect(lambda: self.show_employee_page(1))
+        self.employee_page_label = QLabel()
+        employee_controls = QHBoxLayout()
+        employee_controls.addWidget(QLabel("Цех:"))
+        employee_controls.addWidget(self.employee_workshop_combo)
+        employee_controls.addWidget(QLabel("Показатель:"))
+        employee_controls.addWidget(self.employee_metric_combo)
+        employee_controls.addStretch()
+        employee_controls.addWidget(self.employee_prev_button)
+        employee_controls.addWidget(self.employee_page_label)
+        employee_controls.addWidget(self.employee_next_button)
+        employees_layout.addLayout(employee_controls)
+        self.chart_layouts['employees'] = employees_layout
+        self.chart_layouts['employee_operations'] = employees_layout
+        layout.addWidget(employees_container)
         
         # Устанавливаем scroll area
         scroll.setWidget(content_widget)
@@ -518,25 +681,62 @@ class MainWindow(QMainWindow):
         # Устанавливаем политику размера для вкладки
         analytics_tab.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
         self.tabs.addTab(analytics_tab, "Аналитика")
+        self.analytics_tab = analytics_tab
 
+    @profiling.timed('ui')
     def load_data(self):
         """Загрузка данных в таблицу"""
-        records = self.db.get_all_records()
-        self.table.setRowCount(len(records))
-        
-        for i, record in enumerate(records):
-            for j, value in enumerate(record):
-                if j == 1:  # Для столбца с датой
-                    date = QDate.fromString(str(value), "yyyy-MM-dd")
-                    formatted_date = date.toString("dd.MM.yyyy")
-                    self.table.setItem(i, j, QTableWidgetItem(formatted_date))
-                else:
-                    self.table.setItem(i, j, QTableWidgetItem(str(value)))
+        # Модель загружает только первую страницу, остальные - при прокрутке
+        self.table_model.reload()
         
         # Обновляем список цехов в комбобоксе
-        workshops = set(record[2] for record in records)
-        self.workshop_combo.clear()
-        self.workshop_combo.addItems([str(w) for w in sorted(workshops)])
+        workshops = self.db.get_workshops()
+        with self.combo_update():
+            self.workshop_combo.clear()
+            self.workshop_combo.addItems([str(w) for w in workshops])
+        self.warn_archive_unavailable()
+
+    def warn_archive_unavailable(self):
+        """Предупреждение (один раз), что архив не читается и аналитика неполная"""
+        if self.archive_warning_shown or self.db.archive.unavailable is None:
+            return
+        self.archive_warning_shown = True
+        QTimer.singleShot(0, lambda: QMessageBox.warning(
+            self, "Архив недоступен",
+            f"{self.db.archive.unavailable}.\n"
+            "Наряды архивированных месяцев не учитываются: "
+            "аналитика строится только по нарядам в базе."))
+
+    @contextmanager
+    def combo_update(self):
+        """Изменение списка цехов без промежуточных сигналов.
+
+        Прогноз обновляется один раз, если в итоге сменился выбранный цех.
+        """
+        current = self.workshop_combo.currentText()
+        self.workshop_combo.blockSignals(True)
+        try:
+            yield
+        finally:
+            self.workshop_combo.blockSignals(False)
+        if self.workshop_combo.currentText() != current:
+            self.refresh.request('prediction')
+        self.sync_employee_workshops()
+
+    def sync_employee_workshops(self):
+        """Список цехов рейтинга сотрудников: цеха из списка прогноза и «Все цеха»"""
+        combo = self.employee_workshop_combo
+        current = combo.currentText()
+        items = [self.workshop_combo.itemText(i)
+                 for i in range(self.workshop_combo.count())] + [ALL_WORKSHOPS]
+        combo.blockSignals(True)
+        combo.clear()
+        combo.addItems(items)
+        # По умолчанию рейтинг строится внутри первого цеха
+        combo.setCurrentIndex(items.index(current) if current in items else 0)
+        combo.blockSignals(False)
+        if combo.currentText() != current:
+            self.on_employee_scope_changed()
 
     def toggle_calendar(self):
         """Показать/скрыть календарь"""
@@ -556,6 +756,41 @@ class MainWindow(QMainWindow):
         self.date_input.setText(qdate.toString("dd.MM.yyyy"))
         self.calendar.hide()
         
+    def read_filters(self):
+        """Чтение строки поиска и фильтров из панели (ValueError при ошибке)"""
+        filters = {'text': self.search_input.text()}
+        for name, (input_field, label, convert) in self.filter_inputs.items():
+            text = input_field.text().strip()
+            if not text:
+                continue
+            try:
+                filters[name] = convert(text.replace(',', '.'))
+            except ValueError:
+                raise ValueError(f"Неверное значение фильтра «{label}»: {text}")
+        return filters
+
+    @profiling.timed('ui')
+    def apply_filters(self):
+        """Применение панели поиска к таблице"""
+        try:
+            filters = self.read_filters()
+        except ValueError as e:
+            self.filter_status.setText(str(e))
+            self.filter_status.show()
+            return
+        self.filter_status.hide()
+        self.table_model.set_filters(filters)
+
+    def reset_filters(self):
+        """Очистка панели поиска"""
+        for input_field in [self.search_input] + [
+                field for field, _, _ in self.filter_inputs.values()]:
+            input_field.blockSignals(True)
+            input_field.clear()
+            input_field.blockSignals(False)
+        self.filter_timer.stop()
+        self.apply_filters()
+
     def clear_form(self):
         """Очистка формы"""
         self.shifr_input.clear()
@@ -569,19 +804,16 @@ class MainWindow(QMainWindow):
     def get_form_data(self):
         """Получение данных из формы"""
         try:
-            date = QDate.fromString(self.date_input.text(), "dd.MM.yyyy")
-            if not date.isValid():
-                raise ValueError("Неверный формат даты")
-                
-            return {
-                'shifr': self.shifr_input.text(),
-                'date': date.toString("yyyy-MM-dd"),
-                'workshop_number': int(self.workshop_input.text()),
-                'employee_number': int(self.employee_input.text()),
-                'operation_code': self.operation_input.text(),
-                'time_norm': float(self.time_norm_input.text()),
-                'parts_count': int(self.parts_count_input.text())
-            }
+            # Те же правила проверки применяются при импорте из файла
+            return parse_record(
+                self.shifr_input.text(),
+                self.date_input.text(),
+                self.workshop_input.text(),
+                self.employee_input.text(),
+                self.operation_input.text(),
+                self.time_norm_input.text(),
+                self.parts_count_input.text()
+            )
         except ValueError as e:
             QMessageBox.warning(self, "Ошибка", "Проверьте правильность ввода данных")
             return None
@@ -593,9 +825,8 @@ class MainWindow(QMainWindow):
             return
             
         if self.db.add_record(**data):
-            self.load_data()
             self.clear_form()
-            self.update_analytics()
+            self.refresh_after_change()
         else:
             QMessageBox.warning(self, "Ошибка", 
                               "Запись с таким шифром уже существует")
@@ -607,9 +838,8 @@ class MainWindow(QMainWindow):
             return
             
         self.db.update_record(**data)
-        self.load_data()
         self.clear_form()
-        self.update_analytics()
+        self.refresh_after_change()
 
     def delete_record(self):
         """Удаление записи"""
@@ -618,27 +848,185 @@ class MainWindow(QMainWindow):
             return
             
         self.db.delete_record(shifr)
-        self.load_data()
         self.clear_form()
-        self.update_analytics()
+        self.refresh_after_change()
 
-    def load_record_to_form(self, row, col):
+    def import_records(self):
+        """Импорт нарядов из файла CSV/XLSX в фоновом потоке"""
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Импорт нарядов", "",
+            "Файлы нарядов (*.csv *.xlsx);;CSV (*.csv);;Excel (*.xlsx)")
+        if not path:
+            return
+        
+        self.import_button.setEnabled(False)
+        self.import_progress = QProgressDialog("Импорт нарядов...", None, 0, 0, self)
+        self.import_progress.setWindowTitle("Импорт")
+        self.import_progress.setWindowModality(Qt.WindowModality.WindowModal)
+        self.import_progress.show()
+        
+        self.import_task = ImportTask(self.db.db_name, path)
+        self.import_task.signals.progress.connect(
+            lambda rows: self.import_progress.setLabelText(
+                f"Импорт нарядов... обработано строк: {rows}"))
+        self.import_task.signals.done.connect(self.on_import_done)
+        QThreadPool.globalInstance().start(self.import_task)
+
+    def on_import_done(self, task):
+        """Вывод итогов импорта и обновление данных"""
+        self.import_progress.close()
+        self.import_button.setEnabled(True)
+        self.import_task = None
+        if task.error is not None:
+            QMessageBox.warning(self, "Ошибка",
+                                f"Не удалось импортировать файл:\n{task.error}")
+            return
+        if task.report.imported:
+            self.db.notify('reloaded', None, None)
+            self.refresh_after_change()
+        QMessageBox.information(self, "Импорт", task.report.summary())
+
+    def on_record_changed(self, event, old, new):
+        """Точечное обновление таблицы и списка цехов при изменении записи"""
+        if event == 'reloaded':
+            # После пакетных изменений перечитываем таблицу и список цехов
+            self.load_data()
+            workshop = self.workshop_combo.currentText()
+            if workshop:
+                self.changed_workshops.add(int(workshop))
+            return
+        self.table_model.apply_change(event, old, new)
+        
+        if new:
+            self.changed_workshops.add(new[2])
+            workshop = str(new[2])
+            if self.workshop_combo.findText(workshop) < 0:
+                workshops = [int(self.workshop_combo.itemText(i))
+                             for i in range(self.workshop_combo.count())]
+                position = sum(1 for w in workshops if w < new[2])
+                with self.combo_update():
+                    self.workshop_combo.insertItem(position, workshop)
+        if old:
+            self.changed_workshops.add(old[2])
+            if not self.db.workshop_exists(old[2]):
+                index = self.workshop_combo.findText(str(old[2]))
+                if index >= 0:
+                    with self.combo_update():
+                        self.workshop_combo.removeItem(index)
+
+    def refresh_after_change(self):
+        """Обновление графиков после изменения записей"""
+        self.refresh.request('summary', 'employees')
+        # Прогноз перестраиваем, только если изменились данные выбранного цеха
+        workshop = self.workshop_combo.currentText()
+        if workshop and int(workshop) in self.changed_workshops:
+            self.refresh.request('prediction')
+        self.changed_workshops.clear()
+
+    def load_record_to_form(self, index):
         """Загрузка записи в форму при клике на строку таблицы"""
-        self.shifr_input.setText(self.table.item(row, 0).text())
-        date = QDate.fromString(self.table.item(row, 1).text(), "dd.MM.yyyy")
+        record = self.table_model.record(index.row())
+        self.shifr_input.setText(str(record[0]))
+        date = QDate.fromString(str(record[1]), "yyyy-MM-dd")
         self.date_input.setText(date.toString("dd.MM.yyyy"))
-        self.workshop_input.setText(self.table.item(row, 2).text())
-        self.employee_input.setText(self.table.item(row, 3).text())
-        self.operation_input.setText(self.table.item(row, 4).text())
-        self.time_norm_input.setText(self.table.item(row, 5).text())
-        self.parts_count_input.setText(self.table.item(row, 6).text())
+        self.workshop_input.setText(str(record[2]))
+        self.employee_input.setText(str(record[3]))
+        self.operation_input.setText(str(record[4]))
+        self.time_norm_input.setText(str(record[5]))
+        self.parts_count_input.setText(str(record[6]))
+
+    def on_tab_changed(self, index):
+        """Загрузка аналитики при первом открытии вкладки"""
+        if self.tabs.widget(index) is self.analytics_tab and self.preload_thread is None:
+            # numpy и matplotlib импортируются в фоне, окно остается отзывчивым
+            self.analytics_status.show()
+            self.preload_thread = threading.Thread(target=preload_analytics_modules,
+                                                   daemon=True)
+            self.preload_thread.start()
+            self.preload_timer.start()
+
+    def check_analytics_loaded(self):
+        """Создание графиков после завершения фонового импорта"""
+        if self.preload_thread.is_alive():
+            return
+        self.preload_timer.stop()
+        self.analytics_status.hide()
+        self.load_analytics()
+
+    def load_analytics(self):
+        """Создание аналитики и графиков (один раз)"""
+        if self.analytics is not None:
+            return
+        from analytics import Analytics
+        self.analytics = Analytics(self.reader, self.horizon_spin.value())
+        for chart in ['orders', 'productivity', 'complexity', 'employees',
+                      'employee_operations']:
+            canvas = self.create_canvas()
+            setattr(self, chart + '_canvas', canvas)
+            self.chart_layouts[chart].addWidget(canvas)
+            self.attach_chart(chart, canvas)
+        # Число столбцов графиков по периодам и операциям зависит от их ширины
+        self.orders_canvas.settled.connect(self.on_summary_resized)
+        self.complexity_canvas.settled.connect(self.on_summary_resized)
+        self.update_analytics()
+
+    def create_canvas(self):
+        """Создание canvas matplotlib для графика (с кэшем растра)"""
+        from chart_canvas import ChartCanvas
+        from matplotlib.figure import Figure
+        canvas = ChartCanvas(Figure(figsize=(8, 5), dpi=100))
+        canvas.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        canvas.setMinimumHeight(300)
+        canvas.setMinimumWidth(400)
+        return canvas
+
+    def attach_chart(self, chart, canvas):
+        """Создание постоянного графика на фигуре canvas"""
+        self.charts[chart] = self.analytics.create_chart(chart, canvas.figure,
+                                                         animated=True)
+        self.charts[chart].attach(canvas)
+        canvas.chart = self.charts[chart]
+
+    @profiling.timed('ui')
+    def update_canvas(self, chart, data_func, *args):
+        """Постановка расчета данных графика в фоновую очередь"""
+        self.chart_pipeline.submit(chart, data_func, *args)
+
+    @profiling.timed('ui')
+    def on_chart_ready(self, chart, data):
+        """Обновление графика на месте по данным, рассчитанным в фоне"""
+        if chart not in self.charts or data is None:
+            return
+        if chart == 'employees':
+            # Страница рейтинга: диаграмма и тепловая карта строятся одной задачей
+            self.employee_page, total, data, heatmap = data
+            self.update_employee_pager(total)
+            with profiling.span('Chart.show(employee_operations)', 'chart'):
+                self.charts['employee_operations'].show(heatmap)
+        with profiling.span(f'Chart.show({chart})', 'chart'):
+            self.charts[chart].show(data)
+
+    def on_chart_failed(self, chart, error):
+        """Сообщение об ошибке расчета данных графика вместо устаревших данных"""
+        self.statusBar().showMessage(f"Ошибка построения графика: {error}", 10000)
+        if chart not in self.charts:
+            return
+        message = f"Ошибка построения графика:\n{error}"
+        if chart == 'employees':
+            # Страница рейтинга не получена: подпись и кнопки страниц сбрасываются
+            self.update_employee_pager(0)
+            self.charts['employee_operations'].show(message)
+        self.charts[chart].show(message)
 
     def update_analytics(self):
         """Обновление графиков"""
-        window_size = self.size()
-        canvas_width = window_size.width() - 100
-        canvas_height = 300
-        
+        self.refresh.request('summary', 'employees', 'prediction')
+
+    @profiling.timed('ui')
+    def update_summary_charts(self):
+        """Обновление графиков по периодам, цехам и операциям"""
+        if self.analytics is None:
+            return
         # Обновляем график по периодам
         period_type = self.period_combo.currentText().lower()
         if period_type == "день":
@@ -648,30 +1036,115 @@ class MainWindow(QMainWindow):
         else:
             period_type = "year"
             
-        # Обновляем все графики с новыми размерами
-        def update_canvas(canvas, plot_func, *args):
-            if canvas:
-                canvas.figure.clear()
-                new_figure = plot_func(*args)
-                if new_figure:
-                    canvas.figure = new_figure
-                    canvas.figure.set_size_inches(canvas_width/100, canvas_height/100)
-                    canvas.figure.tight_layout()
-                    canvas.draw()
-        
-        # Обновляем каждый график
-        update_canvas(self.orders_canvas, 
-                     self.analytics.plot_orders_by_period, 
-                     period_type)
-        
-        update_canvas(self.productivity_canvas,
-                     self.analytics.plot_workshop_productivity,
-                     datetime.now() - timedelta(days=365),
-                     datetime.now())
-        
-        update_canvas(self.complexity_canvas,
-                     self.analytics.plot_operation_complexity)
+        # Обновляем каждый график; детализация - по ширине canvas
+        self.summary_widths = (self.orders_canvas.width(), self.complexity_canvas.width())
+        self.update_canvas('orders', 
+                           self.analytics.orders_data, 
+                           period_type, self.orders_canvas.width())
         
+        self.update_productivity_chart()
+        
+        self.update_canvas('complexity',
+                           self.analytics.complexity_data,
+                           self.complexity_canvas.width())
+
+    def on_summary_resized(self):
+        """Пересчет графиков по периодам и операциям, если после изменения
+        размера в них помещается другое число столбцов"""
+        from analytics import bar_limit
+        widths = (self.orders_canvas.width(), self.complexity_canvas.width())
+        if list(map(bar_limit, widths)) != list(map(bar_limit, self.summary_widths)):
+            self.refresh.request('summary')
+
+    @profiling.timed('ui')
+    def update_productivity_chart(self):
+        """Обновление диаграммы эффективности цехов за выбранный период"""
+        if self.analytics is None:
+            return
+        self.update_range_dates()
+        self.update_canvas('productivity',
+                           self.analytics.productivity_data,
+                           *self.productivity_range())
+
+    @profiling.timed('ui')
+    def update_employee_charts(self):
+        """Обновление рейтинга сотрудников и тепловой карты по операциям"""
+        if self.analytics is None:
+            return
+        workshop = self.employee_workshop_combo.currentText()
+        self.update_canvas('employees',
+                           self.analytics.employee_data,
+                           None if workshop in ('', ALL_WORKSHOPS) else int(workshop),
+                           *self.productivity_range(),
+                           self.employee_metric_combo.currentData(),
+                           self.employee_page)
+
+    def update_employee_pager(self, total):
+        """Подпись и кнопки страниц рейтинга сотрудников"""
+        from analytics import EMPLOYEE_PAGE_SIZE
+        first = self.employee_page * EMPLOYEE_PAGE_SIZE
+        last = min(first + EMPLOYEE_PAGE_SIZE, total)
+        self.employee_page_label.setText(f"{first + 1}–{last} из {total}" if total else "")
+        self.employee_prev_button.setEnabled(self.employee_page > 0)
+        self.employee_next_button.setEnabled(last < total)
+
+    def show_employee_page(self, step):
+        """Переход на соседнюю страницу рейтинга сотрудников"""
+        self.employee_page = max(self.employee_page + step, 0)
+        self.refresh.request('employees')
+
+    def on_employee_scope_changed(self):
+        """Смена цеха, показателя или периода рейтинга: показ с первой страницы"""
+        self.employee_page = 0
+        self.refresh.request('employees')
+
+    def productivity_range(self):
+        """Выбранный период эффективности цехов: (начало, конец) в формате ГГГГ-ММ-ДД"""
+        dates = sorted([self.range_from.date(), self.range_to.date()])
+        return tuple(date.toString("yyyy-MM-dd") for date in dates)
+
+    def update_range_dates(self):
+        """Заполнение дат периода по выбранному варианту (кроме произвольного)"""
+        preset = self.range_combo.currentText()
+        today = QDate.currentDate()
+        if PRODUCTIVITY_RANGES[preset] is not None:
+            start, end = PRODUCTIVITY_RANGES[preset](today), today
+        elif preset == "Все время":
+            first, last = self.db.get_date_range()
+            start = QDate.fromString(first, "yyyy-MM-dd") if first else today
+            end = QDate.fromString(last, "yyyy-MM-dd") if last else today
+        else:
+            return
+        for date_edit, value in [(self.range_from, start), (self.range_to, end)]:
+            date_edit.blockSignals(True)
+            date_edit.setDate(value)
+            date_edit.blockSignals(False)
+
+    def on_range_preset_changed(self):
+        """Выбор варианта периода эффективности цехов"""
+        self.update_range_dates()
+        self.refresh.request('productivity')
+        self.on_employee_scope_changed()
+
+    def on_range_date_changed(self):
+        """Ручной ввод дат периода: вариант меняется на произвольный"""
+        self.range_combo.blockSignals(True)
+        self.range_combo.setCurrentText("Произвольный")
+        self.range_combo.blockSignals(False)
+        self.refresh.request('productivity')
+        self.on_employee_scope_changed()
+
+    def on_horizon_changed(self, horizon):
+        """Смена горизонта прогноза"""
+        if self.analytics is not None:
+            self.analytics.horizon = horizon
+            self.refresh.request('prediction')
+
+    @profiling.timed('ui')
+    def update_prediction(self):
+        """Обновление прогноза производительности выбранного цеха"""
+        if self.analytics is None:
+            return
         # Обновляем прогноз если выбран цех
         workshop = self.workshop_combo.currentText()
         if workshop:
@@ -702,15 +1175,8 @@ class MainWindow(QMainWindow):
                 """)
                 
                 # Создаем и настраиваем canvas для прогноза
-                self.prediction_canvas = FigureCanvas(
-                    self.analytics.predict_workshop_productivity(int(workshop))
-                )
-                self.prediction_canvas.setSizePolicy(QSizePolicy.Policy.Expanding, 
-                                                   QSizePolicy.Policy.Expanding)
-                self.prediction_canvas.setMinimumHeight(300)
-                self.prediction_canvas.setMinimumWidth(400)
-                self.prediction_canvas.figure.set_size_inches(canvas_width/100, 
-                                                            canvas_height/100)
+                self.prediction_canvas = self.create_canvas()
+                self.attach_chart('prediction', self.prediction_canvas)
                 
                 # Добавляем элементы в контейнер
                 prediction_layout.addWidget(prediction_label)
@@ -719,13 +1185,73 @@ class MainWindow(QMainWindow):
                 # Добавляем контейнер в основной layout
                 self.tabs.widget(1).findChild(QScrollArea).widget().layout().addWidget(
                     prediction_container)
-            else:
-                update_canvas(self.prediction_canvas,
-                            self.analytics.predict_workshop_productivity,
-                            int(workshop))
+            
+            self.update_canvas('prediction',
+                               self.analytics.prediction_data,
+                               int(workshop))
 
-if __name__ == '__main__':
-    app = QApplication(sys.argv)
+
+class StartupProbe(QObject):
+    """Замер времени запуска (переменная окружения NARYAD_STARTUP_PROBE).
+
+    Время от старта процесса (NARYAD_PROBE_START) до первой отрисовки
+    заставки и главного окна выводится строкой JSON, после чего программа
+    завершается.
+    """
+
+    def __init__(self, start):
+        super().__init__()
+        self.start = start
+        self.marks = {'main_started': time.time() - start}
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint and isinstance(obj, QWidget):
+            elapsed = time.time() - self.start
+            self.marks.setdefault('first_paint', elapsed)
+            if isinstance(obj.window(), MainWindow) and 'window_paint' not in self.marks:
+                self.marks['window_paint'] = elapsed
+                self.marks['heavy_modules_loaded'] = [
+                    name for name in ('numpy', 'matplotlib', 'pandas', 'sklearn')
+                    if name in sys.modules]
+                QTimer.singleShot(0, self.finish)
+        return False
+
+    def finish(self):
+        """Вывод замеров и завершение программы"""
+        for widget in QApplication.topLevelWidgets():
+            widget.close()
+        print(json.dumps(self.marks), flush=True)
+        os._exit(0)
+
+
+def close_bootloader_splash():
+    """Закрытие заставки загрузчика PyInstaller, если она есть в сборке"""
+    try:
+        import pyi_splash
+    except ImportError:
+        return
+    pyi_splash.close()
+
+
+def main():
+    app = QApplication.instance() or QApplication(sys.argv)
+    if os.environ.get('NARYAD_STARTUP_PROBE'):
+        probe = StartupProbe(float(os.environ.get('NARYAD_PROBE_START', time.time())))
+        app.installEventFilter(probe)
+    # Заставка показывается до создания окна и загрузки данных
+    pixmap = QPixmap(400, 120)
+    pixmap.fill(QColor('#2d2d2d'))
+    splash = QSplashScreen(pixmap)
+    splash.showMessage("Система учета нарядов\nЗагрузка...",
+                       Qt.AlignmentFlag.AlignCenter, Qt.GlobalColor.white)
+    splash.show()
+    close_bootloader_splash()
+    app.processEvents()
     window = MainWindow()
     window.show()
-    sys.exit(app.exec())
+    splash.finish(window)
+    return app.exec()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
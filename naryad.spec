@@ -76,10 +76,8 @@ a = Analysis(
         'PyQt6.QtPrintSupport',
         'PyQt6.sip',
         'numpy',
-        'pandas',
         'matplotlib',
-        'sklearn',
-        'matplotlib.backends.backend_qt5agg'
+        'matplotlib.backends.backend_qtagg'
     ],
     hookspath=[],
     hooksconfig={},
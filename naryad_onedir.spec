@@ -0,0 +1,169 @@
+# -*- mode: python ; coding: utf-8 -*-
+# Облегченная сборка в каталог (onedir): программа запускается без распаковки
+# во временный каталог и без распаковки UPX, из научного стека включаются
+# только используемые модули (numpy и matplotlib с бэкендами Agg/QtAgg).
+#
+#     pyinstaller naryad_onedir.spec
+#
+# Результат: dist/naryad/naryad и каталог dist/naryad/_internal.
+import os
+import sys
+
+block_cipher = None
+
+qt_binaries = []
+qt_plugins = []
+
+if sys.platform == 'win32':
+    site_packages = [p for p in sys.path if 'site-packages' in p][0]
+    qt_path = os.path.join(site_packages, 'PyQt6', 'Qt6')
+    binaries_path = os.path.join(qt_path, 'bin')
+    plugins_path = os.path.join(qt_path, 'plugins')
+
+    required_dlls = [
+        'Qt6Core.dll',
+        'Qt6Gui.dll',
+        'Qt6Widgets.dll'
+    ]
+
+    for dll in required_dlls:
+        dll_path = os.path.join(binaries_path, dll)
+        if os.path.exists(dll_path):
+            qt_binaries.append((dll_path, '.'))
+
+    required_plugins = {
+        'platforms': ['qwindows.dll'],
+        'styles': ['qwindowsvistastyle.dll']
+    }
+
+    for plugin_type, plugin_files in required_plugins.items():
+        plugin_dir = os.path.join(plugins_path, plugin_type)
+        if os.path.exists(plugin_dir):
+            for file in plugin_files:
+                plugin_path = os.path.join(plugin_dir, file)
+                if os.path.exists(plugin_path):
+                    qt_plugins.append((plugin_path, os.path.join('PyQt6', 'Qt6', 'plugins', plugin_type)))
+
+# Модули Qt, которые программа не использует
+qt_excludes = [
+    'PyQt6.QtNetwork',
+    'PyQt6.Qt3D*',
+    'PyQt6.QtBluetooth',
+    'PyQt6.QtDBus',
+    'PyQt6.QtDesigner',
+    'PyQt6.QtHelp',
+    'PyQt6.QtLocation',
+    'PyQt6.QtMultimedia',
+    'PyQt6.QtNfc',
+    'PyQt6.QtOpenGL',
+    'PyQt6.QtOpenGLWidgets',
+    'PyQt6.QtPdf',
+    'PyQt6.QtPositioning',
+    'PyQt6.QtPrintSupport',
+    'PyQt6.QtQml',
+    'PyQt6.QtQuick',
+    'PyQt6.QtSensors',
+    'PyQt6.QtSerialPort',
+    'PyQt6.QtSql',
+    'PyQt6.QtSvg',
+    'PyQt6.QtTest',
+    'PyQt6.QtWebChannel',
+    'PyQt6.QtWebEngine',
+    'PyQt6.QtWebSockets',
+    'PyQt6.QtXml'
+]
+
+# Научный стек: прогноз строится на NumPy, pandas и scikit-learn не нужны;
+# из matplotlib исключаются бэкенды других GUI-библиотек и тесты. pyarrow
+# остается: им читается архив закрытых месяцев (импортируется при первом
+# обращении к архиву и на время запуска не влияет)
+science_excludes = [
+    'pandas',
+    'sklearn',
+    'scipy',
+    'joblib',
+    'threadpoolctl',
+    'IPython',
+    'jedi',
+    'tkinter',
+    '_tkinter',
+    'matplotlib.tests',
+    'matplotlib.testing',
+    'matplotlib.backends.backend_gtk3',
+    'matplotlib.backends.backend_gtk3agg',
+    'matplotlib.backends.backend_gtk3cairo',
+    'matplotlib.backends.backend_gtk4',
+    'matplotlib.backends.backend_gtk4agg',
+    'matplotlib.backends.backend_gtk4cairo',
+    'matplotlib.backends.backend_macosx',
+    'matplotlib.backends.backend_nbagg',
+    'matplotlib.backends.backend_qt5',
+    'matplotlib.backends.backend_qt5agg',
+    'matplotlib.backends.backend_qt5cairo',
+    'matplotlib.backends.backend_qtcairo',
+    'matplotlib.backends.backend_tkagg',
+    'matplotlib.backends.backend_tkcairo',
+    'matplotlib.backends._backend_tk',
+    'matplotlib.backends.backend_webagg',
+    'matplotlib.backends.backend_webagg_core',
+    'matplotlib.backends.backend_wx',
+    'matplotlib.backends.backend_wxagg',
+    'matplotlib.backends.backend_wxcairo',
+    'numpy.f2py',
+    'numpy.distutils',
+    'PyQt5',
+    'PySide2',
+    'PySide6'
+]
+
+a = Analysis(
+    ['main.py'],
+    pathex=[],
+    binaries=qt_binaries,
+    datas=qt_plugins,
+    hiddenimports=[
+        # импортируются при первом открытии вкладки аналитики
+        'analytics',
+        'charts',
+        'chart_canvas',
+        'matplotlib.backends.backend_qtagg'
+    ],
+    hookspath=[],
+    hooksconfig={
+        # только бэкенды, которые использует программа
+        'matplotlib': {'backends': ['Agg', 'QtAgg']}
+    },
+    runtime_hooks=['qt_runtime_hook.py'],
+    excludes=qt_excludes + science_excludes,
+    win_no_prefer_redirects=False,
+    win_private_assemblies=False,
+    cipher=block_cipher,
+    noarchive=False,
+)
+
+pyz = PYZ(a.pure, a.zipped_data, cipher=block_cipher)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='naryad',
+    debug=False,
+    strip=False,
+    upx=False,
+    console=True,
+    disable_windowed_traceback=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+)
+
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    name='naryad',
+)
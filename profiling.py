@@ -0,0 +1,180 @@
+import json
+import logging
+import os
+import threading
+import time
+import types
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+# Профилирование включается переменной окружения NARYAD_PROFILE=1. Когда оно
+# выключено, декораторы возвращают функции без изменений, а span() - пустой
+# контекст, поэтому замеры ничего не стоят.
+ENABLED = os.environ.get('NARYAD_PROFILE', '') not in ('', '0')
+
+# Порог медленного SQL-запроса (мс) и файл, в который трассировка
+# сохраняется при закрытии программы
+SLOW_SQL_MS = float(os.environ.get('NARYAD_SLOW_SQL_MS', '50'))
+TRACE_FILE = os.environ.get('NARYAD_TRACE_FILE')
+
+# Сколько последних интервалов и медленных запросов хранится в памяти
+MAX_SPANS = 100000
+MAX_SLOW_STATEMENTS = 200
+
+logger = logging.getLogger('naryad.profiling')
+
+NO_SPAN = nullcontext()
+
+
+class Profiler:
+    """Сбор интервалов времени (spans) и медленных SQL-запросов.
+
+    Интервал - имя, категория, начало, длительность и поток. SQL-запросы
+    приходят через функцию трассировки SQLite (trace_sql) и относятся к
+    внешнему интервалу категории 'database' того же потока; время запроса
+    считается до начала следующего запроса или до конца интервала, то есть
+    вместе с чтением строк результата.
+    """
+
+    def __init__(self, max_spans=MAX_SPANS):
+        self.spans = deque(maxlen=max_spans)
+        self.slow_statements = deque(maxlen=MAX_SLOW_STATEMENTS)
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.origin = time.perf_counter()
+
+    @contextmanager
+    def span(self, name, category):
+        """Замер интервала на время блока with"""
+        local = self.local
+        collect = category == 'database' and getattr(local, 'statements', None) is None
+        if collect:
+            local.statements = []
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            args = None
+            if collect:
+                statements, local.statements = local.statements, None
+                args = self.check_statements(name, statements, end)
+            thread = threading.current_thread()
+            with self.lock:
+                self.spans.append((name, category, start - self.origin, end - start,
+                                   thread.ident, thread.name, args))
+
+    def trace_sql(self, statement):
+        """Функция трассировки SQLite: запоминание начала запроса"""
+        statements = getattr(self.local, 'statements', None)
+        if statements is not None:
+            statements.append((time.perf_counter(), statement))
+
+    def check_statements(self, name, statements, end):
+        """Поиск медленных запросов интервала; возвращает аргументы интервала"""
+        if not statements:
+            return None
+        ends = [started for started, _ in statements[1:]] + [end]
+        for (started, statement), finished in zip(statements, ends):
+            elapsed = (finished - started) * 1000
+            if elapsed >= SLOW_SQL_MS:
+                sql = ' '.join(statement.split())
+                logger.warning('Медленный запрос %s: %.1f мс: %s', name, elapsed, sql)
+                with self.lock:
+                    self.slow_statements.append((name, elapsed, sql))
+        return {'sql_statements': len(statements)}
+
+    def stats(self):
+        """Сводка по именам интервалов: [(имя, категория, количество, сумма, максимум)] в мс"""
+        totals = {}
+        with self.lock:
+            spans = list(self.spans)
+        for name, category, start, duration, *_ in spans:
+            total = totals.setdefault((name, category), [0, 0.0, 0.0])
+            total[0] += 1
+            total[1] += duration * 1000
+            total[2] = max(total[2], duration * 1000)
+        rows = [(name, category, count, total, maximum)
+                for (name, category), (count, total, maximum) in totals.items()]
+        return sorted(rows, key=lambda row: row[3], reverse=True)
+
+    def slow_sql(self):
+        """Медленные запросы: [(метод, мс, текст запроса)], последние - первыми"""
+        with self.lock:
+            return list(reversed(self.slow_statements))
+
+    def clear(self):
+        """Удаление накопленных интервалов и медленных запросов"""
+        with self.lock:
+            self.spans.clear()
+            self.slow_statements.clear()
+
+    def chrome_trace(self):
+        """Трассировка в формате Chrome Trace Event (chrome://tracing, Perfetto)"""
+        pid = os.getpid()
+        events = []
+        threads = {}
+        with self.lock:
+            spans = list(self.spans)
+        for name, category, start, duration, thread_id, thread_name, args in spans:
+            threads[thread_id] = thread_name
+            event = {'name': name, 'cat': category, 'ph': 'X', 'pid': pid, 'tid': thread_id,
+                     'ts': round(start * 1e6, 1), 'dur': round(duration * 1e6, 1)}
+            if args:
+                event['args'] = args
+            events.append(event)
+        for thread_id, thread_name in threads.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': thread_id,
+                           'args': {'name': thread_name}})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export_chrome_trace(self, path):
+        """Сохранение трассировки в файл JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f, ensure_ascii=False)
+
+
+profiler = Profiler() if ENABLED else None
+
+# Функция трассировки SQL для соединений с базой (None - трассировка выключена)
+SQL_TRACE = profiler.trace_sql if ENABLED else None
+
+
+def span(name, category):
+    """Интервал на время блока with (пустой контекст, если профилирование выключено)"""
+    if profiler is None:
+        return NO_SPAN
+    return profiler.span(name, category)
+
+
+def wrap(function, name, category):
+    """Функция с замером каждого вызова (та же функция, если профилирование выключено)"""
+    if profiler is None:
+        return function
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        with profiler.span(name, category):
+            return function(*args, **kwargs)
+    return wrapper
+
+
+def timed(category, name=None):
+    """Декоратор замера функции или метода"""
+    def decorator(function):
+        return wrap(function, name or function.__qualname__, category)
+    return decorator
+
+
+def instrument(category, exclude=()):
+    """Декоратор класса: замер всех открытых методов, кроме exclude"""
+    def decorator(cls):
+        if profiler is None:
+            return cls
+        for name, value in list(vars(cls).items()):
+            if (isinstance(value, types.FunctionType) and not name.startswith('_')
+                    and name not in exclude):
+                setattr(cls, name, wrap(value, f'{cls.__name__}.{name}', category))
+        return cls
+    return decorator
@@ -0,0 +1,194 @@
+import argparse
+import csv
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+
+import matplotlib
+matplotlib.use('Agg')  # отчет строится без Qt и без дисплея
+
+from analytics import Analytics, FORECAST_HORIZON, MAX_FORECAST_HORIZON
+from forecasting import MODELS
+from database import Database
+from importer import parse_date
+
+# Форматы изображений графиков и периоды графика количества нарядов
+FORMATS = ('png', 'svg', 'pdf')
+PERIODS = ('day', 'month', 'year')
+
+# Аналитика процесса пула: у каждого процесса свое соединение с базой
+# и свои агрегаты (создаются в init_worker)
+worker_analytics = None
+
+
+def init_worker(db_name, horizon=FORECAST_HORIZON):
+    """Инициализация процесса пула"""
+    global worker_analytics
+    worker_analytics = Analytics(Database(db_name, read_only=True, pool_size=0), horizon)
+
+
+def report_jobs(periods, workshops, start_date, end_date):
+    """Задания отчета: (имя графика, аргументы)"""
+    jobs = [('orders', (period,)) for period in periods]
+    jobs.append(('productivity', (start_date, end_date)))
+    jobs.append(('complexity', ()))
+    jobs += [('prediction', (workshop,)) for workshop in workshops]
+    return jobs
+
+
+def job_name(name, args):
+    """Имя файлов задания без расширения"""
+    if name == 'orders':
+        return f'orders_{args[0]}'
+    if name == 'prediction':
+        return f'forecast_workshop_{args[0]}'
+    return name
+
+
+def chart_data(analytics, name, args):
+    """Данные графика в виде, который принимает Analytics.render"""
+    if name == 'orders':
+        return analytics.orders_data(*args)
+    if name == 'productivity':
+        return analytics.productivity_data(*args)
+    if name == 'complexity':
+        return analytics.complexity_data()
+    return analytics.prediction_data(*args)
+
+
+def chart_table(analytics, name, args):
+    """Таблица агрегатов графика: (заголовки, строки)"""
+    if name == 'orders':
+        return (['Период', 'Количество нарядов'],
+                analytics.aggregates.orders_by_period(*args))
+    if name == 'productivity':
+        return (['Цех', 'Количество деталей', 'Производительность'],
+                analytics.aggregates.workshop_productivity(*args))
+    if name == 'complexity':
+        return (['Код операции', 'Среднее время (норма)', 'Количество нарядов'],
+                analytics.aggregates.operation_complexity())
+    months, values, predictions, lower, upper, model = analytics.workshop_forecast(*args)
+    # Месяцы без нарядов остаются в календаре с пустым значением
+    rows = [(month, '' if math.isnan(value) else value, '', '', 'факт')
+            for month, value in zip(months, values)]
+    if predictions is not None:
+        future = analytics.future_labels(months, len(predictions))
+        rows += [(month, value, low, high, f'прогноз ({MODELS[model]})')
+                 for month, value, low, high in zip(future, predictions, lower, upper)]
+    return ['Месяц', 'Производительность', 'Нижняя граница', 'Верхняя граница', 'Тип'], rows
+
+
+def write_csv(path, header, rows):
+    """Запись таблицы в CSV (разделитель ';', кодировка для Excel)"""
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def render_job(job, directory, formats):
+    """Построение графика и таблицы одного задания; возвращает пути файлов"""
+    name, args = job
+    base = os.path.join(directory, job_name(name, args))
+    header, rows = chart_table(worker_analytics, name, args)
+    write_csv(base + '.csv', header, rows)
+    paths = [base + '.csv']
+    figure = worker_analytics.render(name, chart_data(worker_analytics, name, args))
+    if figure is not None:
+        if len(formats) > 1:
+            # Компоновка рассчитывается один раз и сохраняется для всех форматов
+            figure.draw_without_rendering()
+            figure.set_layout_engine('none')
+        for extension in formats:
+            figure.savefig(f'{base}.{extension}')
+            paths.append(f'{base}.{extension}')
+    return paths
+
+
+def generate_reports(db_name, directory, formats=('png',), periods=PERIODS,
+                     workshops=None, start_date=None, end_date=None, workers=None,
+                     horizon=FORECAST_HORIZON):
+    """Построение отчета: графики аналитики и таблицы их агрегатов.
+
+    Задания (графики периодов, цехов и прогнозы по цехам) выполняются в
+    пуле из workers процессов; при workers=1 - в текущем процессе.
+    workshops=None - прогнозы для всех цехов, по умолчанию производительность
+    цехов считается за последние 365 дней, как на вкладке "Аналитика",
+    прогноз строится на horizon месяцев. Возвращает список созданных файлов.
+    """
+    if not os.path.exists(db_name):
+        raise FileNotFoundError(f"Файл базы данных не найден: {db_name}")
+    end_date = end_date or datetime.now().strftime('%Y-%m-%d')
+    start_date = start_date or (datetime.strptime(end_date, '%Y-%m-%d')
+                                - timedelta(days=365)).strftime('%Y-%m-%d')
+    if workshops is None:
+        db = Database(db_name, read_only=True, pool_size=0)
+        try:
+            workshops = db.get_workshops()
+        finally:
+            db.close()
+    os.makedirs(directory, exist_ok=True)
+    jobs = report_jobs(periods, workshops, start_date, end_date)
+    render = partial(render_job, directory=directory, formats=formats)
+    if workers == 1:
+        init_worker(db_name, horizon)
+        results = map(render, jobs)
+        return [path for paths in results for path in paths]
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(db_name, horizon)) as pool:
+        # Прогнозы по цехам раздаются пачками: процесс строит прогнозы всех
+        # цехов одной группировкой при первом обращении и дальше берет их из кэша
+        chunksize = max(1, len(jobs) // (4 * (workers or os.cpu_count() or 1)))
+        results = pool.map(render, jobs, chunksize=chunksize)
+        return [path for paths in results for path in paths]
+
+
+def build_parser():
+    """Разбор аргументов командной строки"""
+    parser = argparse.ArgumentParser(
+        description='Отчет по аналитике нарядов без графического интерфейса: '
+                    'графики (PNG/SVG/PDF) и таблицы данных (CSV)')
+    parser.add_argument('--db', default='naryad.db',
+                        help='путь к файлу базы данных (по умолчанию naryad.db)')
+    parser.add_argument('--out', default='reports',
+                        help='каталог отчета (по умолчанию reports)')
+    parser.add_argument('--format', dest='formats', nargs='+', choices=FORMATS,
+                        default=['png'], help='форматы графиков (по умолчанию png)')
+    parser.add_argument('--period', dest='periods', nargs='+', choices=PERIODS,
+                        default=list(PERIODS),
+                        help='периоды графика количества нарядов (по умолчанию все)')
+    parser.add_argument('--workshop', dest='workshops', nargs='+', type=int,
+                        help='цеха для прогноза (по умолчанию все)')
+    parser.add_argument('--start', type=parse_date,
+                        help='начало периода производительности цехов (ДД.ММ.ГГГГ)')
+    parser.add_argument('--end', type=parse_date,
+                        help='конец периода производительности цехов (ДД.ММ.ГГГГ)')
+    parser.add_argument('--horizon', type=int, default=FORECAST_HORIZON,
+                        choices=range(1, MAX_FORECAST_HORIZON + 1), metavar='МЕСЯЦЕВ',
+                        help=f'горизонт прогноза (по умолчанию {FORECAST_HORIZON})')
+    parser.add_argument('--workers', type=int,
+                        help='количество процессов (по умолчанию по числу ядер)')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    started = time.perf_counter()
+    try:
+        paths = generate_reports(args.db, args.out, args.formats, args.periods,
+                                 args.workshops, args.start, args.end, args.workers,
+                                 args.horizon)
+    except (OSError, ValueError) as e:
+        print(f'Ошибка: {e}', file=sys.stderr)
+        return 1
+    print(f'Создано файлов: {len(paths)} в каталоге {args.out} '
+          f'за {time.perf_counter() - started:.1f} с')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,56 @@
+from PyQt6.QtCore import QObject, QTimer
+
+
+class RefreshScheduler(QObject):
+    """Объединение запросов на обновление графиков.
+
+    Запросы копятся в наборе «грязных» частей и выполняются по таймеру:
+    все запросы, пришедшие до его срабатывания (при delay=0 - за один проход
+    цикла событий), объединяются, и каждая часть обновляется один раз.
+    Новый запрос перезапускает таймер, поэтому серия частых запросов
+    обрабатывается после последнего из них.
+    """
+
+    def __init__(self, handlers, delay=0, parent=None):
+        super().__init__(parent)
+        self.handlers = handlers  # часть -> функция обновления (в порядке выполнения)
+        self.pending = set()
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self.flush)
+        self.requested = 0  # всего запросов
+        self.executed = 0   # выполненных обновлений
+
+    def request(self, *parts):
+        """Пометка частей как требующих обновления"""
+        for part in parts:
+            if part not in self.handlers:
+                raise ValueError(f"Неизвестная часть обновления: {part}")
+            self.requested += 1
+            self.pending.add(part)
+        self.timer.start()
+
+    def flush(self):
+        """Выполнение накопленных обновлений"""
+        self.timer.stop()
+        pending, self.pending = self.pending, set()
+        for part, handler in self.handlers.items():
+            if part in pending:
+                self.executed += 1
+                handler()
+
+    def cancel(self):
+        """Отмена накопленных обновлений"""
+        self.timer.stop()
+        self.pending.clear()
+
+    def avoided(self):
+        """Количество запросов, объединенных с другими"""
+        return self.requested - self.executed - len(self.pending)
+
+    def summary(self):
+        """Текстовая сводка счетчиков"""
+        return (f'Запросов обновления: {self.requested}, '
+                f'выполнено: {self.executed}, '
+                f'объединено: {self.avoided()}')
@@ -0,0 +1,299 @@
+import argparse
+import asyncio
+import json
+import sqlite3
+import sys
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from urllib.parse import parse_qs, urlsplit
+
+from database import Database, READER_POOL_SIZE
+from importer import parse_date
+
+# Адрес по умолчанию: только подключения с этого компьютера
+HOST = '127.0.0.1'
+PORT = 8765
+
+# Число запоминаемых ответов, ожидание следующего запроса в открытом
+# соединении (секунды) и наибольший размер заголовков запроса (байты)
+RESPONSE_CACHE_SIZE = 256
+KEEP_ALIVE_TIMEOUT = 15
+MAX_HEADER_SIZE = 16384
+
+# Границы периода производительности цехов по умолчанию (все время)
+FIRST_DATE = '0001-01-01'
+LAST_DATE = '9999-12-31'
+
+PERIODS = ('day', 'month', 'year')
+
+REASONS = {
+    200: 'OK',
+    304: 'Not Modified',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    500: 'Internal Server Error',
+}
+
+
+def date_parameter(params, name, default):
+    """Дата из параметра запроса (ДД.ММ.ГГГГ или ГГГГ-ММ-ДД)"""
+    value = params.get(name)
+    if value is None:
+        return default
+    try:
+        return parse_date(value)
+    except ValueError:
+        raise ValueError(f"Неверный формат даты в параметре {name}: {value}")
+
+
+def workshop_productivity(db, params):
+    """Производительность цехов за период (параметры start и end)"""
+    start_date = date_parameter(params, 'start', FIRST_DATE)
+    end_date = date_parameter(params, 'end', LAST_DATE)
+    return [{'workshop': workshop, 'parts': parts, 'productivity': productivity}
+            for workshop, parts, productivity
+            in db.get_workshop_productivity(start_date, end_date)]
+
+
+def operation_complexity(db, params):
+    """Трудоемкость операций"""
+    return [{'operation_code': operation, 'avg_time': avg_time, 'count': count}
+            for operation, avg_time, count in db.get_operation_complexity()]
+
+
+def orders_by_period(db, params):
+    """Количество нарядов по периодам (параметр period: day, month или year)"""
+    period = params.get('period', 'month')
+    if period not in PERIODS:
+        raise ValueError(f"Неизвестный период: {period} (допустимы {', '.join(PERIODS)})")
+    return [{'period': label, 'count': count}
+            for label, count in db.get_orders_by_period(period)]
+
+
+# Адреса API -> функции запроса (база, параметры) -> данные JSON
+ENDPOINTS = {
+    '/api/workshops/productivity': workshop_productivity,
+    '/api/operations/complexity': operation_complexity,
+    '/api/orders': orders_by_period,
+}
+
+
+def error_body(message):
+    """Тело ответа с ошибкой"""
+    return json.dumps({'error': message}, ensure_ascii=False).encode()
+
+
+def matches_etag(header, etag):
+    """Совпадает ли заголовок If-None-Match с ETag ответа"""
+    tags = [tag.strip() for tag in header.split(',')]
+    return '*' in tags or etag in tags or 'W/' + etag in tags
+
+
+class ApiServer:
+    """HTTP-сервер JSON API аналитики только для чтения (asyncio).
+
+    Запросы к базе выполняются в пуле потоков на соединениях пула чтения
+    Database, цикл событий их не ждет. Версия данных - PRAGMA data_version
+    и отпечаток файлов архива; она же служит ETag ответов. Файлы архива
+    меняются только вместе с фиксацией переноса в базе, поэтому отпечаток
+    пересчитывается в пуле потоков лишь при смене data_version. Ответ
+    запоминается вместе с версией и отдается из памяти, пока версия не
+    изменится, а на запрос с If-None-Match текущей версии отвечается 304
+    без обращения к кэшу и к базе. Одинаковые запросы, пришедшие во время
+    расчета ответа, ждут его, а не запускают свой.
+    """
+
+    def __init__(self, db, workers=READER_POOL_SIZE, cache_size=RESPONSE_CACHE_SIZE):
+        self.db = db
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='api')
+        self.cache_size = cache_size
+        self.responses = OrderedDict()  # ключ запроса -> (версия, тело)
+        self.pending = {}               # (ключ запроса, версия) -> future расчета
+        self.signature = None           # (data_version, отпечаток архива)
+        # Счетчик data_version начинается заново при каждом запуске
+        self.instance = f'{time.time_ns():x}'
+
+    def archive_signature(self):
+        """Отпечаток файлов архива (в потоке пула: чтение каталога)"""
+        archive = self.db.archive
+        return hash(archive.signature(archive.partitions())) & 0xffffffff
+
+    async def version(self):
+        """Текущая версия данных (в цикле событий - только PRAGMA data_version)"""
+        data_version = self.db.data_version()
+        if self.signature is None or self.signature[0] != data_version:
+            signature = await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.archive_signature)
+            self.signature = (data_version, signature)
+        return f'{self.instance}-{data_version}-{self.signature[1]:x}'
+
+    def render(self, path, params):
+        """Расчет ответа в потоке пула: JSON в UTF-8"""
+        data = ENDPOINTS[path](self.db, params)
+        return json.dumps(data, ensure_ascii=False).encode()
+
+    async def response(self, path, params, version):
+        """Тело ответа для версии данных: из кэша или по запросу к базе"""
+        key = (path, tuple(sorted(params.items())))
+        cached = self.responses.get(key)
+        if cached is not None and cached[0] == version:
+            self.responses.move_to_end(key)
+            return cached[1]
+        future = self.pending.get((key, version))
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(
+                self.executor, self.render, path, params)
+            self.pending[(key, version)] = future
+            future.add_done_callback(lambda _: self.pending.pop((key, version), None))
+        # Отключившийся клиент не отменяет расчет, которого ждут другие
+        body = await asyncio.shield(future)
+        self.responses[key] = (version, body)
+        self.responses.move_to_end(key)
+        while len(self.responses) > self.cache_size:
+            self.responses.popitem(last=False)
+        return body
+
+    async def dispatch(self, method, target, headers):
+        """Ответ на запрос: (код, дополнительные заголовки, тело)"""
+        if method not in ('GET', 'HEAD'):
+            return 405, {'Allow': 'GET, HEAD'}, error_body(
+                'Поддерживаются только запросы GET и HEAD')
+        url = urlsplit(target)
+        path = url.path.rstrip('/')
+        if path not in ENDPOINTS:
+            return 404, {}, error_body(f'Неизвестный адрес: {url.path}')
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            version = await self.version()
+        except Exception as e:
+            traceback.print_exc()
+            return 500, {}, error_body(f'Ошибка сервера: {e}')
+        etag = f'"{version}"'
+        extra = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if matches_etag(headers.get('if-none-match', ''), etag):
+            return 304, extra, b''
+        try:
+            body = await self.response(path, params, version)
+        except ValueError as e:
+            return 400, {}, error_body(str(e))
+        except sqlite3.Error as e:
+            print(f'Ошибка запроса {target}: {e}', file=sys.stderr)
+            return 500, {}, error_body(f'Ошибка базы данных: {e}')
+        except Exception as e:
+            print(f'Ошибка запроса {target}:', file=sys.stderr)
+            traceback.print_exc()
+            return 500, {}, error_body(f'Ошибка сервера: {e}')
+        return 200, extra, body
+
+    async def handle(self, reader, writer):
+        """Обработка соединения: запросы читаются, пока клиент не закроет его"""
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'),
+                                                  KEEP_ALIVE_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError,
+                        asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                request = lines[0].split(' ')
+                if len(request) != 3:
+                    write_response(writer, 400, {}, error_body('Неверная строка запроса'), False)
+                    break
+                method, target, protocol = request
+                headers = {}
+                for line in lines[1:]:
+                    name, separator, value = line.partition(':')
+                    if separator:
+                        headers[name.strip().lower()] = value.strip()
+                # Тело запроса не используется, но должно быть прочитано
+                length = headers.get('content-length', '0')
+                if length.isdigit() and int(length):
+                    await reader.readexactly(int(length))
+                connection = headers.get('connection', '').lower()
+                keep_alive = (connection == 'keep-alive' or
+                              protocol == 'HTTP/1.1' and connection != 'close')
+                status, extra, body = await self.dispatch(method, target, headers)
+                write_response(writer, status, extra, body, keep_alive, method == 'HEAD')
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=HOST, port=PORT):
+        """Прием подключений до остановки цикла событий"""
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_SIZE)
+        address = server.sockets[0].getsockname()
+        print(f'API аналитики: http://{address[0]}:{address[1]}'
+              f' ({", ".join(ENDPOINTS)})', flush=True)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        """Остановка пула потоков"""
+        self.executor.shutdown(wait=True)
+
+
+def write_response(writer, status, headers, body, keep_alive, head=False):
+    """Запись ответа HTTP/1.1 (для HEAD - без тела)"""
+    lines = [f'HTTP/1.1 {status} {REASONS[status]}',
+             f'Date: {formatdate(usegmt=True)}']
+    if status != 304:
+        lines += ['Content-Type: application/json; charset=utf-8',
+                  f'Content-Length: {len(body)}']
+    lines += [f'{name}: {value}' for name, value in headers.items()]
+    lines.append('Connection: ' + ('keep-alive' if keep_alive else 'close'))
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') +
+                 (b'' if head or status == 304 else body))
+
+
+def build_parser():
+    """Разбор аргументов командной строки"""
+    parser = argparse.ArgumentParser(
+        description='HTTP-сервер JSON API аналитики нарядов только для чтения: '
+                    + ', '.join(ENDPOINTS))
+    parser.add_argument('--db', default='naryad.db',
+                        help='путь к файлу базы данных (по умолчанию naryad.db)')
+    parser.add_argument('--archive-dir',
+                        help='каталог архива (по умолчанию <имя базы>_archive)')
+    parser.add_argument('--host', default=HOST,
+                        help=f'адрес для подключений (по умолчанию {HOST})')
+    parser.add_argument('--port', type=int, default=PORT,
+                        help=f'порт (по умолчанию {PORT})')
+    parser.add_argument('--workers', type=int, default=READER_POOL_SIZE,
+                        help='соединений и потоков для запросов к базе '
+                             f'(по умолчанию {READER_POOL_SIZE})')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        db = Database(args.db, read_only=True, pool_size=args.workers,
+                      archive_dir=args.archive_dir)
+    except sqlite3.Error as e:
+        print(f'Ошибка: не удалось открыть базу {args.db}: {e}', file=sys.stderr)
+        return 1
+    server = ApiServer(db, args.workers)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except OSError as e:
+        print(f'Ошибка: {e}', file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        db.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
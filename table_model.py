@@ -0,0 +1,167 @@
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QDate
+from database import SORT_COLUMNS
+
+
+class NaryadTableModel(QAbstractTableModel):
+    """Модель таблицы нарядов с постраничной подгрузкой из базы данных.
+
+    Без фильтров и при сортировке по дате страницы читаются по ключу (дата,
+    шифр), а изменения записей применяются к загруженным строкам точечно.
+    С фильтрами или другой сортировкой строки выбираются поиском
+    (Database.search_records) со смещением, а после изменений перечитываются.
+    """
+
+    HEADERS = [
+        "Шифр", "Дата", "Цех", "Таб. номер",
+        "Операция", "Норма времени", "Кол-во деталей"
+    ]
+    DATE_COLUMN = 1
+    PAGE_SIZE = 500
+
+    def __init__(self, database, parent=None):
+        super().__init__(parent)
+        self.db = database
+        self.rows = []
+        self.has_more = True
+        self.filters = {}             # строка поиска (text) и фильтры search_records
+        self.order_by = 'date'
+        self.descending = False
+
+    def rowCount(self, parent=QModelIndex()):
+        """Количество уже загруженных строк"""
+        if parent.isValid():
+            return 0
+        return len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        """Количество столбцов"""
+        if parent.isValid():
+            return 0
+        return len(self.HEADERS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        """Форматирование значения ячейки в момент отрисовки"""
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        value = self.rows[index.row()][index.column()]
+        if index.column() == self.DATE_COLUMN:
+            return QDate.fromString(str(value), "yyyy-MM-dd").toString("dd.MM.yyyy")
+        return str(value)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        """Заголовки столбцов"""
+        if orientation != Qt.Orientation.Horizontal:
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignCenter
+        return None
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        """Сортировка по столбцу средствами базы данных"""
+        order_by = SORT_COLUMNS[column]
+        descending = order == Qt.SortOrder.DescendingOrder
+        if (order_by, descending) != (self.order_by, self.descending):
+            self.order_by = order_by
+            self.descending = descending
+            self.reload()
+
+    def set_filters(self, filters):
+        """Установка строки поиска и фильтров (пустые значения не учитываются)"""
+        filters = {name: value for name, value in filters.items()
+                   if value is not None and value != ''}
+        if filters != self.filters:
+            self.filters = filters
+            self.reload()
+
+    def is_keyset(self):
+        """Читаются ли страницы по ключу (дата, шифр) без поиска"""
+        return not self.filters and self.order_by == 'date' and not self.descending
+
+    def canFetchMore(self, parent=QModelIndex()):
+        """Есть ли еще не загруженные страницы"""
+        return not parent.isValid() and self.has_more
+
+    def fetchMore(self, parent=QModelIndex()):
+        """Подгрузка следующей страницы после последней загруженной строки"""
+        if parent.isValid() or not self.has_more:
+            return
+        if self.is_keyset():
+            after = None
+            if self.rows:
+                last = self.rows[-1]
+                after = (last[self.DATE_COLUMN], last[0])
+            page = self.db.get_records_page(after, self.PAGE_SIZE)
+        else:
+            page = self.db.search_records(order_by=self.order_by,
+                                          descending=self.descending,
+                                          limit=self.PAGE_SIZE,
+                                          offset=len(self.rows), **self.filters)
+        if len(page) < self.PAGE_SIZE:
+            self.has_more = False
+        if not page:
+            return
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+        self.rows.extend(page)
+        self.endInsertRows()
+
+    def reload(self):
+        """Сброс модели и загрузка первой страницы"""
+        self.beginResetModel()
+        self.rows = []
+        self.has_more = True
+        self.endResetModel()
+        self.fetchMore()
+
+    def record(self, row):
+        """Получение записи по номеру строки"""
+        return self.rows[row]
+
+    def row_key(self, record):
+        """Ключ сортировки записи (дата, шифр)"""
+        return (str(record[self.DATE_COLUMN]), str(record[0]))
+
+    def find_position(self, key):
+        """Бинарный поиск позиции ключа среди загруженных строк"""
+        low, high = 0, len(self.rows)
+        while low < high:
+            middle = (low + high) // 2
+            if self.row_key(self.rows[middle]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def apply_change(self, event, old, new):
+        """Точечное изменение модели по событию базы данных об одной записи
+        (после пакетных изменений окно перечитывает таблицу целиком)"""
+        if not self.is_keyset():
+            # Попадание записи под фильтры и ее место при другой сортировке
+            # определяет база данных
+            self.reload()
+            return
+        if old:
+            self.remove_record(old)
+        if new:
+            self.insert_record(new)
+
+    def remove_record(self, record):
+        """Удаление строки записи, если она загружена"""
+        key = self.row_key(record)
+        row = self.find_position(key)
+        if row < len(self.rows) and self.row_key(self.rows[row]) == key:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self.rows[row]
+            self.endRemoveRows()
+
+    def insert_record(self, record):
+        """Вставка строки записи в загруженный диапазон"""
+        row = self.find_position(self.row_key(record))
+        if row == len(self.rows) and self.has_more:
+            # Запись попадет в таблицу при подгрузке следующих страниц
+            return
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.rows.insert(row, tuple(record))
+        self.endInsertRows()
@@ -0,0 +1,69 @@
+import re
+
+import pytest
+
+from database import Database
+
+# Методы, запросы которых должны использовать индексы (поиск проверяется отдельно)
+ANALYTICS_METHODS = {
+    'get_records_page', 'get_workshops', 'workshop_exists', 'get_workshop_productivity',
+    'get_workshop_totals', 'get_date_range', 'get_employee_count', 'get_employee_ranking',
+    'get_employee_operations', 'get_operation_complexity', 'get_operation_totals',
+    'get_orders_by_period',
+}
+
+
+def make_records(count):
+    """Наряды за 2024 год по трем цехам и пяти операциям"""
+    return [(f'S{i:05d}', f'2024-{1 + i % 12:02d}-{1 + i % 28:02d}', 1 + i % 3,
+             100 + i % 20, f'OP{i % 5}', 1.0 + i % 4, 1 + i % 10)
+            for i in range(count)]
+
+
+def full_scans(db, plan):
+    """Шаги плана с полным просмотром таблицы без индекса.
+
+    Таблица WITHOUT ROWID хранится в B-дереве своего первичного ключа,
+    поэтому ее просмотр - это просмотр индекса.
+    """
+    tables = {name: 'WITHOUT ROWID' in sql.upper() for name, sql in db.conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'table'")}
+    result = []
+    for step in plan:
+        match = re.match(r'SCAN (\w+)', step)
+        if match and match.group(1) in tables and 'INDEX' not in step \
+                and not tables[match.group(1)]:
+            result.append(step)
+    return result
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = Database(str(tmp_path / 'naryad.db'))
+    database.add_records(make_records(2000), notify=False)
+    # Статистика для планировщика, как на заполненной базе
+    database.conn.execute('ANALYZE')
+    yield database
+    database.close()
+
+
+def test_analytics_queries_use_indexes(db):
+    results = [row for row in db.check_query_plans() if row[0] in ANALYTICS_METHODS]
+    assert {name for name, sql, plan, uses_index in results} == ANALYTICS_METHODS
+    scans = [(name, step) for name, sql, plan, uses_index in results
+             for step in full_scans(db, plan)]
+    assert scans == []
+    assert all(uses_index for name, sql, plan, uses_index in results)
+
+
+def test_search_queries_use_indexes(db):
+    results = [row for row in db.check_query_plans() if row[0] == 'search_records']
+    assert results
+    assert all(uses_index for name, sql, plan, uses_index in results)
+
+
+def test_full_scan_is_detected(db):
+    db.drop_indexes()
+    results = db.check_query_plans()
+    assert any(full_scans(db, plan) for name, sql, plan, uses_index in results)
+    assert not all(uses_index for name, sql, plan, uses_index in results)
@@ -0,0 +1,123 @@
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from database import Database
+from importer import import_file
+
+
+class ChartJobSignals(QObject):
+    """Сигналы фоновой задачи (QRunnable не может иметь собственных сигналов)"""
+    done = pyqtSignal(object)
+
+
+class ChartJob(QRunnable):
+    """Фоновая задача расчета данных одного графика"""
+
+    def __init__(self, chart, build, *args):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.chart = chart
+        self.build = build
+        self.args = args
+        self.cancelled = False
+        self.result = None
+        self.error = None
+        self.signals = ChartJobSignals()
+
+    def run(self):
+        """Выполнение задачи в потоке пула"""
+        if not self.cancelled:
+            try:
+                self.result = self.build(*self.args)
+            except Exception as e:
+                self.error = e
+        self.signals.done.emit(self)
+
+
+class ChartPipeline(QObject):
+    """Очередь расчета данных графиков вне потока интерфейса.
+
+    Для каждого графика выполняется не более одной актуальной задачи: новый
+    запрос отменяет еще не начатую задачу того же графика, а результат уже
+    выполняющейся устаревшей задачи отбрасывается.
+    """
+
+    finished = pyqtSignal(str, object)  # график, данные
+    failed = pyqtSignal(str, str)       # график, текст ошибки
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Один поток: агрегаты и кэш прогнозов заполняются последовательно
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.jobs = {}       # график -> актуальная задача
+        self.active = set()  # все запущенные задачи (держим ссылки до завершения)
+
+    def submit(self, chart, build, *args):
+        """Постановка в очередь расчета данных графика"""
+        self.cancel(chart)
+        job = ChartJob(chart, build, *args)
+        job.signals.done.connect(self.on_job_done)
+        self.jobs[chart] = job
+        self.active.add(job)
+        self.pool.start(job)
+
+    def cancel(self, chart):
+        """Отмена задачи графика"""
+        job = self.jobs.pop(chart, None)
+        if job is None:
+            return
+        job.cancelled = True
+        if self.pool.tryTake(job):
+            self.active.discard(job)
+
+    def cancel_all(self):
+        """Отмена всех задач и ожидание завершения выполняющихся"""
+        for chart in list(self.jobs):
+            self.cancel(chart)
+        self.pool.waitForDone()
+
+    def is_busy(self):
+        """Есть ли невыполненные задачи"""
+        return bool(self.jobs)
+
+    def on_job_done(self, job):
+        """Передача результата задачи в поток интерфейса"""
+        self.active.discard(job)
+        if job.cancelled or self.jobs.get(job.chart) is not job:
+            return
+        del self.jobs[job.chart]
+        if job.error is not None:
+            self.failed.emit(job.chart, str(job.error))
+        else:
+            self.finished.emit(job.chart, job.result)
+
+
+class ImportTaskSignals(QObject):
+    """Сигналы фоновой задачи импорта"""
+    progress = pyqtSignal(int)  # обработано строк
+    done = pyqtSignal(object)
+
+
+class ImportTask(QRunnable):
+    """Фоновый импорт нарядов из файла через отдельное соединение с базой"""
+
+    def __init__(self, db_name, path):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.db_name = db_name
+        self.path = path
+        self.report = None
+        self.error = None
+        self.signals = ImportTaskSignals()
+
+    def run(self):
+        """Выполнение импорта в потоке пула"""
+        try:
+            db = Database(self.db_name)
+            try:
+                self.report = import_file(db, self.path,
+                                          progress=self.signals.progress.emit)
+            finally:
+                db.close()
+        except Exception as e:
+            self.error = e
+        self.signals.done.emit(self)